@@ -0,0 +1,72 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.database.session import get_db
+from app.models import Category, Transactions
+from app.schemas import AnomalyResponse
+from app.services.anomalies import detector, flagged
+
+router = APIRouter()
+
+settings = get_settings()
+
+
+@router.get("/anomalies", response_model=AnomalyResponse)
+async def get_anomalies(
+    start_date: Optional[date] = Query(
+        None, description="Only transactions on or after this date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(
+        None, description="Only transactions on or before this date (YYYY-MM-DD)"),
+    category: Optional[List[str]] = Query(
+        None, description="Category name, may be repeated"),
+    min_score: Optional[float] = Query(
+        None, description="Lowest score to report (default: ANOMALY_THRESHOLD)"),
+    limit: int = Query(50, ge=1, le=500, description="Rows per page"),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Unusual transactions, newest first: amounts far above the median of their
+    category over the previous months. score is the modified z-score of the
+    amount, median the category's median amount over those months and history
+    the number of transactions it is based on.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(
+            status_code=400, detail="start_date must be on or before end_date")
+
+    categories = None
+    if category:
+        categories = set((await db.scalars(
+            select(Category.id).where(Category.name.in_(category)))).all())
+
+    # The first call after a restart or an external change loads every transaction
+    months = await run_in_threadpool(detector.current)
+    ids, scores, medians, histories = flagged(
+        months, min_score, start_date, end_date, categories)
+
+    page = slice(offset, offset + limit)
+    page_ids = ids[page].tolist()
+    transactions = {transaction.id: transaction for transaction in (await db.scalars(
+        select(Transactions).where(Transactions.id.in_(page_ids)))).all()}
+
+    items = [
+        {"transaction": transactions[id], "score": score, "median": median, "history": history}
+        for id, score, median, history in zip(page_ids, scores[page].tolist(),
+                                              medians[page].tolist(), histories[page].tolist())
+        # Deleted since the scores were computed
+        if id in transactions
+    ]
+    return {
+        "items": items,
+        "total": len(ids),
+        "has_more": offset + limit < len(ids),
+        "threshold": settings.ANOMALY_THRESHOLD if min_score is None else min_score,
+        "window_months": settings.ANOMALY_WINDOW_MONTHS,
+    }
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+import calendar
+from collections import defaultdict
+from datetime import UTC, date, datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import exists, func, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.database.session import get_db
-from app.models import Budget
-from app.schemas import BudgetResponse, BudgetCreate, BudgetUpdate
+from app.database.session import get_db, get_write_db
+from app.models import Budget, Category, DailySpend, SpendingRollup
+from app.schemas import (BudgetResponse, BudgetCreate, BudgetUpdate, BudgetVsActualResponse,
+                         DailyBudgetResponse)
+from app.services import data_version
+from app.services.dimensions import InternMap, id_of
+from app.services.rollups import running_total
 
 import logging
 
@@ -13,24 +23,29 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def parse_month(month):
+    """First day of a YYYY-MM month. Raises ValueError for other formats."""
+    return datetime.strptime(month, "%Y-%m").date()
+
+
 @router.get("/", response_model=List[BudgetResponse])
-def get_all_budgets(db: Session = Depends(get_db)):
+async def get_all_budgets(db: AsyncSession = Depends(get_db)):
     """
     Retrieve all budget records from the database.
     """
-    budgets = db.query(Budget).order_by(Budget.category).all()
+    budgets = (await db.scalars(select(Budget).order_by(Budget.category))).all()
     return budgets
 
 
 @router.get("/category", response_model=BudgetResponse)
-def get_budget_by_category(category: str, db: Session = Depends(get_db)):
+async def get_budget_by_category(category: str, db: AsyncSession = Depends(get_db)):
     """
     Retrieve a specific budget by category name.
     """
     if not category:
         raise HTTPException(
             status_code=400, detail="Category is required")
-    budget = db.query(Budget).filter(Budget.category == category).first()
+    budget = (await db.scalars(select(Budget).where(Budget.category_id == id_of(Category, category)))).first()
     if not budget:
         raise HTTPException(
             status_code=404, detail=f"Budget for category '{category}' not found")
@@ -38,13 +53,13 @@ def get_budget_by_category(category: str, db: Session = Depends(get_db)):
 
 
 @router.post("/", response_model=BudgetResponse)
-def create_budget(budget_data: BudgetCreate, db: Session = Depends(get_db)):
+def create_budget(budget_data: BudgetCreate, db: Session = Depends(get_write_db)):
     """
     Create a new budget for a category.
     """
     # Check if budget already exists for this category
     existing_budget = db.query(Budget).filter(
-        Budget.category == budget_data.category).first()
+        Budget.category_id == id_of(Category, budget_data.category)).first()
     if existing_budget:
         raise HTTPException(
             status_code=400,
@@ -52,12 +67,13 @@ def create_budget(budget_data: BudgetCreate, db: Session = Depends(get_db)):
         )
 
     budget = Budget(
-        category=budget_data.category,
+        category_id=InternMap(db).id(Category, budget_data.category),
         budget_amount=budget_data.budget_amount
     )
 
     db.add(budget)
     db.commit()
+    data_version.bump("budget", {"Budget": None})
     db.refresh(budget)
 
     logger.info(
@@ -66,20 +82,21 @@ def create_budget(budget_data: BudgetCreate, db: Session = Depends(get_db)):
 
 
 @router.put("/category", response_model=BudgetResponse)
-def update_budget(category: str, budget_data: BudgetUpdate, db: Session = Depends(get_db)):
+def update_budget(category: str, budget_data: BudgetUpdate, db: Session = Depends(get_write_db)):
     """
     Update the budget amount for a specific category.
     """
     if not category:
         raise HTTPException(
             status_code=400, detail="Category is required")
-    budget = db.query(Budget).filter(Budget.category == category).first()
+    budget = db.query(Budget).filter(Budget.category_id == id_of(Category, category)).first()
     if not budget:
         raise HTTPException(
             status_code=404, detail=f"Budget for category '{category}' not found")
 
     budget.budget_amount = budget_data.budget_amount
     db.commit()
+    data_version.bump("budget", {"Budget": None})
     db.refresh(budget)
 
     logger.info(
@@ -88,57 +105,220 @@ def update_budget(category: str, budget_data: BudgetUpdate, db: Session = Depend
 
 
 @router.delete("/category")
-def delete_budget(category: str, db: Session = Depends(get_db)):
+def delete_budget(category: str, db: Session = Depends(get_write_db)):
     """
     Delete a budget for a specific category.
     """
     if not category:
         raise HTTPException(
             status_code=400, detail="Category is required")
-    budget = db.query(Budget).filter(Budget.category == category).first()
+    budget = db.query(Budget).filter(Budget.category_id == id_of(Category, category)).first()
     if not budget:
         raise HTTPException(
             status_code=404, detail=f"Budget for category '{category}' not found")
 
     db.delete(budget)
     db.commit()
+    data_version.bump("budget", {"Budget": None})
 
     logger.info(f"Deleted budget for category '{category}'")
     return {"message": f"Budget for category '{category}' deleted successfully"}
 
 
 @router.post("/bulk", response_model=List[BudgetResponse])
-def create_or_update_budgets_bulk(budgets_data: List[BudgetCreate], db: Session = Depends(get_db)):
+def create_or_update_budgets_bulk(budgets_data: List[BudgetCreate], db: Session = Depends(get_write_db)):
     """
     Create or update multiple budgets at once.
     If a budget already exists for a category, it will be updated.
     If it doesn't exist, it will be created.
+    Runs as one INSERT ... ON CONFLICT DO UPDATE in a single transaction.
     """
-    results = []
+    if not budgets_data:
+        return []
+
+    dimensions = InternMap(db)
+    dimensions.intern_all(Category, [budget_data.category for budget_data in budgets_data])
+    # Later entries for the same category win
+    amounts = {dimensions.id(Category, budget_data.category): budget_data.budget_amount
+               for budget_data in budgets_data}
+
+    now = datetime.now(UTC)
+    statement = sqlite_insert(Budget).values([
+        {"category_id": category_id, "budget_amount": amount,
+         "created_at": now, "updated_at": now}
+        for category_id, amount in amounts.items()
+    ])
+    result = db.execute(statement.on_conflict_do_update(
+        index_elements=[Budget.category_id],
+        set_={"budget_amount": statement.excluded.budget_amount,
+              "updated_at": statement.excluded.updated_at},
+        # Leave budgets whose amount didn't change untouched
+        where=Budget.budget_amount.is_distinct_from(statement.excluded.budget_amount),
+    ))
+    changed = result.rowcount
+    db.commit()
+    if changed:
+        data_version.bump("budget", {"Budget": None})
+
+    budgets = {budget.category_id: budget for budget in db.scalars(
+        select(Budget).where(Budget.category_id.in_(list(amounts))))}
+
+    logger.info(
+        f"Saved {len(amounts)} budgets in bulk, {changed} created or changed")
+    return [budgets[dimensions.id(Category, budget_data.category)]
+            for budget_data in budgets_data]
 
-    for budget_data in budgets_data:
-        existing_budget = db.query(Budget).filter(
-            Budget.category == budget_data.category).first()
 
-        if existing_budget:
-            # Update existing budget
-            existing_budget.budget_amount = budget_data.budget_amount
-            db.commit()
-            db.refresh(existing_budget)
-            results.append(existing_budget)
-            logger.info(
-                f"Updated budget for category '{budget_data.category}' to amount {budget_data.budget_amount}")
+@router.get("/vs-actual", response_model=BudgetVsActualResponse)
+async def get_budget_vs_actual(
+    month: Optional[str] = Query(
+        None, description="Month in YYYY-MM format (default: the current month)"),
+    start_month: Optional[str] = Query(
+        None, description="First month of a range, YYYY-MM"),
+    end_month: Optional[str] = Query(
+        None, description="Last month of a range, YYYY-MM (default: start_month)"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Budget against actual spending per category for a month or a range of
+    months. Budgets are monthly, so over a range each budget counts once per
+    month. Lists every category with a budget or with spending.
+    """
+    try:
+        if month:
+            start = end = parse_month(month)
+        elif start_month:
+            start = parse_month(start_month)
+            end = parse_month(end_month) if end_month else start
         else:
-            # Create new budget
-            new_budget = Budget(
-                category=budget_data.category,
-                budget_amount=budget_data.budget_amount
-            )
-            db.add(new_budget)
-            db.commit()
-            db.refresh(new_budget)
-            results.append(new_budget)
-            logger.info(
-                f"Created budget for category '{budget_data.category}' with amount {budget_data.budget_amount}")
-
-    return results
+            start = end = date.today().replace(day=1)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="Invalid month format. Please use YYYY-MM format.")
+    if end < start:
+        raise HTTPException(
+            status_code=400, detail="end_month must be on or after start_month")
+
+    months = (end.year - start.year) * 12 + end.month - start.month + 1
+
+    # Spending per category from the monthly rollups
+    spent = (
+        select(SpendingRollup.category_id, func.sum(SpendingRollup.total).label("spent"))
+        .where(SpendingRollup.year_month >= start.strftime("%Y-%m"),
+               SpendingRollup.year_month <= end.strftime("%Y-%m"))
+        .group_by(SpendingRollup.category_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(Category.name, Budget.budget_amount, spent.c.spent)
+        .outerjoin(Budget, Budget.category_id == Category.id)
+        .outerjoin(spent, spent.c.category_id == Category.id)
+        .where(or_(Budget.id.is_not(None), spent.c.spent.is_not(None)))
+        .order_by(Category.name)
+    )
+
+    categories = []
+    for name, budget_amount, spent_amount in result:
+        budget = (budget_amount or 0.0) * months
+        spent_amount = spent_amount or 0.0
+        categories.append({
+            "category": name,
+            "budget": budget,
+            "spent": spent_amount,
+            "remaining": budget - spent_amount,
+            "percent_used": spent_amount / budget * 100 if budget else None,
+            "over_budget": spent_amount > budget,
+        })
+
+    return {
+        "start_month": start.strftime("%Y-%m"),
+        "end_month": end.strftime("%Y-%m"),
+        "months": months,
+        "total_budget": sum(row["budget"] for row in categories),
+        "total_spent": sum(row["spent"] for row in categories),
+        "categories": categories,
+    }
+
+
+@router.get("/daily", response_model=DailyBudgetResponse)
+async def get_daily_budget(
+    as_of: Optional[date] = Query(
+        None, description="Day to report on (default: today); covers its month up to that day"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Daily budget tracker: per category, the month's budget, spending up to
+    as_of, what is left, how much can be spent per day for the rest of the
+    month (as_of included) and a day-by-day burn-down of the remaining budget.
+    Lists every category with a budget or with spending this month.
+
+    Month-to-date figures are differences of two DailySpend running totals.
+    """
+    as_of = as_of or date.today()
+    month_start = as_of.replace(day=1)
+    days_in_month = calendar.monthrange(as_of.year, as_of.month)[1]
+    remaining_days = days_in_month - as_of.day + 1
+    first_day = month_start.isoformat()
+    last_day = as_of.isoformat()
+
+    # Running totals at the end of the previous month and at as_of
+    before_month = running_total(Category.id, (month_start - timedelta(days=1)).isoformat())
+    spent_this_month = exists().where(DailySpend.category_id == Category.id,
+                                      DailySpend.day >= first_day, DailySpend.day <= last_day)
+    result = await db.execute(
+        select(Category.id, Category.name, Budget.budget_amount,
+               before_month.label("base"), running_total(Category.id, last_day).label("total"))
+        .outerjoin(Budget, Budget.category_id == Category.id)
+        .where(or_(Budget.id.is_not(None), spent_this_month))
+        .order_by(Category.name)
+    )
+    categories = result.all()
+
+    # Running totals of the days with spending, for the burn-down series
+    days = defaultdict(dict)
+    for category_id, day, cumulative in await db.execute(
+        select(DailySpend.category_id, DailySpend.day, DailySpend.cumulative)
+        .where(DailySpend.day >= first_day, DailySpend.day <= last_day)
+    ):
+        days[category_id][day] = cumulative
+
+    def money(value):
+        # Running totals span the whole history; their differences carry float noise
+        return round(value, 2)
+
+    def allowance(remaining, budget):
+        return max(remaining, 0.0) / remaining_days if budget else None
+
+    rows = []
+    for category_id, name, budget_amount, base, total in categories:
+        budget = budget_amount or 0.0
+        spent = money(total - base)
+        series = []
+        cumulative = base
+        for offset in range(as_of.day):
+            day = month_start + timedelta(days=offset)
+            cumulative = days[category_id].get(day.isoformat(), cumulative)
+            series.append({"day": day, "spent": money(cumulative - base),
+                           "remaining": money(budget - (cumulative - base))})
+        rows.append({
+            "category": name,
+            "budget": budget,
+            "spent": spent,
+            "remaining": money(budget - spent),
+            "daily_allowance": allowance(budget - spent, budget),
+            "over_budget": spent > budget,
+            "series": series,
+        })
+
+    total_budget = sum(row["budget"] for row in rows)
+    total_spent = money(sum(row["spent"] for row in rows))
+    return {
+        "month": month_start.strftime("%Y-%m"),
+        "as_of": as_of,
+        "days_in_month": days_in_month,
+        "remaining_days": remaining_days,
+        "total_budget": total_budget,
+        "total_spent": total_spent,
+        "daily_allowance": allowance(total_budget - total_spent, total_budget),
+        "categories": rows,
+    }
@@ -0,0 +1,192 @@
+"""
+Batch endpoint for the dashboard pages.
+
+A page posts the list of widgets it shows and gets every widget's data back
+in one response, shaped like the widget's own endpoint. The widgets' queries
+run concurrently, each on its own read session, and widgets that need the
+same data share one query:
+
+- every month x category widget (categories, monthly_categories) is cut from
+  one month x category report covering all the months they ask for
+- every income_by_month widget is cut from one monthly income report
+- identical widgets run once
+"""
+
+import asyncio
+
+from fastapi import APIRouter, HTTPException
+from sqlalchemy import select
+
+from app.api.v1.endpoints.income import month_income
+from app.api.v1.endpoints.summary import (categories_by_month, category_totals,
+                                          last_months, monthly_totals)
+from app.api.v1.filters import TransactionFilters, month_range
+from app.database.session import read_session
+from app.models import Budget
+from app.schemas import (AggregationResponse, BudgetResponse, DashboardRequest,
+                         DashboardResponse)
+from app.services.aggregation import Aggregation
+from app.services.dates import month_key
+
+import logging
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+
+class Memo:
+    """
+    Queries of one batch by key. Callers asking for the same key share one
+    task, so each query runs once however many widgets need it.
+    """
+
+    def __init__(self):
+        self.tasks = {}
+
+    def get(self, key, query):
+        task = self.tasks.get(key)
+        if task is None:
+            task = self.tasks[key] = asyncio.ensure_future(query())
+        return task
+
+    def cancel(self):
+        for task in self.tasks.values():
+            task.cancel()
+
+
+def covering(ranges):
+    """Smallest (start, end) containing every (start, end); None is unbounded."""
+    starts = [start for start, _ in ranges]
+    ends = [end for _, end in ranges]
+    return (None if None in starts else min(starts),
+            None if None in ends else max(ends))
+
+
+def in_months(rows, start, end):
+    """Rows of a monthly report with a bucket between start and end (None is unbounded)."""
+    first = month_key(start) if start else None
+    last = month_key(end) if end else None
+    return [row for row in rows
+            if (first is None or row["bucket"] >= first)
+            and (last is None or row["bucket"] <= last)]
+
+
+async def run_report(report):
+    # One session per query: a session can't run statements concurrently
+    async with read_session() as db:
+        return await report.run(db)
+
+
+async def load_budgets():
+    async with read_session() as db:
+        budgets = (await db.scalars(select(Budget).order_by(Budget.category))).all()
+        return [BudgetResponse.model_validate(budget).model_dump(mode="json")
+                for budget in budgets]
+
+
+class DashboardBatch:
+    """
+    Plans the widgets of one request (raising ValueError for invalid ones)
+    before any query runs, so the shared reports can cover every widget.
+    """
+
+    def __init__(self, widgets):
+        self.memo = Memo()
+        self.category_months = []
+        self.income_months = []
+        self.resolvers = []
+        for index, widget in enumerate(widgets):
+            try:
+                self.resolvers.append(self._plan(widget))
+            except ValueError as e:
+                raise ValueError(f"widgets[{index}]: {e}")
+
+    def _plan(self, widget):
+        """Async function returning the widget's data."""
+        if widget.type == "monthly":
+            filters = last_months(widget.months)
+            report = Aggregation(filters=filters)
+            return self._report(("monthly", filters.start_date), report, monthly_totals)
+
+        if widget.type == "categories":
+            start = self._month(widget.month)
+            self.category_months.append((start, start))
+            return self._cut("categories", self._categories, start, start, category_totals)
+
+        if widget.type == "monthly_categories":
+            start = last_months(widget.months).start_date
+            self.category_months.append((start, None))
+            return self._cut("categories", self._categories, start, None, categories_by_month)
+
+        if widget.type == "income_by_month":
+            start = self._month(widget.month)
+            self.income_months.append((start, start))
+            return self._cut("income", self._income, start, start,
+                             lambda rows: month_income(start, rows))
+
+        if widget.type == "budgets":
+            return lambda: self.memo.get("budgets", load_budgets)
+
+        # aggregate
+        report = Aggregation(
+            widget.source, widget.granularity, widget.group_by, widget.measures,
+            widget.compare, TransactionFilters.date_range(widget.start_date, widget.end_date))
+
+        def shape(rows):
+            return AggregationResponse.model_validate(
+                {**report.describe(), "rows": rows}).model_dump(mode="json")
+        return self._report(widget.model_dump_json(), report, shape)
+
+    @staticmethod
+    def _month(month):
+        try:
+            return month_range(month).start_date
+        except ValueError:
+            raise ValueError("Invalid month format. Please use YYYY-MM format.")
+
+    def _report(self, key, report, shape):
+        async def resolve():
+            return shape(await self.memo.get(key, lambda: run_report(report)))
+        return resolve
+
+    def _cut(self, key, query, start, end, shape):
+        async def resolve():
+            rows = await self.memo.get(key, query)
+            return shape(in_months(rows, start, end))
+        return resolve
+
+    def _categories(self):
+        filters = TransactionFilters.date_range(*covering(self.category_months))
+        return run_report(Aggregation(group_by=["category"], filters=filters))
+
+    def _income(self):
+        filters = TransactionFilters.date_range(*covering(self.income_months))
+        return run_report(Aggregation("income", filters=filters))
+
+    async def run(self):
+        """Data of every widget, in request order."""
+        try:
+            return await asyncio.gather(*(resolve() for resolve in self.resolvers))
+        except BaseException:
+            self.memo.cancel()
+            raise
+
+
+@router.post("/", response_model=DashboardResponse)
+async def get_dashboard(request: DashboardRequest):
+    """
+    Data of several dashboard widgets in one round trip. Each result has the
+    shape of the widget's own endpoint: monthly (/summary/monthly),
+    categories (/summary/categories), monthly_categories
+    (/summary/monthly-categories), income_by_month (/income/by-month),
+    budgets (/budget/) and aggregate (/summary/aggregate).
+    """
+    try:
+        batch = DashboardBatch(request.widgets)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    results = await batch.run()
+    logger.info(f"Dashboard batch: {len(results)} widgets, {len(batch.memo.tasks)} queries")
+    return {"results": results}
@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+
+from app.database.profiler import slow_query_log
+from app.schemas import SlowQueryLogResponse
+
+router = APIRouter()
+
+
+@router.get("/slow-queries", response_model=SlowQueryLogResponse)
+def get_slow_queries():
+    """
+    Most recent statements slower than SLOW_QUERY_MS, newest first,
+    with their parameters, calling request and query plan.
+    """
+    return {
+        "enabled": slow_query_log.enabled,
+        "threshold_ms": slow_query_log.threshold_ms,
+        "queries": slow_query_log.snapshot(),
+    }
+
+
+@router.delete("/slow-queries", response_model=SlowQueryLogResponse)
+def clear_slow_queries():
+    """
+    Empty the slow-query log.
+    """
+    slow_query_log.clear()
+    return get_slow_queries()
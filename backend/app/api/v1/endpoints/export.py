@@ -0,0 +1,57 @@
+from typing import Literal
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from app.api.v1.filters import TransactionFilters
+from app.notion.pipeline import prefetch
+from app.services import export
+
+router = APIRouter()
+
+
+async def export_body(chunks):
+    """
+    Stream chunks produced on a background thread. If the client goes away,
+    the producer is told to stop and joined before this returns, so chunks is
+    never still being read while it is closed.
+    """
+    buffered = prefetch(chunks, depth=4, join_timeout=None)
+    try:
+        async for chunk in iterate_in_threadpool(buffered):
+            yield chunk
+    finally:
+        # Joining blocks until the producer's current batch is done: wait on a
+        # worker thread, and finish even when the response was cancelled
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(buffered.close)
+
+
+@router.get("/{kind}")
+async def export_rows(
+    kind: Literal["transactions", "income"],
+    format: Literal["ndjson", "csv", "parquet"] = Query("ndjson"),
+    gzip: bool = Query(False, description="Gzip the ndjson or csv output"),
+    filters: TransactionFilters = Depends(),
+):
+    """
+    Stream every transaction or income row matching the filters as NDJSON,
+    CSV or Parquet. Rows are read and encoded a batch at a time.
+    """
+    try:
+        export.check_format(format, gzip)
+    except ValueError as e:
+        status_code = 501 if format == "parquet" and export.pyarrow is None else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
+    # Reject filters that don't apply before the response starts
+    model, _ = export.EXPORTS[kind]
+    filters.conditions(model)
+
+    return StreamingResponse(
+        export_body(export.export_chunks(kind, format, filters, gzip)),
+        media_type=export.media_type(format, gzip),
+        headers={"Content-Disposition":
+                 f'attachment; filename="{export.file_name(kind, format, gzip)}"'},
+    )
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import datetime
-from sqlalchemy import extract, func
-
+from app.api.v1.filters import month_range
+from app.api.v1.streaming import stream_rows
 from app.database.session import get_db
 from app.models import Income
 from app.schemas import IncomeResponse, IncomeByMonthResponse
+from app.services.aggregation import Aggregation
 
 import logging
 
@@ -15,20 +16,29 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def month_income(month_date, rows):
+    """By-month response from the monthly income rows of month_date's month."""
+    total = rows[0]["values"]["sum"] if rows else None
+    return {
+        "year": month_date.year,
+        "month": month_date.month,
+        "total": total or 0
+    }
+
+
 @router.get("/", response_model=List[IncomeResponse])
-def get_all_income(db: Session = Depends(get_db)):
+async def get_all_income():
     """
     Retrieve all income records from the database.
+    Streamed straight from row tuples to JSON.
     """
-    income_records = db.query(Income).order_by(
-        Income.date_received.desc()).all()
-    return income_records
+    return stream_rows(Income, IncomeResponse, Income.date_received.desc())
 
 
 @router.get("/by-month", response_model=IncomeByMonthResponse)
-def get_latest_month_income(
+async def get_latest_month_income(
     month: str = Query(..., description="Month in YYYY-MM format"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Retrieve the given month's total income from the database.
@@ -39,21 +49,8 @@ def get_latest_month_income(
 
         logger.info(f"here 1: {month_date.year} {month_date.month}")
 
-        total = (
-            db.query(
-                func.sum(Income.amount))
-            .filter(
-                extract("year", Income.date_received) == month_date.year,
-                extract("month", Income.date_received) == month_date.month,
-            )
-            .scalar()
-        )
-
-        return {
-            "year": month_date.year,
-            "month": month_date.month,
-            "total": total or 0
-        }
+        rows = await Aggregation("income", filters=month_range(month)).run(db)
+        return month_income(month_date, rows)
 
     except ValueError:
         raise HTTPException(
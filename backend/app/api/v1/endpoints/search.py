@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.filters import TransactionFilters
+from app.database.search_index import match_query, search_table
+from app.database.session import get_db
+from app.models import Transactions
+from app.schemas import SearchResponse
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SearchResponse)
+async def search_transactions(
+    q: str = Query(..., description="Words to look for in name, category, sub-category and method"),
+    limit: int = Query(50, ge=1, le=500, description="Rows per page"),
+    offset: int = Query(0, ge=0),
+    totals: bool = Query(False, description="Also return the count and sum of every match"),
+    filters: TransactionFilters = Depends(),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Full-text search over transactions, best matches first.
+    Every word of q must match the start of a word in the row, so "gro"
+    finds "Grocery Store". The filters of /table/page narrow the matches.
+    """
+    match = match_query(q)
+    if match is None:
+        raise HTTPException(status_code=400, detail="Search query has no words")
+
+    matches = (
+        select(Transactions)
+        .join(search_table, search_table.c.rowid == Transactions.id)
+        .where(search_table.c.TransactionsSearch.match(match), *filters.conditions())
+    )
+
+    # bm25 rank, newest first among equally good matches
+    rows = (await db.scalars(
+        matches.order_by(search_table.c.rank, Transactions.date.desc(), Transactions.id.desc())
+        .limit(limit + 1).offset(offset)
+    )).all()
+    has_more = len(rows) > limit
+
+    summary = None
+    if totals:
+        count, amount = (await db.execute(
+            matches.with_only_columns(func.count(), func.coalesce(func.sum(Transactions.amount), 0.0))
+        )).one()
+        summary = {"count": count, "amount": amount}
+
+    return {"items": rows[:limit], "has_more": has_more, "totals": summary}
@@ -1,47 +1,86 @@
-from datetime import date, datetime
+from datetime import date
 from dateutil.relativedelta import relativedelta
 
-from typing import Dict
+from typing import Dict, List, Literal
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.v1.filters import TransactionFilters, month_range
 from app.database.session import get_db
-from app.models import Transactions
+from app.schemas import AggregationResponse
+from app.services.aggregation import Aggregation
 
 router = APIRouter()
 
 
+def last_months(months):
+    """Filters for the current month and the previous (months-1), or everything."""
+    start_date = (date.today().replace(day=1) -
+                  relativedelta(months=months - 1)) if months else None
+    return TransactionFilters.date_range(start_date)
+
+
+def category_totals(rows):
+    """{category: total} from month x category rows."""
+    return {row["groups"]["category"]: float(row["values"]["sum"]) for row in rows}
+
+
+def monthly_totals(rows):
+    """{YYYY-MM: total} from monthly rows."""
+    return {row["bucket"]: float(row["values"]["sum"]) for row in rows}
+
+
+def categories_by_month(rows):
+    """{category: {YYYY-MM: total}} from month x category rows."""
+    summary = {}
+    for row in rows:
+        category = row["groups"]["category"]
+        if not category:
+            continue
+        if category not in summary:
+            summary[category] = {}
+        summary[category][row["bucket"]] = float(row["values"]["sum"])
+    return summary
+
+
+@router.get("/aggregate", response_model=AggregationResponse)
+async def aggregate(
+    source: Literal["spending", "income"] = Query("spending"),
+    granularity: Literal["day", "week", "month", "quarter", "year"] = Query("month"),
+    group_by: List[Literal["category", "sub_category", "method", "account"]] = Query(
+        [], description="Dimension to group by, may be repeated"),
+    measures: List[Literal["sum", "count", "avg", "max"]] = Query(
+        ["sum"], description="Measure to compute, may be repeated"),
+    compare: bool = Query(
+        False, description="Also compute every measure for the period right before the range"),
+    filters: TransactionFilters = Depends(),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Totals per day, week, month, quarter or year, optionally per category,
+    sub-category, method (spending) or account (income), with any of
+    sum/count/avg/max. The range is widened to whole buckets. With compare,
+    every row also carries the values of the matching bucket of the previous
+    period and the relative change. Runs as one SQL query, on the monthly
+    rollups when the report allows it.
+    """
+    try:
+        report = Aggregation(source, granularity, group_by, measures, compare, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**report.describe(), "rows": await report.run(db)}
+
+
 @router.get("/categories")
-def get_category_summary(
+async def get_category_summary(
     month: str = Query(..., description="Month in YYYY-MM format"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Dict[str, float]:
     """
     Get total spending by category for a specific month.
     """
     try:
-        # Parse the month string
-        month_date = datetime.strptime(month, "%Y-%m")
-
-        # Query the database for category totals
-        results = (
-            db.query(
-                Transactions.category,
-                func.sum(Transactions.amount).label('total')
-            )
-            .filter(
-                extract('year', Transactions.date) == month_date.year,
-                extract('month', Transactions.date) == month_date.month
-            )
-            .group_by(Transactions.category)
-            .all()
-        )
-
-        # Convert results to dictionary
-        category_totals = {category: float(total)
-                           for category, total in results}
-
-        return category_totals
+        report = Aggregation(group_by=["category"], filters=month_range(month))
+        return category_totals(await report.run(db))
     except ValueError:
         raise HTTPException(
             status_code=400, detail="Invalid month format. Please use YYYY-MM format.")
@@ -50,78 +89,29 @@ def get_category_summary(
 
 
 @router.get("/monthly")
-def get_monthly_summary(
+async def get_monthly_summary(
     months: int = Query(None, description="Number of months to include"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Dict[str, float]:
     """
     Get total spending by month optionally limited to the past N months.
     Past N months = current month + previous (N-1) full months.
     """
     try:
-        query = db.query(
-            extract('year', Transactions.date).label('year'),
-            extract('month', Transactions.date).label('month'),
-            func.sum(Transactions.amount).label('total')
-        )
-
-        if months:
-            # Start date = first day of (months-1) months ago
-            start_date = (date.today().replace(day=1) -
-                          relativedelta(months=months - 1))
-            query = query.filter(Transactions.date >= start_date)
-
-        results = (
-            query
-            .group_by('year', 'month')
-            .order_by('year', 'month')
-            .all()
-        )
-
-        monthly_totals = {
-            f"{int(row.year)}-{int(row.month):02d}": float(row.total)
-            for row in results
-        }
-
-        return monthly_totals
+        rows = await Aggregation(filters=last_months(months)).run(db)
+        return monthly_totals(rows)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/monthly-categories")
-def get_monthly_categories_summary(
+async def get_monthly_categories_summary(
     months: int = Query(None, description="Number of months to include"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get total spending by category for each month.
     Returns: { category: { 'YYYY-MM': total, ... }, ... }
     """
-    query = db.query(
-        Transactions.category,
-        extract('year', Transactions.date).label('year'),
-        extract('month', Transactions.date).label('month'),
-        func.sum(Transactions.amount).label('total')
-    )
-
-    if months:
-        start_date = (date.today().replace(day=1) -
-                      relativedelta(months=months - 1))
-        query = query.filter(Transactions.date >= start_date)
-
-    results = (
-        query
-        .group_by(Transactions.category, 'year', 'month')
-        .order_by('year', 'month')
-        .all()
-    )
-
-    summary = {}
-    for category, year, month, total in results:
-        if not category:
-            continue
-        key = f"{int(year):04d}-{int(month):02d}"
-        if category not in summary:
-            summary[category] = {}
-        summary[category][key] = float(total)
-    return summary
+    rows = await Aggregation(group_by=["category"], filters=last_months(months)).run(db)
+    return categories_by_month(rows)
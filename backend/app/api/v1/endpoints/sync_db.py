@@ -1,15 +1,49 @@
-from fastapi import APIRouter
-from app.notion.notion_connector import sync_transactions
+from fastapi import APIRouter, HTTPException, Query
+
+from app.notion.transport import transport_stats
+from app.schemas import SyncJobResponse
+from app.services.sync_jobs import sync_jobs
 
 router = APIRouter()
 
-@router.get("/", response_model=None)
-def get_all_transactions():
+@router.get("/", response_model=SyncJobResponse)
+def get_all_transactions(
+    full: bool = Query(False, description="Re-download the whole Notion database instead of only edited pages")
+):
+    """
+    Start syncing transactions from Notion to SQLite in the background.
+    Returns immediately with the job; if a sync is already queued or running,
+    that job is returned instead of starting a new one.
+    """
+    return sync_jobs.start(full=full).to_dict()
+
+
+@router.get("/status", response_model=SyncJobResponse)
+def get_latest_sync_status():
+    """
+    Get status and progress of the most recent sync job.
+    """
+    job = sync_jobs.latest()
+    if not job:
+        raise HTTPException(status_code=404, detail="No sync has been started")
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}", response_model=SyncJobResponse)
+def get_sync_status(job_id: str):
+    """
+    Get status and progress of a sync job.
+    """
+    job = sync_jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=404, detail=f"Sync job '{job_id}' not found")
+    return job.to_dict()
+
+
+@router.get("/transport")
+def get_transport_stats():
     """
-    Sync transactions from Notion to SQLite
+    Request, retry and throttle counters of the Notion HTTP transport.
     """
-    try:
-        stats = sync_transactions()
-        print(f"Sync completed successfully: {stats}")
-    except Exception as e:
-        print(f"Sync failed: {str(e)}")
\ No newline at end of file
+    return transport_stats.snapshot()
@@ -1,19 +1,99 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
+import base64
+import json
+from datetime import datetime
+from typing import List, Literal, Optional
 
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.filters import TransactionFilters
+from app.api.v1.streaming import stream_rows
 from app.database.session import get_db
 from app.models import Transactions
-from app.schemas import TransactionResponse
+from app.schemas import TransactionPage, TransactionResponse
 
 router = APIRouter()
 
+SORT_COLUMNS = {
+    "date": Transactions.date,
+    "amount": Transactions.amount,
+}
+
+
+def encode_cursor(sort, order, value, row_id):
+    """Opaque cursor pointing just past the (sort value, id) of the last row returned."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort, order, value, row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor, sort, order):
+    try:
+        cursor_sort, cursor_order, value, row_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode()))
+        if sort == "date":
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise HTTPException(
+            status_code=400, detail="Cursor was issued for a different sort order")
+    return value, row_id
+
 
 @router.get("/", response_model=List[TransactionResponse])
-def get_all_transactions(db: Session = Depends(get_db)):
+async def get_all_transactions():
     """
     Retrieve all transactions from the database.
+    Streamed straight from row tuples to JSON, without ORM instances or
+    per-row model validation.
+    """
+    return stream_rows(Transactions, TransactionResponse, Transactions.date.desc())
+
+
+@router.get("/page", response_model=TransactionPage)
+async def get_transactions_page(
+    limit: int = Query(100, ge=1, le=500, description="Rows per page"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from the previous page"),
+    sort: Literal["date", "amount"] = Query("date"),
+    order: Literal["desc", "asc"] = Query("desc"),
+    filters: TransactionFilters = Depends(),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Retrieve one page of transactions, optionally filtered.
+    Pages are keyed on (sort column, id), so every page costs the same index
+    range scan no matter how deep into the history it is.
     """
-    transactions = db.query(Transactions).order_by(
-        Transactions.date.desc()).all()
-    return transactions
+    sort_column = SORT_COLUMNS[sort]
+    key = tuple_(sort_column, Transactions.id)
+
+    query = filters.apply(select(Transactions))
+
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort, order)
+        if order == "desc":
+            query = query.where(key < tuple_(value, row_id))
+        else:
+            query = query.where(key > tuple_(value, row_id))
+
+    if order == "desc":
+        query = query.order_by(sort_column.desc(), Transactions.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), Transactions.id.asc())
+
+    # Fetch one extra row to find out whether another page follows
+    rows = (await db.scalars(query.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            sort, order, getattr(last, sort), last.id)
+
+    return {"items": rows, "next_cursor": next_cursor, "has_more": has_more}
@@ -1,44 +1,75 @@
 from typing import List
 
+import numpy as np
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, or_, select
+from starlette.concurrency import run_in_threadpool
 
+from app.core.config import get_settings
 from app.database.session import get_db
-from app.models import Transactions
+from app.models import SubCategory, Transactions
 from app.schemas import TravelResponse
-from app.models import Income
-from app.schemas import IncomeResponse
+from app.services.snapshot import snapshot
 
 router = APIRouter()
 
+settings = get_settings()
+
+TRIP_WORDS = ["trip", "travel"]
+
+
+def is_trip(name):
+    """Whether a sub-category name contains any of TRIP_WORDS (case-insensitive)."""
+    return bool(name) and any(word in name.lower() for word in TRIP_WORDS)
+
+
+def trip_totals(columns):
+    """
+    Travel summary from the snapshot's Transactions columns: the sub-categories
+    are matched by name once, then summed with a bincount. Groups are ordered
+    by the day of their latest transaction.
+    """
+    names = columns.labels["sub_category"].names
+    trips = [code for code, name in enumerate(names) if is_trip(name)]
+    rows = columns.take(np.isin(columns.codes["sub_category"], trips))
+    if not len(rows):
+        return []
+    codes, groups = np.unique(rows.codes["sub_category"], return_inverse=True)
+    groups = groups.reshape(-1)
+    totals = np.bincount(groups, weights=rows.amounts)
+    latest = np.full(len(codes), np.iinfo(np.int64).min)
+    np.maximum.at(latest, groups, rows.days)
+    return [{"sub_category": names[codes[group]], "total": float(totals[group])}
+            for group in np.argsort(-latest, kind="stable").tolist()]
+
 
 @router.get("/", response_model=List[TravelResponse])
-def get_travel_summary(db: Session = Depends(get_db)):
+async def get_travel_summary(db: AsyncSession = Depends(get_db)):
     """
     Aggregate transactions related to trips:
-    - Filter transactions where name contains "trip" (case-insensitive)
+    - Filter transactions whose sub_category contains "trip" or "travel"
+      (case-insensitive), matched once against the SubCategory names
     - Group by sub_category and compute:
         - total: sum of amount
         - max_date: most recent transaction date in the group
     - Sort groups by max_date descending
+    With ANALYTICS_ENGINE=memory it is computed from the in-memory snapshot.
     """
+    if settings.ANALYTICS_ENGINE == "memory":
+        return await run_in_threadpool(lambda: trip_totals(snapshot.current()["Transactions"]))
 
-    results = (
-        db.query(
+    results = (await db.execute(
+        select(
             Transactions.sub_category.label("sub_category"),
             func.sum(Transactions.amount).label("total"),
             func.max(Transactions.date).label("max_date"),
         )
-        .filter(
-            or_(
-                Transactions.sub_category.ilike("%trip%"),
-                Transactions.sub_category.ilike("%travel%")
-            )
-        )
-        .group_by(Transactions.sub_category)
+        .where(Transactions.sub_category_id.in_(
+            select(SubCategory.id).where(or_(*(
+                SubCategory.name.ilike(f"%{word}%") for word in TRIP_WORDS)))))
+        .group_by(Transactions.sub_category_id)
         .order_by(func.max(Transactions.date).desc())
-        .all()
-    )
+    )).all()
 
     return results
@@ -0,0 +1,114 @@
+"""
+Query-parameter filters shared by the endpoints that list transactions.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+
+import numpy as np
+from fastapi import HTTPException, Query
+
+from app.models import Transactions
+from app.notion.upsert import date_field
+from app.services.dimensions import DIMENSIONS, id_column, ids_of
+from app.services.dates import day_number
+
+
+class TransactionFilters:
+    """Date range, category, sub_category, method and amount range filters."""
+
+    def __init__(
+        self,
+        start_date: Optional[date] = Query(
+            None, description="Only transactions on or after this date (YYYY-MM-DD)"),
+        end_date: Optional[date] = Query(
+            None, description="Only transactions on or before this date (YYYY-MM-DD)"),
+        category: Optional[List[str]] = Query(
+            None, description="Category name, may be repeated"),
+        sub_category: Optional[List[str]] = Query(
+            None, description="Sub-category name, may be repeated"),
+        method: Optional[List[str]] = Query(
+            None, description="Payment method, may be repeated"),
+        min_amount: Optional[float] = Query(
+            None, description="Minimum amount (inclusive)"),
+        max_amount: Optional[float] = Query(
+            None, description="Maximum amount (inclusive)"),
+    ):
+        if start_date and end_date and start_date > end_date:
+            raise HTTPException(
+                status_code=400, detail="start_date must be on or before end_date")
+        self.start_date = start_date
+        self.end_date = end_date
+        self.category = category
+        self.sub_category = sub_category
+        self.method = method
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+
+    @classmethod
+    def date_range(cls, start_date=None, end_date=None):
+        """Filters with only a date range, for use outside a request."""
+        return cls(start_date=start_date, end_date=end_date, category=None,
+                   sub_category=None, method=None, min_amount=None, max_amount=None)
+
+    def conditions(self, model=Transactions, dates=True):
+        """
+        SQL conditions for the filters that were given. Income only has the
+        date and amount filters. dates=False leaves the date range to the caller.
+        """
+        date_column = getattr(model, date_field(model))
+        conditions = []
+        # Half-open date range so the date index can be used
+        if dates and self.start_date:
+            conditions.append(date_column >=
+                              datetime.combine(self.start_date, time.min))
+        if dates and self.end_date:
+            conditions.append(date_column < datetime.combine(
+                self.end_date + timedelta(days=1), time.min))
+        for name, dimension in DIMENSIONS.items():
+            values = getattr(self, name)
+            if not values:
+                continue
+            if not hasattr(model, name):
+                raise HTTPException(
+                    status_code=400, detail=f"The {name} filter does not apply to {model.__tablename__}")
+            # Names are resolved to ids once, so the id index can be used
+            conditions.append(id_column(model, name).in_(ids_of(dimension, values)))
+        if self.min_amount is not None:
+            conditions.append(model.amount >= self.min_amount)
+        if self.max_amount is not None:
+            conditions.append(model.amount <= self.max_amount)
+        return conditions
+
+    def mask(self, columns, dates=True):
+        """
+        Boolean mask of the rows of snapshot Columns matching the filters, the
+        in-memory counterpart of conditions(). None when nothing is filtered.
+        """
+        conditions = []
+        if dates and self.start_date:
+            conditions.append(columns.days >= day_number(self.start_date))
+        if dates and self.end_date:
+            conditions.append(columns.days <= day_number(self.end_date))
+        for name in DIMENSIONS:
+            values = getattr(self, name)
+            if not values:
+                continue
+            if name not in columns.codes:
+                raise HTTPException(
+                    status_code=400, detail=f"The {name} filter does not apply to {columns.name}")
+            conditions.append(np.isin(columns.codes[name], columns.labels[name].codes_of(values)))
+        if self.min_amount is not None:
+            conditions.append(columns.amounts >= self.min_amount)
+        if self.max_amount is not None:
+            conditions.append(columns.amounts <= self.max_amount)
+        return np.logical_and.reduce(conditions) if conditions else None
+
+    def apply(self, query, model=Transactions):
+        return query.filter(*self.conditions(model))
+
+
+def month_range(month):
+    """Filters covering one YYYY-MM month. Raises ValueError for other formats."""
+    month_date = datetime.strptime(month, "%Y-%m").date()
+    return TransactionFilters.date_range(month_date, month_date)
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import table, sync_db, summary, income, travel, budget
+from app.api.v1.endpoints import table, sync_db, summary, income, travel, budget, dashboard, export, search, analytics, debug
 
 api_router = APIRouter()
 
@@ -9,3 +9,9 @@ api_router.include_router(summary.router, prefix="/summary", tags=["summary"])
 api_router.include_router(income.router, prefix="/income", tags=["income"])
 api_router.include_router(travel.router, prefix="/travel", tags=["travel"])
 api_router.include_router(budget.router, prefix="/budget", tags=["budget"])
+api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+api_router.include_router(export.router, prefix="/export", tags=["export"])
+
+api_router.include_router(debug.router, prefix="/debug", tags=["debug"])
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+Fast JSON path for large list responses.
+
+Selects only the columns a response schema needs as plain row tuples (no ORM
+instances, no identity map), encodes them with orjson a chunk at a time and
+streams the chunks. The output is byte-for-byte what FastAPI produces for the
+same rows through the pydantic response model.
+"""
+
+from datetime import datetime
+
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy import DateTime, Float, String, cast, select, type_coerce
+from sqlalchemy.orm import aliased
+
+from app.database.session import read_session, stream_partitions
+from app.services.dimensions import DIMENSIONS, id_column
+
+CHUNK_ROWS = 1000
+
+
+def iso_datetime(value):
+    """Stored SQLite datetime text rendered the way pydantic renders the datetime."""
+    if value is None:
+        return None
+    # SQLAlchemy stores "YYYY-MM-DD HH:MM:SS.ffffff"; rewriting the text is much
+    # cheaper than parsing it into a datetime and formatting it again
+    if len(value) == 26 and value[19] == ".":
+        if value.endswith(".000000"):
+            value = value[:19]
+        return value[:10] + "T" + value[11:]
+    return datetime.fromisoformat(value).isoformat()
+
+
+def schema_select(model, schema):
+    """
+    (fields, statement, converters) selecting the fields of schema from model,
+    in schema order. DateTime columns are selected as their stored text. Float
+    columns are cast to REAL in SQL, since SQLite hands back whole numbers as
+    int. Category, sub-category and method names are joined in from their
+    dimension tables, which is cheaper than a lookup per row.
+    """
+    fields = list(schema.model_fields)
+    columns = []
+    converters = {}
+    source = model.__table__
+    for index, field in enumerate(fields):
+        if field in DIMENSIONS and hasattr(model, f"{field}_id"):
+            dimension = aliased(DIMENSIONS[field])
+            source = source.outerjoin(dimension, dimension.id == id_column(model, field))
+            column = dimension.name.label(field)
+        else:
+            column = model.__table__.c[field]
+            if isinstance(column.type, DateTime):
+                column = type_coerce(column, String).label(field)
+                converters[index] = iso_datetime
+            elif isinstance(column.type, Float):
+                column = cast(column, Float).label(field)
+        columns.append(column)
+    return fields, select(*columns).select_from(source), converters
+
+
+async def json_array_chunks(statement, fields, converters):
+    """Encode the rows of statement as one JSON array, yielded in chunks."""
+    first = True
+    async with read_session() as db:
+        async for rows in stream_partitions(db, statement, CHUNK_ROWS):
+            items = []
+            for row in rows:
+                if converters:
+                    row = list(row)
+                    for index, convert in converters.items():
+                        if row[index] is not None:
+                            row[index] = convert(row[index])
+                items.append(dict(zip(fields, row)))
+            # Drop the brackets of each encoded chunk and stitch the chunks together
+            body = orjson.dumps(items)[1:-1]
+            yield (b"[" if first else b",") + body
+            first = False
+    yield b"[]" if first else b"]"
+
+
+def stream_rows(model, schema, *order_by):
+    """StreamingResponse with every row of model as a JSON array of schema objects."""
+    fields, statement, converters = schema_select(model, schema)
+    statement = statement.order_by(*order_by)
+    return StreamingResponse(json_array_chunks(statement, fields, converters),
+                             media_type="application/json")
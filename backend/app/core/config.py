@@ -15,6 +15,37 @@ class Settings(BaseSettings):
     # Database configuration
     DATABASE_URL: str = f"sqlite:///{os.path.join(DATABASE_DIR, 'finances.db')}"
 
+    # "concurrent" uses WAL with a pooled read-only engine and a single writer;
+    # "basic" is one engine with SQLite defaults
+    SQLITE_PROFILE: str = "concurrent"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_MMAP_SIZE: int = 268435456
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_READ_POOL_SIZE: int = 8
+
+    # Serve read endpoints through aiosqlite AsyncSessions; when off they run
+    # the sync Session in the threadpool instead
+    ASYNC_DB: bool = True
+
+    # Request and SQL metrics served at /metrics
+    METRICS_ENABLED: bool = True
+
+    # Log statements slower than this many milliseconds (off when unset)
+    SLOW_QUERY_MS: Optional[float] = None
+    SLOW_QUERY_LOG_SIZE: int = 200
+
+    # "memory" computes the summary, income and travel reports with NumPy from
+    # an in-memory columnar snapshot of Transactions and Income, patched after
+    # every sync; "sql" runs them as SQL queries
+    ANALYTICS_ENGINE: str = "sql"
+
+    # Unusual transactions: modified z-score against the category's median/MAD
+    # over the previous ANOMALY_WINDOW_MONTHS months
+    ANOMALY_WINDOW_MONTHS: int = 6
+    ANOMALY_THRESHOLD: float = 3.5
+    ANOMALY_MIN_HISTORY: int = 10
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -0,0 +1,249 @@
+"""
+In-process request and SQL metrics, exposed in Prometheus text format.
+
+MetricsMiddleware times every request per route template. Engine event hooks
+count the SQL statements and SQL time of the request in progress (tracked
+through a context variable), and a session hook counts the rows ORM queries
+return. The sync reports its stage durations here as well.
+"""
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import IteratorResult
+from sqlalchemy.orm import Session
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10_000, 100_000, 1_000_000)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {key: (list(counts), total, count)
+                      for key, (counts, total, count) in self.series.items()}
+        for label_values, (counts, total, count) in sorted(series.items()):
+            labels = format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(
+                    f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+            lines.append(
+                f'{self.name}_bucket{{{labels}{"," if labels else ""}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values."""
+
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, label_values, value=1):
+        with self.lock:
+            self.series[label_values] = self.series.get(
+                label_values, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} counter"]
+        with self.lock:
+            series = dict(self.series)
+        for label_values, value in sorted(series.items()):
+            lines.append(
+                f"{self.name}{{{format_labels(self.labels, label_values)}}} {value}")
+        return lines
+
+
+def format_labels(names, values):
+    return ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_seconds = Histogram(
+    "http_request_duration_seconds", "Request latency by route",
+    ("method", "route", "status"), LATENCY_BUCKETS)
+request_sql_statements = Histogram(
+    "http_request_sql_statements", "SQL statements executed per request",
+    ("method", "route"), COUNT_BUCKETS)
+request_sql_seconds = Histogram(
+    "http_request_sql_seconds", "Total SQL time per request",
+    ("method", "route"), LATENCY_BUCKETS)
+request_sql_rows = Histogram(
+    "http_request_sql_rows", "Rows returned by ORM queries per request",
+    ("method", "route"), ROW_BUCKETS)
+sql_statements = Counter(
+    "sql_statements_total", "SQL statements executed, by statement type", ("type",))
+sync_stage_seconds = Histogram(
+    "sync_stage_duration_seconds", "Time spent in each Notion sync stage per sync",
+    ("stage",), STAGE_BUCKETS)
+sync_runs = Counter(
+    "sync_runs_total", "Finished Notion syncs by mode and status", ("mode", "status"))
+
+REGISTRY = [request_seconds, request_sql_statements, request_sql_seconds, request_sql_rows,
+            sql_statements, sync_stage_seconds, sync_runs]
+
+# [statements, sql seconds, rows] of the request being handled, if any
+_request_stats = ContextVar("request_stats", default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    sql_statements.inc((statement.lstrip()[:6].upper(),))
+    stats = _request_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def count_orm_rows(orm_execute_state):
+    """
+    Count rows returned by ORM selects as the caller reads them, so results
+    are not buffered just to be counted. Streaming queries are left alone.
+    """
+    stats = _request_stats.get()
+    if stats is None or not orm_execute_state.is_select:
+        return None
+    options = orm_execute_state.execution_options
+    if options.get("yield_per") or options.get("stream_results"):
+        return None
+    result = orm_execute_state.invoke_statement()
+    # Rebuilt the way FrozenResult() does, over a counting iterator instead of a list
+    rows = result._raw_row_iterator() if result._source_supports_scalars else iter(result)
+    counted = IteratorResult(result._metadata, _counting(rows, result, stats))
+    counted._attributes = result._attributes
+    counted._source_supports_scalars = result._source_supports_scalars
+    return counted
+
+
+def _counting(rows, result, stats):
+    try:
+        for row in rows:
+            stats[2] += 1
+            yield row
+    finally:
+        # Also runs when a partly read result is closed (first(), one())
+        result.close()
+
+
+def instrument_engine(engine):
+    """Attach the SQL timing hooks to an engine."""
+    if not event.contains(engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def instrument_sessions():
+    """Count rows returned to every ORM session."""
+    if not event.contains(Session, "do_orm_execute", count_orm_rows):
+        event.listen(Session, "do_orm_execute", count_orm_rows)
+
+
+def record_sync(mode, status, stage_seconds):
+    sync_runs.inc((mode, status))
+    for stage, seconds in stage_seconds.items():
+        sync_stage_seconds.observe((stage,), seconds)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and SQL usage per route template."""
+
+    def __init__(self, app):
+        self.app = app
+        self.routes = None
+
+    def route_path(self, scope):
+        # The router stores the matched endpoint in the scope; map it back to its path template
+        endpoint = scope.get("endpoint")
+        if endpoint is not None:
+            if self.routes is None:
+                self.routes = {getattr(route, "endpoint", None): route.path
+                               for route in scope["app"].routes}
+            return self.routes.get(endpoint, "unmatched")
+        # Requests answered before routing (e.g. from the response cache)
+        for route in scope["app"].routes:
+            if route.matches(scope)[0] == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        stats = [0, 0.0, 0]
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            method, route = scope["method"], self.route_path(scope)
+            request_seconds.observe((method, route, str(status[0])), elapsed)
+            request_sql_statements.observe((method, route), stats[0])
+            request_sql_seconds.observe((method, route), stats[1])
+            request_sql_rows.observe((method, route), stats[2])
+
+
+def render(extra=()):
+    """All metrics in Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra)
+    return "\n".join(lines) + "\n"
+
+
+def gauge_lines(name, help, value, type="gauge"):
+    return [f"# HELP {name} {help}", f"# TYPE {name} {type}", f"{name} {value}"]
@@ -1,10 +1,87 @@
-from sqlalchemy import create_engine
+import sqlite3
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import get_settings
 
 settings = get_settings()
 
-# SQLite setup
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+url = make_url(settings.DATABASE_URL)
+in_memory = url.database in (None, "", ":memory:")
+concurrent = settings.SQLITE_PROFILE == "concurrent" and not in_memory
+
+
+def set_sqlite_pragmas(read_only):
+    """Connect hook applying the concurrent storage profile to every new connection."""
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            # WAL is stored in the database file, so readers pick it up too
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return on_connect
+
+
+if concurrent:
+    # Writer: one connection, so sync and budget writes queue up in-process
+    # instead of fighting over the SQLite write lock
+    engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False},
+                           pool_size=1, max_overflow=0,
+                           pool_timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000)
+    event.listen(engine, "connect", set_sqlite_pragmas(read_only=False))
+
+    # Readers: pooled read-only connections. WAL lets them read the last
+    # committed data while a sync is writing
+    read_engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False},
+                                pool_size=settings.SQLITE_READ_POOL_SIZE, max_overflow=0)
+    event.listen(read_engine, "connect", set_sqlite_pragmas(read_only=True))
+else:
+    # SQLite setup
+    engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+    read_engine = engine
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base() 
\ No newline at end of file
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async readers for the read endpoints. aiosqlite runs each connection on its
+# own thread, so requests don't need a threadpool slot while they wait
+async_read_engine = None
+AsyncReadSessionLocal = None
+if settings.ASYNC_DB and not in_memory:
+    # aiosqlite defaults to NullPool, which would reopen the file on every request
+    async_read_engine = create_async_engine(url.set(drivername="sqlite+aiosqlite"),
+                                            poolclass=AsyncAdaptedQueuePool,
+                                            pool_size=settings.SQLITE_READ_POOL_SIZE, max_overflow=0)
+    if concurrent:
+        event.listen(async_read_engine.sync_engine, "connect",
+                     set_sqlite_pragmas(read_only=True))
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
+
+_version_connection = None
+_version_lock = threading.Lock()
+
+
+def storage_version():
+    """
+    SQLite's data_version as seen by a dedicated connection. It changes
+    whenever any other connection commits, including other worker processes.
+    """
+    global _version_connection
+    with _version_lock:
+        if _version_connection is None:
+            _version_connection = sqlite3.connect(
+                url.database, check_same_thread=False)
+        return _version_connection.execute("PRAGMA data_version").fetchone()[0]
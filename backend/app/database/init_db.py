@@ -1,5 +1,108 @@
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
 from app.database.base import Base, engine
+from app.database.search_index import create_search_index, drop_search_index
+from app.models import IncomeRollup, SpendingRollup
+
+logger = logging.getLogger(__name__)
+
+# Text columns replaced by ids into dimension tables: table -> {column: dimension}
+DIMENSION_COLUMNS = {
+    "Transactions": {"category": "Category", "sub_category": "SubCategory", "method": "Method"},
+    "Budget": {"category": "Category"},
+}
+
 
 def init_db():
     """Initialize the database by creating all tables."""
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    reset_rekeyed_rollups()
+    add_missing_columns()
+    move_names_to_dimensions()
+    with engine.begin() as conn:
+        create_search_index(conn)
+
+
+def add_missing_columns():
+    """
+    Add columns and indexes that were added to a model after its table was
+    created. create_all only creates missing tables, so older databases
+    would otherwise keep the old schema.
+    """
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {column["name"]
+                        for column in inspector.get_columns(table.name)}
+            missing = [column for column in table.columns
+                       if column.name not in existing]
+            for column in missing:
+                # SQLite can only add generated columns as VIRTUAL, which is what the models use
+                column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f'ALTER TABLE "{table.name}" ADD COLUMN {column_ddl}'))
+
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+def reset_rekeyed_rollups():
+    """
+    Drop and recreate rollup tables whose primary key changed, e.g. when
+    SpendingRollup moved from category names to ids. Rollups only hold derived
+    data; rollups.rebuild_if_empty fills them again on startup.
+    """
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in (SpendingRollup.__table__, IncomeRollup.__table__):
+            stored_key = inspector.get_pk_constraint(table.name)["constrained_columns"]
+            if stored_key != [column.name for column in table.primary_key]:
+                logger.info(f"Recreating {table.name} with its new primary key")
+                table.drop(bind=conn)
+                table.create(bind=conn)
+
+
+def move_names_to_dimensions():
+    """
+    Databases created before the dimension tables store category, sub_category
+    and method as text. Copy the names into Category, SubCategory and Method,
+    fill in the id columns and drop the text columns, along with the indexes
+    and search index built on them.
+    """
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table_name, columns in DIMENSION_COLUMNS.items():
+            existing = {column["name"]
+                        for column in inspector.get_columns(table_name)}
+            text_columns = {name: dimension for name, dimension in columns.items()
+                            if name in existing}
+            if not text_columns:
+                continue
+
+            logger.info(f"Moving {', '.join(text_columns)} of {table_name} to dimension tables")
+            if table_name == "Transactions":
+                # Its triggers read the text columns
+                drop_search_index(conn)
+            for name, dimension in text_columns.items():
+                conn.execute(text(
+                    f'INSERT OR IGNORE INTO "{dimension}" (name) '
+                    f'SELECT DISTINCT "{name}" FROM "{table_name}" WHERE "{name}" IS NOT NULL'))
+                conn.execute(text(
+                    f'UPDATE "{table_name}" SET "{name}_id" = '
+                    f'(SELECT id FROM "{dimension}" WHERE name = "{table_name}"."{name}")'))
+
+            # SQLite can't drop indexed columns
+            for index in inspector.get_indexes(table_name):
+                if set(index["column_names"]) & set(text_columns):
+                    conn.execute(text(f'DROP INDEX "{index["name"]}"'))
+            for name in text_columns:
+                conn.execute(text(f'ALTER TABLE "{table_name}" DROP COLUMN "{name}"'))
+            for index in Base.metadata.tables[table_name].indexes:
+                index.create(bind=conn, checkfirst=True)
+
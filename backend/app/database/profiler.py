@@ -0,0 +1,135 @@
+"""
+Opt-in slow-query log.
+
+When SLOW_QUERY_MS is set, every statement slower than the threshold is
+logged with its bound parameters, the request that issued it, its duration and
+its EXPLAIN QUERY PLAN, and kept in a bounded ring buffer served at
+/api/v1/debug/slow-queries. Plans that scan a table are flagged, so a query that
+starts full-scanning Transactions shows up as soon as it runs.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, UTC
+
+from sqlalchemy import event
+
+from app.database.query_plans import plan_problems
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+# "METHOD /path?query" of the request being handled, if any
+current_request = ContextVar("current_request", default=None)
+
+
+class SlowQueryLog:
+    """Ring buffer of the most recent slow statements."""
+
+    def __init__(self, threshold_ms=None, max_entries=200):
+        self.threshold_ms = threshold_ms
+        self.entries = deque(maxlen=max_entries)
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.threshold_ms is not None
+
+    def add(self, entry):
+        with self.lock:
+            self.entries.append(entry)
+
+    def snapshot(self):
+        """Entries, newest first."""
+        with self.lock:
+            return list(reversed(self.entries))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def explain_plan(context, statement, parameters):
+    """
+    EXPLAIN QUERY PLAN detail lines, run on the DBAPI connection of the
+    statement's execution context. Never raises: a failed EXPLAIN must not
+    fail the request.
+    """
+    if not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return []
+    explain_cursor = None
+    try:
+        # Not cursor.connection: the aiosqlite adapter cursor has none
+        explain_cursor = context.root_connection.connection.dbapi_connection.cursor()
+        explain_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in explain_cursor.fetchall()]
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+    finally:
+        if explain_cursor is not None:
+            explain_cursor.close()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration_ms = (time.perf_counter() -
+                   conn.info["slow_query_start"].pop()) * 1000
+    if duration_ms < slow_query_log.threshold_ms:
+        return
+
+    # executemany runs one statement per parameter set; explain it with the first one
+    explain_parameters = parameters[0] if executemany and parameters else parameters
+    plan = explain_plan(context, statement, explain_parameters or ())
+    scans = plan_problems(plan)
+    route = current_request.get()
+    entry = {
+        "at": datetime.now(UTC),
+        "route": route,
+        "duration_ms": round(duration_ms, 3),
+        "statement": " ".join(statement.split()),
+        "parameters": list(explain_parameters or ()),
+        "executemany": executemany,
+        "plan": plan,
+        "scans": scans,
+    }
+    slow_query_log.add(entry)
+    logger.warning(f"Slow query ({duration_ms:.1f} ms) from {route or 'background'}: "
+                   f"{entry['statement']} params={entry['parameters']} plan={plan}")
+
+
+def install(engine, threshold_ms, max_entries=200):
+    """Start logging statements on engine that take at least threshold_ms."""
+    slow_query_log.threshold_ms = threshold_ms
+    slow_query_log.entries = deque(slow_query_log.entries, maxlen=max_entries)
+    if not event.contains(engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+class RequestContextMiddleware:
+    """ASGI middleware remembering which request is running, for the slow-query log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        query = scope.get("query_string", b"").decode("latin-1")
+        token = current_request.set(
+            f"{scope['method']} {scope['path']}{'?' + query if query else ''}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_request.reset(token)
@@ -0,0 +1,149 @@
+"""
+Checks the SQLite query plans of the summary, travel and search endpoints.
+
+Calls every summary endpoint, captures the SELECT statements they run and
+prints their EXPLAIN QUERY PLAN. Fails if Transactions or Income is scanned
+instead of searched through an index, or if any table is scanned without an
+index at all. Reading a whole rollup through its primary key index is
+allowed, since rollups only hold one row per month and category/account, and
+so is scanning a dimension table, which holds one row per distinct name.
+
+    python -m app.database.query_plans --db path/to/finances.db
+
+The app reads its settings on import, so the engines are imported lazily,
+after --db has been applied.
+"""
+
+import argparse
+import os
+import re
+import sys
+from contextlib import contextmanager
+from datetime import date
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+BASE_TABLES = ("Transactions", "Income")
+DIMENSION_TABLES = ("Category", "SubCategory", "Method")
+
+
+def summary_endpoints():
+    month = date.today().strftime("%Y-%m")
+    return [
+        f"/api/v1/summary/categories?month={month}",
+        "/api/v1/summary/monthly",
+        "/api/v1/summary/monthly?months=6",
+        "/api/v1/summary/monthly-categories",
+        "/api/v1/summary/monthly-categories?months=6",
+        "/api/v1/summary/aggregate?granularity=quarter&group_by=category&compare=true"
+        "&start_date=2024-01-01",
+        "/api/v1/summary/aggregate?granularity=week&group_by=method&measures=avg"
+        "&start_date=2024-01-01&end_date=2024-03-31",
+        f"/api/v1/income/by-month?month={month}",
+        "/api/v1/budget/vs-actual?start_month=2024-01&end_month=2024-03",
+        "/api/v1/budget/daily?as_of=2024-03-17",
+        "/api/v1/travel/",
+        "/api/v1/search/?q=trip&totals=true",
+    ]
+
+
+def read_engines():
+    """Engines the read endpoints may query through."""
+    from app.database.base import async_read_engine, read_engine
+
+    engines = [read_engine]
+    if async_read_engine is not None:
+        engines.append(async_read_engine.sync_engine)
+    return engines
+
+
+@contextmanager
+def capture_selects(binds=None):
+    """Collect (statement, parameters) of every SELECT run on binds inside the block."""
+    binds = binds or read_engines()
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    for bind in binds:
+        event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for bind in binds:
+            event.remove(bind, "before_cursor_execute", before_cursor_execute)
+
+
+def explain(connection, statement, parameters=()):
+    """EXPLAIN QUERY PLAN detail lines of a statement."""
+    cursor = connection.exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {statement}", parameters)
+    return [row[-1] for row in cursor]
+
+
+def plan_problems(plan):
+    """
+    Plan lines that scan a base table, or scan any other table except a
+    dimension table without an index.
+    """
+    problems = []
+    for line in plan:
+        match = re.match(r"SCAN (\w+)", line)
+        if not match:
+            continue
+        table = match.group(1)
+        if table in BASE_TABLES or ("INDEX" not in line and table not in DIMENSION_TABLES):
+            problems.append(line)
+    return problems
+
+
+def check_summary_endpoints(client):
+    """Return {endpoint: [(statement, plan, problems)]} for every summary endpoint."""
+    from app.database.base import read_engine
+
+    report = {}
+    for url in summary_endpoints():
+        with capture_selects() as statements:
+            response = client.get(url)
+            response.raise_for_status()
+        with read_engine.connect() as connection:
+            report[url] = [
+                (statement, plan, plan_problems(plan))
+                for statement, parameters in statements
+                for plan in [explain(connection, statement, parameters)]
+            ]
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the query plans of the summary endpoints")
+    parser.add_argument("--db", help="SQLite file to check (default: the one in DATABASE_URL)")
+    args = parser.parse_args()
+    if args.db:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    elif not os.environ.get("DATABASE_URL"):
+        parser.error("pass --db or set DATABASE_URL")
+    # Checking a database that doesn't exist would create an empty one
+    path = make_url(os.environ["DATABASE_URL"]).database
+    if not path or not os.path.exists(path):
+        parser.error(f"database {path} does not exist")
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    failed = False
+    for url, results in check_summary_endpoints(TestClient(app)).items():
+        print(f"\n{url}")
+        for statement, plan, problems in results:
+            print("  " + " ".join(statement.split()))
+            for line in plan:
+                flag = "  <-- scan" if line in problems else ""
+                print(f"    {line}{flag}")
+            failed = failed or bool(problems)
+
+    print("\nFAILED: summary queries scan tables" if failed else "\nOK: every summary query uses an index")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,119 @@
+"""
+FTS5 full-text index over the text columns of Transactions.
+
+TransactionsSearch is an external-content FTS5 table: it stores only the
+index, reads the text back through the TransactionsText view (Transactions
+with its dimension names), and is kept in sync by triggers on Transactions, so
+every writer (the Notion sync, the benchmark generator) updates it without
+knowing it exists. Lookups go through the index instead of scanning
+Transactions with LIKE.
+"""
+
+import re
+
+from sqlalchemy import column, inspect, table, text
+
+SEARCH_TABLE = "TransactionsSearch"
+CONTENT_VIEW = "TransactionsText"
+SEARCH_COLUMNS = ("name", "category", "sub_category", "method")
+# Dimension table behind each id column of Transactions
+DIMENSION_TABLES = {"category": "Category", "sub_category": "SubCategory", "method": "Method"}
+
+# Lightweight table construct for queries; the real table is created below,
+# not by Base.metadata.create_all
+search_table = table(SEARCH_TABLE, column("rowid"), column("rank"),
+                     column(SEARCH_TABLE), *(column(name) for name in SEARCH_COLUMNS))
+
+
+def _values(row):
+    """Indexed values of the new/old row in a trigger, with dimension ids resolved to names."""
+    return ", ".join([f"{row}.name"] + [
+        f'(SELECT name FROM "{dimension}" WHERE id = {row}.{name}_id)'
+        for name, dimension in DIMENSION_TABLES.items()])
+
+
+_columns = ", ".join(SEARCH_COLUMNS)
+_id_columns = "name, category_id, sub_category_id, method_id"
+_new_values = _values("new")
+_old_values = _values("old")
+_changed = " OR ".join(f"old.{name} IS NOT new.{name}" for name in _id_columns.split(", "))
+
+CREATE_VIEW = f"""
+CREATE VIEW IF NOT EXISTS "{CONTENT_VIEW}" AS
+SELECT t.id, t.name, c.name AS category, s.name AS sub_category, m.name AS method
+FROM "Transactions" t
+LEFT JOIN "Category" c ON c.id = t.category_id
+LEFT JOIN "SubCategory" s ON s.id = t.sub_category_id
+LEFT JOIN "Method" m ON m.id = t.method_id"""
+
+# prefix='2 3' keeps extra indexes for 2 and 3 character prefixes, so short
+# prefix queries don't have to walk every term starting with them
+CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS "{SEARCH_TABLE}" USING fts5(
+    {_columns},
+    content='{CONTENT_VIEW}', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+)"""
+
+CREATE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS "{SEARCH_TABLE}_insert" AFTER INSERT ON "Transactions" BEGIN
+        INSERT INTO "{SEARCH_TABLE}"(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END""",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS "{SEARCH_TABLE}_delete" AFTER DELETE ON "Transactions" BEGIN
+        INSERT INTO "{SEARCH_TABLE}"("{SEARCH_TABLE}", rowid, {_columns})
+        VALUES ('delete', old.id, {_old_values});
+    END""",
+    # Upserts rewrite every synced column; only reindex rows whose text changed
+    f"""
+    CREATE TRIGGER IF NOT EXISTS "{SEARCH_TABLE}_update"
+    AFTER UPDATE OF {_id_columns} ON "Transactions" WHEN {_changed} BEGIN
+        INSERT INTO "{SEARCH_TABLE}"("{SEARCH_TABLE}", rowid, {_columns})
+        VALUES ('delete', old.id, {_old_values});
+        INSERT INTO "{SEARCH_TABLE}"(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END""",
+]
+
+
+def create_search_index(conn):
+    """
+    Create the FTS5 table and its triggers if they are missing. A newly
+    created index is filled from the rows already in Transactions.
+    """
+    created = not inspect(conn).has_table(SEARCH_TABLE)
+    conn.execute(text(CREATE_VIEW))
+    conn.execute(text(CREATE_TABLE))
+    for trigger in CREATE_TRIGGERS:
+        conn.execute(text(trigger))
+    if created:
+        rebuild(conn)
+
+
+def drop_search_index(conn):
+    """Drop the FTS5 table, its triggers and content view."""
+    for trigger in ("insert", "delete", "update"):
+        conn.execute(text(f'DROP TRIGGER IF EXISTS "{SEARCH_TABLE}_{trigger}"'))
+    conn.execute(text(f'DROP TABLE IF EXISTS "{SEARCH_TABLE}"'))
+    conn.execute(text(f'DROP VIEW IF EXISTS "{CONTENT_VIEW}"'))
+
+
+def rebuild(conn):
+    """Reindex every row of Transactions."""
+    conn.execute(text(f"""INSERT INTO "{SEARCH_TABLE}"("{SEARCH_TABLE}") VALUES ('rebuild')"""))
+
+
+def match_query(query, columns=None):
+    """
+    FTS5 query matching rows that contain every word of query, each word as a
+    prefix ("gro sto" finds "Grocery Store"). Words are quoted, so FTS5 syntax
+    in user input is searched for literally. Returns None if query has no words.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    match = " ".join(f'"{word}"*' for word in words)
+    if columns:
+        match = "{" + " ".join(columns) + "} : (" + match + ")"
+    return match
+
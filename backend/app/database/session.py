@@ -1,8 +1,85 @@
-from app.database.base import SessionLocal
+from contextlib import asynccontextmanager
 
-def get_db():
+from starlette.concurrency import run_in_threadpool
+
+from app.database.base import AsyncReadSessionLocal, ReadSessionLocal, SessionLocal
+
+
+class ThreadpoolSession:
+    """
+    Sync read Session behind the subset of the AsyncSession interface the read
+    endpoints use. Each call runs in the threadpool and returns buffered results.
+    Used when ASYNC_DB is off.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def _execute(self, statement):
+        try:
+            return self.session.execute(statement).freeze()
+        finally:
+            # Hand the connection back right away. Held until teardown, the
+            # read pool runs dry while every threadpool slot is taken by
+            # requests waiting for a connection
+            self.session.close()
+
+    async def execute(self, statement):
+        frozen = await run_in_threadpool(self._execute, statement)
+        return frozen()
+
+    async def scalars(self, statement):
+        return (await self.execute(statement)).scalars()
+
+    async def scalar(self, statement):
+        return (await self.execute(statement)).scalar()
+
+    async def close(self):
+        self.session.close()
+
+
+@asynccontextmanager
+async def read_session():
+    """
+    Read-only session, AsyncSession or ThreadpoolSession depending on ASYNC_DB.
+    Streamed response bodies open their own, since dependencies are torn down
+    before the body is sent.
+    """
+    if AsyncReadSessionLocal is not None:
+        db = AsyncReadSessionLocal()
+    else:
+        db = ThreadpoolSession(ReadSessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def stream_partitions(db, statement, size):
+    """Yield the rows of statement as lists of up to size row tuples."""
+    if isinstance(db, ThreadpoolSession):
+        # Fetch in one threadpool call rather than holding the connection
+        # across threadpool hops for the whole response
+        rows = (await db.execute(statement)).all()
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+        return
+
+    result = await db.stream(statement.execution_options(yield_per=size))
+    async for rows in result.partitions():
+        yield rows
+
+
+async def get_db():
+    """Read-only session for endpoints that only read."""
+    async with read_session() as db:
+        yield db
+
+
+def get_write_db():
+    """Session on the writer engine, for endpoints that change data."""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
@@ -2,6 +2,7 @@ import os
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
 
@@ -11,11 +12,33 @@ from typing import List
 from app.core.config import get_settings
 from app.api.v1.router import api_router
 from app.database.init_db import init_db
+from app.database import base
+from app.database.base import SessionLocal, async_read_engine, engine, read_engine
+from app.core import metrics
+from app.database import profiler
+from app.notion.transport import transport_stats
+from app.services import data_version
+from app.services.cache import response_cache
+from app.services import rollups
+from app.services.snapshot import snapshot
+from app.services.cache import ResponseCacheMiddleware
 settings = get_settings()
 
 # Initialize database
 init_db()
 
+# Fill the summary rollups for databases that predate them
+with SessionLocal() as db:
+    rollups.rebuild_if_empty(db)
+
+# Other uvicorn workers write to the same file; notice their commits too
+if base.concurrent:
+    data_version.watch_external(base.storage_version)
+
+# Load the columnar snapshot now rather than on the first report
+if settings.ANALYTICS_ENGINE == "memory":
+    snapshot.current()
+
 # unsure if all these parameters are needed. Can just work with app=FastAPI()
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -32,6 +55,28 @@ origins = [
     "http://127.0.0.1:5173",
 ]
 
+# Cache read endpoints until the data changes. Added before CORS so that
+# CORS stays the outer middleware and also covers cached responses
+app.add_middleware(ResponseCacheMiddleware)
+
+# Time requests and count their SQL statements. Outside the cache so cache hits are measured too
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+    metrics.instrument_engine(read_engine)
+    if async_read_engine is not None:
+        metrics.instrument_engine(async_read_engine.sync_engine)
+    metrics.instrument_sessions()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Log slow statements together with the request that issued them
+if settings.SLOW_QUERY_MS is not None:
+    profiler.install(engine, settings.SLOW_QUERY_MS, settings.SLOW_QUERY_LOG_SIZE)
+    profiler.install(read_engine, settings.SLOW_QUERY_MS, settings.SLOW_QUERY_LOG_SIZE)
+    if async_read_engine is not None:
+        profiler.install(async_read_engine.sync_engine,
+                         settings.SLOW_QUERY_MS, settings.SLOW_QUERY_LOG_SIZE)
+    app.add_middleware(profiler.RequestContextMiddleware)
+
 # Set up CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -53,6 +98,30 @@ async def root():
         "docs_url": "/docs"
     }
 
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    # aiosqlite keeps a thread per pooled connection
+    if async_read_engine is not None:
+        await async_read_engine.dispose()
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        """Prometheus scrape endpoint."""
+        extra = []
+        for name, value in transport_stats.snapshot().items():
+            extra += metrics.gauge_lines(f"notion_transport_{name}_total",
+                                         f"Notion transport {name.replace('_', ' ')}", value, "counter")
+        extra += metrics.gauge_lines("response_cache_hits_total", "Response cache hits",
+                                     response_cache.hits, "counter")
+        extra += metrics.gauge_lines("response_cache_misses_total", "Response cache misses",
+                                     response_cache.misses, "counter")
+        extra += metrics.gauge_lines("data_version", "Current data version", data_version.current())
+        return PlainTextResponse(metrics.render(extra),
+                                 media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
@@ -1,38 +1,88 @@
 from datetime import datetime, UTC
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Text, Computed, Index, select
+from sqlalchemy.orm import column_property, relationship
 from app.core.enums import AccountType, ChangeType
 
 from app.database.base import Base
 
 
+class Category(Base):
+    __tablename__ = "Category"
+
+    # Dimension tables store each distinct name once; rows refer to it by id
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, nullable=False, unique=True)
+
+
+class SubCategory(Base):
+    __tablename__ = "SubCategory"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, nullable=False, unique=True)
+
+
+class Method(Base):
+    __tablename__ = "Method"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, nullable=False, unique=True)
+
+
+def dimension_name(dimension, id_column):
+    """Read-only attribute with the name behind a dimension id, for queries and responses."""
+    return column_property(
+        select(dimension.name).where(dimension.id == id_column).scalar_subquery())
+
+
 class Transactions(Base):
     __tablename__ = "Transactions"
 
     # internal id trackers
     id = Column(Integer, primary_key=True, autoincrement=True)
     notion_id = Column(String, unique=True, nullable=True)
+    # Hash of the Notion page's values, so the sync only rewrites edited pages
+    content_hash = Column(String, nullable=True)
 
     # Transaction details the user sees
     name = Column(String, default="N/A")
     amount = Column(Float, index=True, default=0)
     date = Column(DateTime, index=True, default=lambda: datetime.now(UTC))
-    category = Column(String, index=True, default="N/A")
-    sub_category = Column(
-        String, default=lambda context: context.get_current_parameters()['category'])
-    method = Column(String, default="N/A")
+    category_id = Column(Integer, ForeignKey("Category.id"))
+    sub_category_id = Column(Integer, ForeignKey("SubCategory.id"))
+    method_id = Column(Integer, ForeignKey("Method.id"))
+
+    # Names, looked up from the dimension tables
+    category = dimension_name(Category, category_id)
+    sub_category = dimension_name(SubCategory, sub_category_id)
+    method = dimension_name(Method, method_id)
+
+    # YYYY-MM bucket of date, generated by SQLite so month grouping can use an index
+    year_month = Column(String, Computed(
+        "strftime('%Y-%m', date)", persisted=False))
 
     # internal metadata
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
     updated_at = Column(DateTime, default=lambda: datetime.now(
         UTC), onupdate=lambda: datetime.now(UTC))
 
+    __table_args__ = (
+        # Covers the monthly rollup aggregation without touching the table
+        Index("ix_Transactions_year_month_category_amount",
+              "year_month", "category_id", "amount"),
+        # Category-filtered pages walk this in date order instead of sorting
+        Index("ix_Transactions_category_date", "category_id", "date"),
+        # Covers the travel summary's sub-category lookups
+        Index("ix_Transactions_sub_category_date_amount", "sub_category_id", "date", "amount"),
+    )
+
 
 class Income(Base):
     __tablename__ = "Income"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     notion_id = Column(String, unique=True, nullable=True)
+    # Hash of the Notion page's values, so the sync only rewrites edited pages
+    content_hash = Column(String, nullable=True)
 
     # Income details
     name = Column(String, default="N/A")
@@ -42,11 +92,19 @@ class Income(Base):
     # Default account for income
     account = Column(String, default="Checking Account")
 
+    # YYYY-MM bucket of date_received, generated by SQLite
+    year_month = Column(String, Computed(
+        "strftime('%Y-%m', date_received)", persisted=False))
+
     # internal metadata
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
     updated_at = Column(DateTime, default=lambda: datetime.now(
         UTC), onupdate=lambda: datetime.now(UTC))
 
+    __table_args__ = (
+        Index("ix_Income_year_month_account", "year_month", "account"),
+    )
+
 
 class Budget(Base):
     __tablename__ = "Budget"
@@ -54,10 +112,92 @@ class Budget(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
 
     # Budget details
-    category = Column(String, index=True, nullable=False, unique=True)
+    category_id = Column(Integer, ForeignKey("Category.id"), index=True, unique=True)
+    category = dimension_name(Category, category_id)
     budget_amount = Column(Float, default=0.0)
 
     # internal metadata
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
     updated_at = Column(DateTime, default=lambda: datetime.now(
         UTC), onupdate=lambda: datetime.now(UTC))
+
+
+class SyncState(Base):
+    __tablename__ = "SyncState"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    # Notion database this state belongs to
+    database_id = Column(String, index=True, nullable=False, unique=True)
+
+    # Highest last_edited_time seen on a successful sync, capped at its start
+    # time (ISO 8601 string in Notion's format)
+    last_edited_watermark = Column(String, nullable=True)
+    last_mode = Column(String, nullable=True)
+    last_synced_at = Column(DateTime, nullable=True)
+
+    # Checkpoint of an interrupted sync: next Notion cursor to fetch, the mode
+    # it ran in, the highest last_edited_time committed so far and the cap on
+    # the watermark taken when it started
+    resume_cursor = Column(String, nullable=True)
+    resume_mode = Column(String, nullable=True)
+    resume_watermark = Column(String, nullable=True)
+    resume_started_at = Column(String, nullable=True)
+
+    # internal metadata
+    created_at = Column(DateTime, default=lambda: datetime.now(UTC))
+    updated_at = Column(DateTime, default=lambda: datetime.now(
+        UTC), onupdate=lambda: datetime.now(UTC))
+
+
+class SyncSeen(Base):
+    __tablename__ = "SyncSeen"
+
+    # notion_ids seen so far by the running full sync, used to find deleted rows
+    notion_id = Column(String, primary_key=True)
+
+
+class SpendingRollup(Base):
+    __tablename__ = "SpendingRollup"
+
+    # Monthly spending per category, kept up to date by the Notion sync
+    year_month = Column(String, primary_key=True)  # YYYY-MM
+    category_id = Column(Integer, ForeignKey("Category.id"), primary_key=True)
+    category = dimension_name(Category, category_id)
+
+    total = Column(Float, default=0.0)
+    count = Column(Integer, default=0)
+    min_amount = Column(Float, nullable=True)
+    max_amount = Column(Float, nullable=True)
+
+
+class DailySpend(Base):
+    __tablename__ = "DailySpend"
+
+    # Spending per category and day with its running total, kept up to date by
+    # the Notion sync. Only days with spending have a row
+    category_id = Column(Integer, ForeignKey("Category.id"), primary_key=True)
+    day = Column(String, primary_key=True)  # YYYY-MM-DD
+    category = dimension_name(Category, category_id)
+
+    total = Column(Float, default=0.0)
+    # Sum of total over every day of the category up to and including this one
+    cumulative = Column(Float, default=0.0)
+
+    __table_args__ = (
+        # Re-accumulating from a day onward reads every category from there
+        Index("ix_DailySpend_day", "day"),
+    )
+
+
+class IncomeRollup(Base):
+    __tablename__ = "IncomeRollup"
+
+    # Monthly income per account, kept up to date by the Notion sync
+    year_month = Column(String, primary_key=True)  # YYYY-MM
+    account = Column(String, primary_key=True)
+
+    total = Column(Float, default=0.0)
+    count = Column(Integer, default=0)
+    min_amount = Column(Float, nullable=True)
+    max_amount = Column(Float, nullable=True)
@@ -8,5 +8,16 @@ load_dotenv()
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
 NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
 
+# Notion HTTP transport (point NOTION_BASE_URL at a fake server for local testing)
+NOTION_BASE_URL = os.getenv("NOTION_BASE_URL", "https://api.notion.com")
+NOTION_TIMEOUT_MS = int(os.getenv("NOTION_TIMEOUT_MS", "60000"))
+NOTION_RATE_LIMIT = float(os.getenv("NOTION_RATE_LIMIT", "3"))  # requests per second
+NOTION_MAX_RETRIES = int(os.getenv("NOTION_MAX_RETRIES", "5"))
+NOTION_BACKOFF_BASE_SECONDS = float(os.getenv("NOTION_BACKOFF_BASE_SECONDS", "0.5"))
+NOTION_BACKOFF_MAX_SECONDS = float(os.getenv("NOTION_BACKOFF_MAX_SECONDS", "30"))
+# The incremental watermark never passes the sync start time minus this
+# overlap (Notion rounds last_edited_time down to the minute)
+NOTION_WATERMARK_OVERLAP_SECONDS = float(os.getenv("NOTION_WATERMARK_OVERLAP_SECONDS", "60"))
+
 # Logging configuration
-LOG_LEVEL = "DEBUG"
\ No newline at end of file
+LOG_LEVEL = "DEBUG"
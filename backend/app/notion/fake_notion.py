@@ -0,0 +1,161 @@
+"""
+A small local stand-in for the Notion API, used to exercise the sync and the
+HTTP transport without a real workspace or API key.
+
+Serves POST /v1/databases/<id>/query with cursor pagination and the
+last_edited_time filter used by incremental syncs. It can also be told to
+throttle (429 + Retry-After) or fail (503) every Nth request.
+
+    python -m app.notion.fake_notion --rows 5000 --port 8765
+    NOTION_BASE_URL=http://127.0.0.1:8765 python -m app.notion.notion_connector
+"""
+
+import argparse
+import json
+import random
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CATEGORIES = ["Food", "Groceries", "Transportation", "Shopping",
+              "Entertainment", "Travel", "Health", "Utilities", "Rent"]
+METHODS = ["Chase", "Amex", "Discover", "Apple", "Debit", "Venmo"]
+
+
+def make_page(page_id, name, amount, date_str, category, sub_category=None, method="Chase",
+              last_edited_time="2024-01-01T00:00:00.000Z"):
+    """Build a page object shaped like the ones in the Finances database."""
+    return {
+        "object": "page",
+        "id": page_id,
+        "last_edited_time": last_edited_time,
+        "properties": {
+            "Name": {"type": "title", "title": [{"text": {"content": name}}]},
+            "Amount": {"type": "number", "number": amount},
+            "Date": {"type": "date", "date": {"start": date_str}},
+            "Method": {"type": "select", "select": {"name": method}},
+            "Category": {"type": "select", "select": {"name": category}},
+            "Subcategory": {"type": "select", "select": {"name": sub_category or category}},
+        },
+    }
+
+
+def generate_pages(count, seed=0, start=date(2020, 1, 1)):
+    """Deterministic list of fake pages spread over four years from start, each last edited on its date."""
+    rng = random.Random(seed)
+    pages = []
+    for i in range(count):
+        day = start + timedelta(days=i * 1460 // max(count, 1))
+        if i % 40 == 0:
+            category, amount = "income", round(rng.uniform(1000, 4000), 2)
+        else:
+            category, amount = rng.choice(
+                CATEGORIES), round(rng.lognormvariate(3, 1), 2)
+        pages.append(make_page(
+            page_id=f"{i:08d}-0000-0000-0000-000000000000",
+            name=f"{category} purchase {i}",
+            amount=amount,
+            date_str=day.isoformat(),
+            category=category,
+            method=rng.choice(METHODS),
+            last_edited_time=f"{day.isoformat()}T12:00:00.000Z",
+        ))
+    return pages
+
+
+class FakeNotion:
+    """In-memory database state shared by the request handlers."""
+
+    def __init__(self, pages=None, throttle_every=0, fail_every=0, retry_after=1):
+        self.pages = {page["id"]: page for page in (pages or [])}
+        self.throttle_every = throttle_every
+        self.fail_every = fail_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def query(self, body):
+        with self.lock:
+            pages = list(self.pages.values())
+
+        edited_filter = (body.get("filter") or {}).get("last_edited_time")
+        if edited_filter:
+            after = edited_filter.get("on_or_after")
+            pages = [page for page in pages if page["last_edited_time"] >= after]
+
+        pages.sort(key=lambda page: (page["properties"]["Date"]["date"]["start"], page["id"]),
+                   reverse=True)
+
+        start = int(body.get("start_cursor") or 0)
+        size = min(int(body.get("page_size") or 100), 100)
+        end = start + size
+        has_more = end < len(pages)
+        return {
+            "object": "list",
+            "results": pages[start:end],
+            "has_more": has_more,
+            "next_cursor": str(end) if has_more else None,
+        }
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            with state.lock:
+                state.requests += 1
+                request_number = state.requests
+
+            if state.throttle_every and request_number % state.throttle_every == 0:
+                return self.send_json(429, {"object": "error", "status": 429, "code": "rate_limited",
+                                            "message": "Rate limited"},
+                                      {"Retry-After": str(state.retry_after)})
+            if state.fail_every and request_number % state.fail_every == 0:
+                return self.send_json(503, {"object": "error", "status": 503, "code": "service_unavailable",
+                                            "message": "Unavailable"})
+
+            parts = self.path.strip("/").split("/")
+            if len(parts) == 4 and parts[:2] == ["v1", "databases"] and parts[3] == "query":
+                return self.send_json(200, state.query(body))
+            return self.send_json(404, {"object": "error", "status": 404, "code": "object_not_found",
+                                        "message": f"Unknown path {self.path}"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(state, host="127.0.0.1", port=0):
+    """Start the fake server on a background thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Notion API server")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--throttle-every", type=int, default=0,
+                        help="Answer every Nth request with 429")
+    parser.add_argument("--fail-every", type=int, default=0,
+                        help="Answer every Nth request with 503")
+    args = parser.parse_args()
+
+    state = FakeNotion(generate_pages(args.rows), args.throttle_every, args.fail_every)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(state))
+    print(f"Fake Notion serving {args.rows} rows on http://127.0.0.1:{args.port}")
+    server.serve_forever()
@@ -1,10 +1,20 @@
-from notion_client import Client
-from datetime import datetime, UTC
+from contextlib import closing, contextmanager
+from datetime import datetime, timedelta, UTC
 
 import logging
+import time
 from app.notion.config import *
 from app.database.base import Base, SessionLocal
-from app.models import Income, Transactions
+from app.models import Income, SyncState, Transactions
+from app.notion.pipeline import prefetch
+from app.notion.transport import get_notion_client
+from app.notion.upsert import (clear_seen_ids, content_hash, date_field,
+                               delete_rows, delete_unseen_rows,
+                               fetch_row_state, record_seen_ids, target_model,
+                               to_row, unseen_months, upsert_rows)
+from app.services import data_version, rollups
+from app.services.dimensions import InternMap
+from app.services.dates import month_key
 
 # Set up logging
 logging.basicConfig(level=LOG_LEVEL)
@@ -12,16 +22,146 @@ logger = logging.getLogger(__name__)
 
 
 class NotionConnector:
-    def __init__(self):
-        self.notion = Client(auth=NOTION_API_KEY)
+    def __init__(self, progress=None):
+        self.notion = get_notion_client()
         self.db = SessionLocal()
-
-    def fetch_notion_transactions(self):
-        """Fetch all transactions from Notion database."""
+        # Category/sub-category/method name -> id, shared by every page of the sync
+        self.dimensions = InternMap(self.db)
+        # Highest last_edited_time seen during the most recent fetch
+        self.latest_edited_time = None
+        # Optional callback(stats, stage_seconds), called after every committed page
+        self.progress = progress
+        # Wall time spent in each sync stage
+        self.stage_seconds = {}
+        # Months changed since the last data_version bump, per model
+        self.changed_months = {Transactions: set(), Income: set()}
+
+    @contextmanager
+    def timed(self, stage):
+        """Add the time spent inside the block to stage_seconds[stage]."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[stage] = self.stage_seconds.get(
+                stage, 0.0) + time.perf_counter() - start
+
+    def take_changes(self):
+        """Changed months per table since the last call, for data_version.bump."""
+        changes = {model.__tablename__: {month for month in months if month}
+                   for model, months in self.changed_months.items()}
+        self.changed_months = {model: set() for model in self.changed_months}
+        return changes
+
+    def publish_changes(self):
+        """Bump data_version after a commit, unless the commit changed no rows."""
+        changes = self.take_changes()
+        if any(changes.values()):
+            data_version.bump("sync", changes)
+        else:
+            # Only the checkpoint was saved
+            data_version.note_own_commit()
+
+    def report_progress(self, stats):
+        if self.progress:
+            self.progress(dict(stats), dict(self.stage_seconds))
+
+    def normalize_page(self, page):
+        """
+        Convert a Notion page into a transaction dict.
+        Returns None for empty rows that should be skipped.
+        """
+        properties = page["properties"]
+
+        # skip empty rows by rejecting those with no name
+        if not properties.get("Name", {}).get("title", [{}]):
+            logger.warning(
+                f"Skipping empty row with ID: {page['id']}")
+            return None
+
+        # Extract transaction data from Notion properties
+        # First get the content inside of each property and check if it is empty
+        name = properties.get("Name", {}).get(
+            "title", [{}])[0].get("text", {})
+        amount = properties.get("Amount", {})
+        date_str = properties.get("Date", {}).get("date", {})
+        method = properties.get("Method", {}).get("select", {})
+        category = properties.get("Category", {}).get("select", {})
+        sub_category = properties.get(
+            "Subcategory", {}).get("select", {})
+
+        # now we can actualy extract the value that is inside the property if it exists
+        if name is not None:
+            name = name.get("content", "")
+        if amount is not None:
+            amount = amount.get("number", 0)
+        if date_str is not None:
+            date_str = date_str.get("start", "")
+        if method is not None:
+            method = method.get("name", "")
+        if category is not None:
+            category = category.get("name", "")
+        if sub_category is not None:
+            sub_category = sub_category.get("name", "")
+
+        # Hashed as Notion sent them, before the defaults below: a page without
+        # a date would otherwise hash differently on every sync
+        page_hash = content_hash([
+            name, float(amount) if amount is not None else None, date_str,
+            method, category, sub_category])
+
+        # Convert date string to datetime object
+        date = datetime.fromisoformat(
+            date_str) if date_str else None
+
+        transaction = {
+            "notion_id": page["id"],
+            "name": name,
+            "amount": amount,
+            "date": date,
+            "method": method,
+            "category": category,
+            "sub_category": sub_category,
+            "content_hash": page_hash
+        }
+
+        # check for missing values and add default + raise warning
+        value_missing = False
+        if transaction["name"] is None:
+            transaction["name"] = "N/A"
+            value_missing = True
+        if transaction["amount"] is None:
+            transaction["amount"] = 0
+            value_missing = True
+        if transaction["date"] is None:
+            transaction["date"] = datetime.now(UTC)
+            value_missing = True
+        if transaction["category"] is None:
+            transaction["category"] = "N/A"
+            value_missing = True
+        if transaction["method"] is None:
+            transaction["method"] = "N/A"
+            value_missing = True
+        if transaction["sub_category"] is None:
+            transaction["sub_category"] = transaction["category"]
+            value_missing = True
+
+        if value_missing:
+            logger.warning(
+                f"Missing one or more values for transaction: '{transaction['name']}' - ensure this is filled out in Notion")
+
+        return transaction
+
+    def fetch_notion_transactions(self, edited_after=None, start_cursor=None):
+        """
+        Fetch transactions from Notion database one page of results at a time.
+        Yields (transactions, next_cursor) per page, where next_cursor is None
+        after the last page. If edited_after is given, only pages whose
+        last_edited_time is on or after that timestamp are returned.
+        """
         try:
-            transactions_list = []
+            fetched_count = 0
             has_more = True
-            start_cursor = None
 
             while has_more:
                 # Prepare query parameters
@@ -34,178 +174,231 @@ class NotionConnector:
                     "page_size": 100  # Maximum allowed by Notion
                 }
 
+                # Notion rounds last_edited_time to the minute, so use on_or_after
+                # and let the upsert absorb pages we have already seen
+                if edited_after:
+                    query_params["filter"] = {
+                        "timestamp": "last_edited_time",
+                        "last_edited_time": {"on_or_after": edited_after}
+                    }
+
                 # Add start_cursor if we have one
                 if start_cursor:
                     query_params["start_cursor"] = start_cursor
 
                 # Make the API call
-                response = self.notion.databases.query(**query_params)
+                with self.timed("fetch"):
+                    response = self.notion.databases.query(**query_params)
 
                 # Process the results
-                for page in response["results"]:
-                    properties = page["properties"]
-
-                    # skip empty rows by rejecting those with no name
-                    if not properties.get("Name", {}).get("title", [{}]):
-                        logger.warning(
-                            f"Skipping empty row with ID: {page['id']}")
-                        continue
-
-                    # Extract transaction data from Notion properties
-                    # First get the content inside of each property and check if it is empty
-                    name = properties.get("Name", {}).get(
-                        "title", [{}])[0].get("text", {})
-                    amount = properties.get("Amount", {})
-                    date_str = properties.get("Date", {}).get("date", {})
-                    method = properties.get("Method", {}).get("select", {})
-                    category = properties.get("Category", {}).get("select", {})
-                    sub_category = properties.get(
-                        "Subcategory", {}).get("select", {})
-
-                    # now we can actualy extract the value that is inside the property if it exists
-                    if name is not None:
-                        name = name.get("content", "")
-                    if amount is not None:
-                        amount = amount.get("number", 0)
-                    if date_str is not None:
-                        date_str = date_str.get("start", "")
-                    if method is not None:
-                        method = method.get("name", "")
-                    if category is not None:
-                        category = category.get("name", "")
-                    if sub_category is not None:
-                        sub_category = sub_category.get("name", "")
-
-                    # Convert date string to datetime object
-                    date = datetime.fromisoformat(
-                        date_str) if date_str else None
-
-                    transaction = {
-                        "notion_id": page["id"],
-                        "name": name,
-                        "amount": amount,
-                        "date": date,
-                        "method": method,
-                        "category": category,
-                        "sub_category": sub_category
-                    }
+                transactions = []
+                with self.timed("normalize"):
+                    for page in response["results"]:
+                        edited_time = page.get("last_edited_time")
+                        if edited_time and (self.latest_edited_time is None or edited_time > self.latest_edited_time):
+                            self.latest_edited_time = edited_time
 
-                    # check for missing values and add default + raise warning
-                    value_missing = False
-                    if transaction["name"] is None:
-                        transaction["name"] = "N/A"
-                        value_missing = True
-                    if transaction["amount"] is None:
-                        transaction["amount"] = 0
-                        value_missing = True
-                    if transaction["date"] is None:
-                        transaction["date"] = datetime.now(UTC)
-                        value_missing = True
-                    if transaction["category"] is None:
-                        transaction["category"] = "N/A"
-                        value_missing = True
-                    if transaction["method"] is None:
-                        transaction["method"] = "N/A"
-                        value_missing = True
-                    if transaction["sub_category"] is None:
-                        transaction["sub_category"] = transaction["category"]
-                        value_missing = True
-
-                    if value_missing:
-                        logger.warning(
-                            f"Missing one or more values for transaction: '{transaction['name']}' - ensure this is filled out in Notion")
-
-                    transactions_list.append(transaction)
+                        transaction = self.normalize_page(page)
+                        if transaction is not None:
+                            transactions.append(transaction)
 
                 # Check if there are more pages
                 has_more = response.get("has_more", False)
-                start_cursor = response.get("next_cursor")
+                start_cursor = response.get("next_cursor") if has_more else None
 
                 # Log progress
+                fetched_count += len(transactions)
                 logger.info(
-                    f"Fetched {len(transactions_list)} transactions so far...")
+                    f"Fetched {fetched_count} transactions so far...")
+
+                yield transactions, start_cursor
 
             logger.info(
-                f"Total transactions fetched: {len(transactions_list)}")
-            return transactions_list
+                f"Total transactions fetched: {fetched_count}")
 
         except Exception as e:
             logger.error(f"Error fetching transactions from Notion: {str(e)}")
             raise
 
-    def sync_to_sqlite(self):
-        """Sync transactions from Notion to SQLite database."""
-        try:
-            # Get transactions from Notion
-            notion_transactions = self.fetch_notion_transactions()
+    def get_sync_state(self):
+        """Get (or create) the sync state row for the configured Notion database."""
+        state = self.db.query(SyncState).filter(
+            SyncState.database_id == NOTION_DATABASE_ID).first()
+        if not state:
+            state = SyncState(database_id=NOTION_DATABASE_ID)
+            self.db.add(state)
+        return state
+
+    def sync_batch(self, transactions, mode, stats):
+        """
+        Upsert one page of normalized transactions.
+        Stored state is prefetched for just this page's ids, so rows that moved
+        between Transactions and Income are detected as well. Returns the
+        number of fetched rows that already existed locally.
+        """
+        # Split Notion rows by the table they are stored in
+        rows_by_model = {Transactions: {}, Income: {}}
+        for transaction in transactions:
+            model = target_model(transaction)
+            rows_by_model[model][transaction["notion_id"]] = to_row(
+                model, transaction, self.dimensions)
+        notion_ids = set(rows_by_model[Transactions]) | set(
+            rows_by_model[Income])
+
+        # Prefetch stored state in one query per table
+        stored = {model: fetch_row_state(self.db, model, notion_ids)
+                  for model in rows_by_model}
+
+        # Months whose rollups have to be recomputed
+        touched_months = {model: set() for model in rows_by_model}
+
+        for model, rows in rows_by_model.items():
+            other_model = Income if model is Transactions else Transactions
+
+            # Only new rows and rows whose content hash differs are written
+            changed_rows = []
+            for notion_id, row in rows.items():
+                current = stored[model].get(notion_id)
+                if current is None:
+                    # A row moving between Transactions and Income is an update
+                    if notion_id in stored[other_model]:
+                        stats["updated"] += 1
+                        touched_months[other_model].add(stored[other_model][notion_id][1])
+                    else:
+                        stats["created"] += 1
+                    changed_rows.append(row)
+                elif current[0] != row["content_hash"]:
+                    stats["updated"] += 1
+                    changed_rows.append(row)
+                    touched_months[model].add(current[1])
+                else:
+                    stats["unchanged"] += 1
+                    continue
+                touched_months[model].add(month_key(row[date_field(model)]))
+
+            upsert_rows(self.db, model, changed_rows)
 
-            # Get all notion_ids from Notion
-            notion_ids = {transaction["notion_id"]
-                          for transaction in notion_transactions}
+            # Rows that moved to the other table
+            delete_rows(self.db, other_model, [
+                notion_id for notion_id in rows if notion_id in stored[other_model]])
+
+        for model, months in touched_months.items():
+            rollups.refresh_months(self.db, model, months)
+            self.changed_months[model] |= months
+
+        if mode == "full":
+            record_seen_ids(self.db, notion_ids)
+
+        return len(set(stored[Transactions]) | set(stored[Income]))
+
+    def sync_to_sqlite(self, full=False):
+        """
+        Sync transactions from Notion to SQLite database.
+        Runs incrementally from the stored last_edited_time watermark unless
+        full is set or no watermark exists yet. Only a full sync can detect
+        rows that were deleted in Notion.
+
+        Pages are streamed through fetch -> normalize -> upsert -> commit, with
+        the next page fetched in the background while the current one is
+        written. Every commit checkpoints the next cursor so an interrupted
+        sync resumes where it stopped.
+        """
+        try:
+            state = self.get_sync_state()
+            watermark = state.last_edited_watermark
+            # Pages edited while the sync runs may be missed by it, so the
+            # watermark must not move past the time it started
+            started_at = (datetime.now(UTC) - timedelta(seconds=NOTION_WATERMARK_OVERLAP_SECONDS)
+                          ).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+            # An explicit full sync only resumes an interrupted full sync
+            resumed = bool(state.resume_cursor) and (
+                not full or state.resume_mode == "full")
+            if resumed:
+                mode = state.resume_mode
+                start_cursor = state.resume_cursor
+                self.latest_edited_time = state.resume_watermark
+                started_at = state.resume_started_at or started_at
+                logger.info(f"Resuming interrupted {mode} sync")
+            else:
+                mode = "full" if full or not watermark else "incremental"
+                start_cursor = None
+                clear_seen_ids(self.db)
 
             # Track statistics
             stats = {
-                "total": len(notion_transactions),
+                "mode": mode,
+                "resumed": resumed,
+                "pages": 0,
+                "total": 0,
                 "created": 0,
                 "updated": 0,
                 "deleted": 0,
-                "errors": 0
+                "unchanged": 0,
+                "skipped": 0
             }
-
-            # Find transactions that exist in database but not in Notion
-            db_transactions = self.db.query(Transactions).all()
-            for row_transaction in db_transactions:
-                if row_transaction.notion_id not in notion_ids:
-                    # Delete transaction that no longer exists in Notion
-                    self.db.delete(row_transaction)
-                    stats["deleted"] += 1
-
-            for transaction_data in notion_transactions:
-                try:
-                    # Check if transaction already exists
-                    existing_transaction = self.db.query(Transactions).filter(
-                        Transactions.notion_id == transaction_data["notion_id"]
-                    ).first()
-
-                    if existing_transaction:
-                        # Update existing transaction
-                        any_updates = False
-                        for key, value in transaction_data.items():
-                            if getattr(existing_transaction, key) != value:
-                                setattr(existing_transaction, key, value)
-                                any_updates = True
-                        if any_updates:
-                            stats["updated"] += 1
-                    else:
-                        if transaction_data["category"] == "income":
-                            new_income = Income(
-                                notion_id=transaction_data["notion_id"],
-                                name=transaction_data["name"],
-                                amount=transaction_data["amount"],
-                                date_received=transaction_data["date"],
-                                account=transaction_data["method"]
-                            )
-                            self.db.add(new_income)
-                            logger.info(
-                                f"Created new income: {new_income.name}")
-                        else:
-                            # Create new transaction
-                            new_transaction = Transactions(**transaction_data)
-                            self.db.add(new_transaction)
-                        stats["created"] += 1
-
-                except Exception as e:
-                    logger.error(
-                        f"Error processing transaction {transaction_data.get('notion_id')} with name {transaction_data.get('name')}: {str(e)}")
-                    stats["errors"] += 1
-                    continue
+            refetched_count = 0
+
+            pages = prefetch(self.fetch_notion_transactions(
+                edited_after=watermark if mode == "incremental" else None,
+                start_cursor=start_cursor))
+
+            with closing(pages):
+                for transactions, next_cursor in pages:
+                    with self.timed("upsert"):
+                        refetched_count += self.sync_batch(
+                            transactions, mode, stats)
+                    stats["pages"] += 1
+                    stats["total"] += len(transactions)
+
+                    # Checkpoint: rows and cursor land in the same commit
+                    state.resume_cursor = next_cursor
+                    state.resume_mode = mode if next_cursor else None
+                    state.resume_watermark = self.latest_edited_time
+                    state.resume_started_at = started_at
+                    with self.timed("commit"):
+                        self.db.commit()
+                    self.publish_changes()
+                    self.report_progress(stats)
+
+            if mode == "full":
+                # Rows that no longer exist in Notion
+                with self.timed("cleanup"):
+                    for model in (Transactions, Income):
+                        months = unseen_months(self.db, model)
+                        stats["deleted"] += delete_unseen_rows(self.db, model)
+                        rollups.refresh_months(self.db, model, months)
+                        self.changed_months[model] |= months
+                    clear_seen_ids(self.db)
+            else:
+                # Rows already stored locally that Notion did not send back
+                stored_count = (self.db.query(Transactions).count() +
+                                self.db.query(Income).count())
+                stats["skipped"] = stored_count - \
+                    refetched_count - stats["created"]
+
+            # Advance the watermark once every page is in, up to the start
+            latest = min(self.latest_edited_time, started_at) if self.latest_edited_time else None
+            if latest and (watermark is None or latest > watermark):
+                state.last_edited_watermark = latest
+            state.resume_cursor = None
+            state.resume_mode = None
+            state.resume_watermark = None
+            state.resume_started_at = None
+            state.last_mode = mode
+            state.last_synced_at = datetime.now(UTC)
 
             # Commit changes
-            self.db.commit()
+            with self.timed("commit"):
+                self.db.commit()
+            self.publish_changes()
+            self.report_progress(stats)
 
             # Log sync results
-            logger.info(f"Sync completed: {stats['total']} total, {stats['created']} created, "
-                        f"{stats['updated']} updated, {stats['errors']} errors")
+            logger.info(f"Sync completed ({mode}): {stats['total']} total over {stats['pages']} pages, "
+                        f"{stats['created']} created, {stats['updated']} updated, "
+                        f"{stats['deleted']} deleted, {stats['unchanged']} unchanged, "
+                        f"{stats['skipped']} skipped")
 
             return stats
 
@@ -217,16 +410,18 @@ class NotionConnector:
             self.db.close()
 
 
-def sync_transactions():
+def sync_transactions(full=False, progress=None):
     """Convenience function to run the sync process."""
-    connector = NotionConnector()
-    return connector.sync_to_sqlite()
+    connector = NotionConnector(progress=progress)
+    return connector.sync_to_sqlite(full=full)
 
 
 if __name__ == "__main__":
-    # Test the sync process
+    import sys
+
+    # Test the sync process, pass --full to force a full resync
     try:
-        stats = sync_transactions()
+        stats = sync_transactions(full="--full" in sys.argv)
         print(f"Sync completed successfully: {stats}")
     except Exception as e:
         print(f"Sync failed: {str(e)}")
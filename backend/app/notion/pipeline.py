@@ -0,0 +1,60 @@
+"""
+Helpers for running the Notion sync as overlapping stages.
+"""
+
+import queue
+import threading
+
+_DONE = object()
+
+
+def prefetch(iterable, depth=1, join_timeout=1):
+    """
+    Consume iterable on a background thread, keeping at most depth items
+    buffered ahead of the caller. Lets the next Notion page download while the
+    current one is being written. Exceptions raised by the producer are
+    re-raised in the caller; closing the returned generator stops the producer
+    and waits up to join_timeout seconds (None: until it has finished) for it
+    to close iterable.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(item):
+        # Give up when the consumer has gone away instead of blocking forever
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_DONE, e))
+        finally:
+            # Let a generator release what it holds (sessions, connections) right away
+            close = getattr(iterable, "close", None)
+            if close:
+                close()
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+        producer.join(timeout=join_timeout)
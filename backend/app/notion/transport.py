@@ -0,0 +1,176 @@
+"""
+HTTP transport for the Notion API.
+
+One pooled keep-alive httpx client is shared by every sync. Requests pass
+through a token-bucket limiter sized to Notion's ~3 requests/second budget,
+and 429 / transient 5xx responses are retried with exponential backoff and
+full jitter, waiting for Retry-After when Notion sends it.
+"""
+
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, UTC
+
+import httpx
+from notion_client import Client
+
+from app.notion.config import (NOTION_API_KEY, NOTION_BACKOFF_BASE_SECONDS,
+                               NOTION_BACKOFF_MAX_SECONDS, NOTION_BASE_URL,
+                               NOTION_MAX_RETRIES, NOTION_RATE_LIMIT,
+                               NOTION_TIMEOUT_MS)
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: refills at rate tokens/second up to capacity."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens +
+                                  (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class TransportStats:
+    """Counters describing how the Notion transport has behaved so far."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,
+            "server_errors": 0,
+            "connection_errors": 0,
+            "rate_limit_wait_seconds": 0.0,
+            "backoff_seconds": 0.0,
+        }
+
+    def add(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+def retry_after_seconds(response):
+    """Parse a Retry-After header (delta-seconds or HTTP date). Returns None if absent."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(UTC)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryingTransport(httpx.BaseTransport):
+    """
+    httpx transport that rate limits requests and retries throttled or
+    transiently failed ones before handing the response to notion_client.
+    """
+
+    def __init__(self, transport=None, rate_limit=NOTION_RATE_LIMIT, max_retries=NOTION_MAX_RETRIES,
+                 backoff_base=NOTION_BACKOFF_BASE_SECONDS, backoff_max=NOTION_BACKOFF_MAX_SECONDS,
+                 stats=None, sleep=time.sleep):
+        self.transport = transport or httpx.HTTPTransport(
+            limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60))
+        self.bucket = TokenBucket(rate_limit)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = stats or TransportStats()
+        self.sleep = sleep
+
+    def backoff(self, attempt, response=None):
+        """Seconds to wait before retry number attempt (0-based)."""
+        if response is not None:
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None:
+                return retry_after
+        # Full jitter: uniform between 0 and the exponential cap
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def handle_request(self, request):
+        # The body has to be buffered so it can be re-sent on retry
+        request.read()
+        attempt = 0
+        while True:
+            self.stats.add("rate_limit_wait_seconds", self.bucket.acquire())
+            self.stats.add("requests")
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError as e:
+                self.stats.add("connection_errors")
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(
+                    f"Notion request failed ({e!r}), retrying in {delay:.2f}s")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return response
+                if response.status_code == 429:
+                    self.stats.add("throttled")
+                else:
+                    self.stats.add("server_errors")
+                if attempt >= self.max_retries:
+                    return response
+                delay = self.backoff(attempt, response)
+                response.close()
+                logger.warning(
+                    f"Notion returned {response.status_code}, retrying in {delay:.2f}s")
+
+            attempt += 1
+            self.stats.add("retries")
+            self.stats.add("backoff_seconds", delay)
+            self.sleep(delay)
+
+    def close(self):
+        self.transport.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+transport_stats = TransportStats()
+
+
+def get_notion_client():
+    """Shared Notion client backed by the pooled, rate-limited transport."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            http_client = httpx.Client(
+                transport=RetryingTransport(stats=transport_stats))
+            _client = Client(auth=NOTION_API_KEY, client=http_client,
+                             base_url=NOTION_BASE_URL, timeout_ms=NOTION_TIMEOUT_MS)
+        return _client
@@ -0,0 +1,157 @@
+"""
+Set-based writes for the Notion sync: prefetch stored row state, upsert in
+batches with ON CONFLICT(notion_id) DO UPDATE and delete by notion_id sets.
+"""
+
+import hashlib
+import json
+from datetime import datetime, UTC
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models import Income, SyncSeen, Transactions
+
+# Columns synced from Notion for each table (besides notion_id). Category,
+# sub-category and method are stored as ids into their dimension tables
+TRANSACTION_FIELDS = ("name", "amount", "date",
+                      "category_id", "sub_category_id", "method_id", "content_hash")
+INCOME_FIELDS = ("name", "amount", "date_received", "account", "content_hash")
+
+# Part of every content hash. Bump it when the way pages are mapped onto rows
+# changes, so the next sync rewrites every row once
+CONTENT_HASH_VERSION = 1
+
+# Keep IN (...) lists and multi-row inserts well below SQLite's variable limit
+BATCH_SIZE = 500
+
+
+def sync_fields(model):
+    """Columns synced from Notion for the given model."""
+    return INCOME_FIELDS if model is Income else TRANSACTION_FIELDS
+
+
+def date_field(model):
+    """Name of the date column of the given model."""
+    return "date_received" if model is Income else "date"
+
+
+def target_model(transaction):
+    """Notion rows with the 'income' category are stored in the Income table."""
+    return Income if transaction["category"] == "income" else Transactions
+
+
+def content_hash(values):
+    """
+    Stable hash of a page's normalized Notion values (JSON-serializable), stored
+    with its row. Pages whose hash did not change are not written again.
+    """
+    encoded = json.dumps([CONTENT_HASH_VERSION, *values], separators=(",", ":"),
+                         ensure_ascii=False).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def to_row(model, transaction, dimensions):
+    """
+    Map a normalized Notion transaction onto the columns of the given model.
+    dimensions is the InternMap resolving category/sub_category/method names.
+    """
+    if model is Income:
+        return {
+            "notion_id": transaction["notion_id"],
+            "name": transaction["name"],
+            "amount": transaction["amount"],
+            "date_received": transaction["date"],
+            "account": transaction["method"],
+            "content_hash": transaction["content_hash"]
+        }
+    return dimensions.encode({
+        "notion_id": transaction["notion_id"],
+        **{field: transaction[field] for field in
+           ("name", "amount", "date", "category", "sub_category", "method", "content_hash")}
+    })
+
+
+def chunked(items, size=BATCH_SIZE):
+    """Split a sequence into lists of at most size items."""
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def fetch_row_state(db, model, notion_ids=None):
+    """
+    Return {notion_id: (content_hash, year_month)} for stored rows of the given
+    model. Loads every row in a single query when notion_ids is None,
+    otherwise only the requested ids.
+    """
+    columns = [model.notion_id, model.content_hash, model.year_month]
+
+    if notion_ids is None:
+        rows = db.execute(select(*columns)).all()
+    else:
+        rows = []
+        for chunk in chunked(notion_ids):
+            rows.extend(db.execute(
+                select(*columns).where(model.notion_id.in_(chunk))).all())
+
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def upsert_rows(db, model, rows):
+    """Insert or update rows keyed on notion_id, one multi-row statement per batch."""
+    if not rows:
+        return
+    fields = sync_fields(model)
+    for batch in chunked(rows):
+        stmt = sqlite_insert(model).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[model.notion_id],
+            set_={**{field: stmt.excluded[field] for field in fields},
+                  "updated_at": datetime.now(UTC)}
+        )
+        db.execute(stmt)
+
+
+def delete_rows(db, model, notion_ids):
+    """Delete rows of the given model by notion_id. Returns the number removed."""
+    deleted = 0
+    for chunk in chunked(notion_ids):
+        result = db.execute(
+            delete(model)
+            .where(model.notion_id.in_(chunk))
+            .execution_options(synchronize_session=False)
+        )
+        deleted += result.rowcount
+    return deleted
+
+
+def record_seen_ids(db, notion_ids):
+    """Remember notion_ids seen by the running full sync."""
+    for chunk in chunked(notion_ids):
+        db.execute(sqlite_insert(SyncSeen).values(
+            [{"notion_id": notion_id} for notion_id in chunk]).on_conflict_do_nothing())
+
+
+def clear_seen_ids(db):
+    """Forget the notion_ids recorded by a previous full sync."""
+    db.execute(delete(SyncSeen))
+
+
+def unseen_months(db, model):
+    """YYYY-MM months of the rows the full sync did not see."""
+    return set(db.execute(
+        select(model.year_month)
+        .distinct()
+        .where(model.notion_id.not_in(select(SyncSeen.notion_id)))
+    ).scalars())
+
+
+def delete_unseen_rows(db, model):
+    """Delete rows of the given model that the full sync did not see. Returns the number removed."""
+    result = db.execute(
+        delete(model)
+        .where(model.notion_id.not_in(select(SyncSeen.notion_id)))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
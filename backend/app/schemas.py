@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import Annotated, Any, Optional, List, Dict, Literal, Union
 from app.core.enums import AccountType
 
 
@@ -20,6 +20,110 @@ class TransactionResponse(BaseModel):
         from_attributes = True
 
 
+class TransactionPage(BaseModel):
+    items: List[TransactionResponse]
+    next_cursor: Optional[str]
+    has_more: bool
+
+
+class SearchTotals(BaseModel):
+    count: int
+    amount: float
+
+
+class SearchResponse(BaseModel):
+    items: List[TransactionResponse]
+    has_more: bool
+    totals: Optional[SearchTotals] = None
+
+
+class AggregationRow(BaseModel):
+    bucket: str
+    groups: Dict[str, Optional[str]]
+    values: Dict[str, Optional[Union[int, float]]]
+    previous: Optional[Dict[str, Optional[Union[int, float]]]] = None
+    change: Optional[Dict[str, Optional[float]]] = None
+
+
+class AggregationResponse(BaseModel):
+    source: str
+    granularity: str
+    start: Optional[date]
+    end: Optional[date]
+    previous_start: Optional[date]
+    group_by: List[str]
+    measures: List[str]
+    rollup: bool
+    rows: List[AggregationRow]
+
+
+class MonthlyWidget(BaseModel):
+    type: Literal["monthly"]
+    months: Optional[int] = None
+
+
+class CategoriesWidget(BaseModel):
+    type: Literal["categories"]
+    month: str
+
+
+class MonthlyCategoriesWidget(BaseModel):
+    type: Literal["monthly_categories"]
+    months: Optional[int] = None
+
+
+class IncomeByMonthWidget(BaseModel):
+    type: Literal["income_by_month"]
+    month: str
+
+
+class BudgetsWidget(BaseModel):
+    type: Literal["budgets"]
+
+
+class AggregateWidget(BaseModel):
+    type: Literal["aggregate"]
+    source: Literal["spending", "income"] = "spending"
+    granularity: Literal["day", "week", "month", "quarter", "year"] = "month"
+    group_by: List[Literal["category", "sub_category", "method", "account"]] = []
+    measures: List[Literal["sum", "count", "avg", "max"]] = ["sum"]
+    compare: bool = False
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+
+DashboardWidget = Annotated[
+    Union[MonthlyWidget, CategoriesWidget, MonthlyCategoriesWidget,
+          IncomeByMonthWidget, BudgetsWidget, AggregateWidget],
+    Field(discriminator="type"),
+]
+
+
+class DashboardRequest(BaseModel):
+    widgets: List[DashboardWidget]
+
+
+class DashboardResponse(BaseModel):
+    # One entry per widget, in request order, shaped like the widget's own endpoint
+    results: List[Any]
+
+
+class AnomalyItem(BaseModel):
+    transaction: TransactionResponse
+    # Modified z-score against the category's previous months
+    score: float
+    median: float
+    history: int
+
+
+class AnomalyResponse(BaseModel):
+    items: List[AnomalyItem]
+    total: int
+    has_more: bool
+    threshold: float
+    window_months: int
+
+
 class IncomeResponse(BaseModel):
     id: int
     notion_id: Optional[str]
@@ -66,3 +170,88 @@ class BudgetCreate(BaseModel):
 
 class BudgetUpdate(BaseModel):
     budget_amount: float
+
+
+class BudgetVsActualRow(BaseModel):
+    category: str
+    budget: float
+    spent: float
+    remaining: float
+    percent_used: Optional[float]
+    over_budget: bool
+
+
+class BudgetVsActualResponse(BaseModel):
+    start_month: str
+    end_month: str
+    months: int
+    total_budget: float
+    total_spent: float
+    categories: List[BudgetVsActualRow]
+
+
+class DailyBudgetDay(BaseModel):
+    day: date
+    spent: float
+    remaining: float
+
+
+class DailyBudgetCategory(BaseModel):
+    category: str
+    budget: float
+    spent: float
+    remaining: float
+    daily_allowance: Optional[float]
+    over_budget: bool
+    series: List[DailyBudgetDay]
+
+
+class DailyBudgetResponse(BaseModel):
+    month: str
+    as_of: date
+    days_in_month: int
+    remaining_days: int
+    total_budget: float
+    total_spent: float
+    daily_allowance: Optional[float]
+    categories: List[DailyBudgetCategory]
+
+
+class SyncProgress(BaseModel):
+    pages_fetched: int
+    rows_fetched: int
+    rows_created: int
+    rows_updated: int
+    rows_deleted: int
+    rows_unchanged: int
+    rows_skipped: int
+
+
+class SyncJobResponse(BaseModel):
+    id: str
+    status: str
+    full: bool
+    mode: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    progress: SyncProgress
+    stage_seconds: Dict[str, float]
+    error: Optional[str]
+
+
+class SlowQuery(BaseModel):
+    at: datetime
+    route: Optional[str]
+    duration_ms: float
+    statement: str
+    parameters: List[Any]
+    executemany: bool
+    plan: List[str]
+    scans: List[str]
+
+
+class SlowQueryLogResponse(BaseModel):
+    enabled: bool
+    threshold_ms: Optional[float]
+    queries: List[SlowQuery]
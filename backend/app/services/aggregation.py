@@ -0,0 +1,443 @@
+"""
+Time-bucket aggregation of spending and income.
+
+An Aggregation describes a report (granularity, date range, group-by
+dimensions, measures, optional comparison with the previous period) and
+compiles it into one SQL statement:
+
+- month, quarter and year buckets read the monthly rollups when the report
+  only groups and filters by category (spending) or account (income);
+  otherwise they range-scan the (year_month, ...) index of the base table
+- day and week buckets range-scan the date index of the base table
+- the previous period is read by the same statement: the range is widened
+  to cover it, its rows are shifted forward onto the current buckets, and
+  every measure is computed twice with FILTER (WHERE current/previous)
+
+Date ranges are widened to whole buckets, so a weekly report starting on a
+Wednesday starts on that week's Monday.
+
+With ANALYTICS_ENGINE=memory the same report is computed with NumPy from the
+in-memory snapshot instead (compute), with the same rows as the SQL path.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import Integer, String, case, cast, func, literal, select
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.models import Income, IncomeRollup, SpendingRollup, Transactions
+from app.services.dates import EPOCH, day_number, month_key
+from app.services.dimensions import DIMENSIONS, id_column, ids_of
+from app.services.snapshot import snapshot
+
+settings = get_settings()
+
+GRANULARITIES = ("day", "week", "month", "quarter", "year")
+MEASURES = ("sum", "count", "avg", "max")
+
+# Data each source reads and the dimensions it can be grouped by
+SOURCES = {
+    "spending": {
+        "model": Transactions,
+        "date": Transactions.date,
+        "rollup": SpendingRollup,
+        "dimensions": ("category", "sub_category", "method"),
+        "rollup_dimension": "category",
+    },
+    "income": {
+        "model": Income,
+        "date": Income.date_received,
+        "rollup": IncomeRollup,
+        "dimensions": ("account",),
+        "rollup_dimension": "account",
+    },
+}
+
+# granularity -> (strftime format of a bucket key, suffix making a key a
+# date SQLite can shift, months per bucket or None for day-based buckets,
+# days per bucket)
+BUCKETS = {
+    "day": ("%Y-%m-%d", "", None, 1),
+    "week": ("%Y-%m-%d", "", None, 7),
+    "month": ("%Y-%m", "-01", 1, None),
+    "quarter": ("%Y-%m", "-01", 3, None),
+    "year": ("%Y", "-01-01", 12, None),
+}
+
+
+def bucket_start(granularity, day):
+    """First day of the bucket containing day. Weeks start on Monday."""
+    if granularity == "week":
+        return day - relativedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "quarter":
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    if granularity == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def buckets_later(granularity, n):
+    """relativedelta of n buckets."""
+    _, _, months, days = BUCKETS[granularity]
+    return relativedelta(months=months * n) if months else relativedelta(days=days * n)
+
+
+def bucket_label(granularity, key):
+    """Display label of a bucket key: 2024-03-18, 2024-03, 2024-Q1, 2024."""
+    if granularity == "quarter":
+        return f"{key[:4]}-Q{(int(key[5:7]) - 1) // 3 + 1}"
+    return key
+
+
+def group_index(keys):
+    """
+    (distinct keys in order, group of every key) for non-negative integer
+    keys: by counting when the keys are dense, else by sorting.
+    """
+    span = int(keys.max()) + 1
+    if span <= 4 * len(keys):
+        present = np.flatnonzero(np.bincount(keys, minlength=span))
+        position = np.zeros(span, dtype=np.int64)
+        position[present] = np.arange(len(present))
+        return present, position[keys]
+    present, groups = np.unique(keys, return_inverse=True)
+    return present, groups.reshape(-1)
+
+
+def group_measures(groups, count, amounts, measures, where=None):
+    """
+    {measure: value of each of count groups} from the group index and amount
+    of every row, over the rows in where (a mask, or every row). Groups
+    without rows get a count of 0 and None for the other measures.
+    """
+    if where is not None:
+        groups, amounts = groups[where], amounts[where]
+    counts = np.bincount(groups, minlength=count)
+    sums = np.bincount(groups, weights=amounts, minlength=count)
+    values = {}
+    if "count" in measures:
+        values["count"] = counts.tolist()
+    if "sum" in measures:
+        values["sum"] = [total if n else None for total, n in zip(sums.tolist(), counts.tolist())]
+    if "avg" in measures:
+        values["avg"] = [total / n if n else None for total, n in zip(sums.tolist(), counts.tolist())]
+    if "max" in measures:
+        maxes = np.zeros(count)
+        nonempty = np.flatnonzero(counts)
+        if len(nonempty):
+            order = np.argsort(groups, kind="stable")
+            starts = np.searchsorted(groups[order], nonempty)
+            maxes[nonempty] = np.maximum.reduceat(amounts[order], starts)
+        values["max"] = [highest if n else None for highest, n in zip(maxes.tolist(), counts.tolist())]
+    return values
+
+
+class Aggregation:
+    """
+    One aggregation report. Raises ValueError for combinations that don't
+    make sense, e.g. grouping income by category.
+
+    filters is an optional TransactionFilters; its start_date/end_date are the
+    report range and its other filters narrow the rows.
+    """
+
+    def __init__(self, source="spending", granularity="month", group_by=(),
+                 measures=("sum",), compare=False, filters=None, today=None):
+        if source not in SOURCES:
+            raise ValueError(f"Unknown source '{source}'")
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity '{granularity}'")
+        spec = SOURCES[source]
+        for dimension in group_by:
+            if dimension not in spec["dimensions"]:
+                raise ValueError(f"{source} can't be grouped by {dimension}")
+        for measure in measures:
+            if measure not in MEASURES:
+                raise ValueError(f"Unknown measure '{measure}'")
+        if not measures:
+            raise ValueError("At least one measure is required")
+
+        self.source = source
+        self.spec = spec
+        self.model = spec["model"]
+        self.granularity = granularity
+        self.group_by = list(dict.fromkeys(group_by))
+        self.measures = list(dict.fromkeys(measures))
+        self.compare = compare
+        self.filters = filters
+
+        # Report range as whole buckets, end exclusive
+        start_date = filters.start_date if filters else None
+        end_date = filters.end_date if filters else None
+        if compare and start_date is None:
+            raise ValueError("Comparing with the previous period needs a start_date")
+        if compare and end_date is None:
+            end_date = today or date.today()
+        self.start = bucket_start(granularity, start_date) if start_date else None
+        self.end = (bucket_start(granularity, end_date) + buckets_later(granularity, 1)
+                    if end_date else None)
+
+        # The previous period has as many buckets as the report, right before it
+        self.previous_start = None
+        self.shift = None
+        if compare:
+            count = 0
+            while self.start + buckets_later(granularity, count) < self.end:
+                count += 1
+            self.previous_start = self.start - buckets_later(granularity, count)
+            self.shift = count
+
+        self.use_rollup = self._rollup_applies()
+
+    def _rollup_applies(self):
+        if self.granularity not in ("month", "quarter", "year"):
+            return False
+        allowed = {self.spec["rollup_dimension"]}
+        if not set(self.group_by) <= allowed:
+            return False
+        filters = self.filters
+        if filters is None:
+            return True
+        if filters.min_amount is not None or filters.max_amount is not None:
+            return False
+        return not any(getattr(filters, name) for name in DIMENSIONS
+                       if name not in allowed)
+
+    def _table(self):
+        return self.spec["rollup"] if self.use_rollup else self.model
+
+    def _bucket_key(self):
+        """SQL expression with the bucket key of a row."""
+        table = self._table()
+        if self.granularity in ("day", "week"):
+            modifiers = ("-6 days", "weekday 1") if self.granularity == "week" else ()
+            return func.strftime("%Y-%m-%d", self.spec["date"], *modifiers, type_=String)
+        year_month = table.year_month
+        if self.granularity == "month":
+            return year_month
+        if self.granularity == "year":
+            return func.substr(year_month, 1, 4, type_=String)
+        # Quarter: the year_month of the quarter's first month
+        months_back = (cast(func.substr(year_month, 6, 2), Integer) - 1) % 3
+        return func.strftime("%Y-%m", year_month + "-01",
+                             "-" + cast(months_back, String) + " months", type_=String)
+
+    def _shifted(self, key):
+        """key moved forward by the length of the report, onto its current bucket."""
+        format, suffix, months, days = BUCKETS[self.granularity]
+        modifier = (f"+{months * self.shift} months" if months
+                    else f"+{days * self.shift} days")
+        return func.strftime(format, key + literal(suffix) if suffix else key, modifier,
+                             type_=String)
+
+    def _range(self, start, end):
+        """Conditions selecting rows in [start, end), either end may be None."""
+        conditions = []
+        if self.granularity in ("day", "week"):
+            column = self.spec["date"]
+            if start:
+                conditions.append(column >= datetime.combine(start, time.min))
+            if end:
+                conditions.append(column < datetime.combine(end, time.min))
+        else:
+            # Whole months: compare the indexed year_month column
+            column = self._table().year_month
+            if start:
+                conditions.append(column >= month_key(start))
+            if end:
+                conditions.append(column < month_key(end))
+        return conditions
+
+    def _dimension(self, name):
+        """(group by column, name column) of a dimension."""
+        table = self._table()
+        if name == "account":
+            return table.account, table.account
+        return id_column(table, name), getattr(table, name)
+
+    def _measure(self, measure, where=None):
+        if self.use_rollup:
+            table = self._table()
+            total, count = func.sum(table.total), func.sum(table.count)
+            if where is not None:
+                total, count = total.filter(where), count.filter(where)
+            if measure == "sum":
+                return total
+            if measure == "count":
+                # 0 rather than NULL for buckets without rows in one period,
+                # as count() gives on the base table
+                return func.coalesce(count, 0)
+            if measure == "avg":
+                return total / count
+            expression = func.max(table.max_amount)
+        else:
+            amount = self.model.amount
+            expression = {
+                "sum": func.sum(amount),
+                "count": func.count(),
+                "avg": func.avg(amount),
+                "max": func.max(amount),
+            }[measure]
+        return expression.filter(where) if where is not None else expression
+
+    def statement(self):
+        """The SELECT computing the whole report."""
+        table = self._table()
+        key = self._bucket_key()
+        current = None
+        if self.compare:
+            current = self._range(self.start, None)[0]
+            key = case((current, key), else_=self._shifted(key))
+        key = key.label("bucket")
+
+        group_columns = []
+        name_columns = []
+        for name in self.group_by:
+            group_column, name_column = self._dimension(name)
+            group_columns.append(group_column)
+            name_columns.append(name_column.label(name))
+
+        measures = [self._measure(measure, current).label(measure)
+                    for measure in self.measures]
+        if self.compare:
+            measures += [self._measure(measure, ~current).label(f"previous_{measure}")
+                         for measure in self.measures]
+
+        conditions = self._range(self.previous_start or self.start, self.end)
+        if self.filters is not None:
+            if self.use_rollup:
+                # Only the rollup's own dimension can be filtered here
+                for name in DIMENSIONS:
+                    values = getattr(self.filters, name)
+                    if values:
+                        conditions.append(id_column(table, name).in_(ids_of(DIMENSIONS[name], values)))
+            else:
+                conditions += self.filters.conditions(self.model, dates=False)
+
+        return (
+            select(key, *name_columns, *measures)
+            .where(*conditions)
+            .group_by(key, *group_columns)
+            .order_by(key, *name_columns)
+        )
+
+    def _item(self, values):
+        """Report row from a mapping with the bucket key, group names and measures."""
+        item = {
+            "bucket": bucket_label(self.granularity, values["bucket"]),
+            "groups": {name: values[name] for name in self.group_by},
+            "values": {measure: values[measure] for measure in self.measures},
+        }
+        if self.compare:
+            previous = {measure: values[f"previous_{measure}"] for measure in self.measures}
+            item["previous"] = previous
+            item["change"] = {
+                measure: (item["values"][measure] or 0) / previous[measure] - 1
+                if previous[measure] else None
+                for measure in self.measures
+            }
+        return item
+
+    def rows(self, result):
+        """Report rows from the executed statement."""
+        return [self._item(row._mapping) for row in result]
+
+    def _bucket_numbers(self, columns):
+        """Bucket of every row of snapshot columns, as a day number (day, week) or month number."""
+        if self.granularity == "day":
+            return columns.days
+        if self.granularity == "week":
+            # 1970-01-01 was a Thursday
+            return columns.days - (columns.days + 3) % 7
+        months_per_bucket = BUCKETS[self.granularity][2]
+        if months_per_bucket == 1:
+            return columns.months
+        return columns.months - columns.months % months_per_bucket
+
+    def _bucket_key_of(self, number):
+        """Bucket key, as the SQL statement returns it, of a bucket number."""
+        if self.granularity in ("day", "week"):
+            return (EPOCH + timedelta(days=number)).isoformat()
+        year, month = divmod(number, 12)
+        return f"{year:04d}" if self.granularity == "year" else f"{year:04d}-{month + 1:02d}"
+
+    def compute(self, tables):
+        """
+        Report rows computed with NumPy from the snapshot's {table name:
+        Columns}: every row gets one integer key for its bucket and groups, and
+        every measure is a bincount (max a reduceat) over the keys.
+        """
+        start = self.previous_start or self.start
+        columns = tables[self.model.__tablename__].between(
+            day_number(start) if start else None, day_number(self.end) if self.end else None)
+        if self.filters is not None:
+            mask = self.filters.mask(columns, dates=False)
+            if mask is not None:
+                columns = columns.take(mask)
+        if not len(columns):
+            return []
+
+        buckets = self._bucket_numbers(columns)
+        current = None
+        if self.compare:
+            # Shift the previous period's rows onto the current buckets
+            current = columns.days >= day_number(self.start)
+            _, _, months, days = BUCKETS[self.granularity]
+            buckets = np.where(current, buckets, buckets + (months or days) * self.shift)
+
+        # One integer key per bucket and group, ordered like ORDER BY bucket and
+        # group names (NULL first): the groups are keyed by the rank of their names
+        first_bucket = int(buckets.min())
+        key = buckets - first_bucket
+        for name in self.group_by:
+            ranks = columns.labels[name].ranks
+            key = key * len(ranks) + ranks[columns.codes[name]]
+        present, groups = group_index(key)
+
+        # Decode the bucket and group codes back from the keys
+        codes = {}
+        for name in reversed(self.group_by):
+            labels = columns.labels[name]
+            present, ranks = np.divmod(present, len(labels.ranks))
+            codes[name] = labels.order[ranks].tolist()
+        bucket_numbers = (present + first_bucket).tolist()
+        bucket_keys = {number: self._bucket_key_of(number) for number in set(bucket_numbers)}
+        rows = [{"bucket": bucket_keys[number]} for number in bucket_numbers]
+        for name in self.group_by:
+            names = columns.labels[name].names
+            for row, code in zip(rows, codes[name]):
+                row[name] = names[code]
+        periods = [("", current), ("previous_", ~current)] if self.compare else [("", None)]
+        for prefix, where in periods:
+            for measure, values in group_measures(
+                    groups, len(rows), columns.amounts, self.measures, where).items():
+                for row, value in zip(rows, values):
+                    row[prefix + measure] = value
+        return [self._item(row) for row in rows]
+
+    def describe(self):
+        """Report parameters, as returned next to the rows."""
+        return {
+            "source": self.source,
+            "granularity": self.granularity,
+            "start": self.start,
+            "end": self.end - relativedelta(days=1) if self.end else None,
+            "previous_start": self.previous_start,
+            "group_by": self.group_by,
+            "measures": self.measures,
+            "rollup": self.use_rollup,
+        }
+
+    async def run(self, db):
+        """
+        Execute on an AsyncSession (or ThreadpoolSession) and return the report
+        rows. With ANALYTICS_ENGINE=memory they are computed from the snapshot.
+        """
+        if settings.ANALYTICS_ENGINE == "memory":
+            return await run_in_threadpool(lambda: self.compute(snapshot.current()))
+        return self.rows(await db.execute(self.statement()))
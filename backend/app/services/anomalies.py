@@ -0,0 +1,247 @@
+"""
+Unusual transactions: amounts far above what is usual for their category.
+
+Every transaction is scored against the spending of its category in the
+ANOMALY_WINDOW_MONTHS months before its own month, with statistics that a few
+extreme amounts barely move: the median and the median absolute deviation
+(MAD). The modified z-score
+
+    score = 0.6745 * (amount - median) / MAD
+
+is at least ANOMALY_THRESHOLD (3.5, after Iglewicz and Hoaglin) for unusual
+transactions. Windows with fewer than ANOMALY_MIN_HISTORY transactions are
+not scored.
+
+The detector keeps the transactions in NumPy arrays, one set per month sorted
+by category, so the window of a category is a few contiguous slices and the
+scores of a month are computed in one vectorized pass. It subscribes to
+data_version: after a sync it reloads only the months the sync changed and
+rescores only the months whose window covers them.
+"""
+
+import copy
+import itertools
+import logging
+import threading
+from datetime import date
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.database.base import ReadSessionLocal
+from app.services import data_version
+from app.services.dates import JULIAN_UNIX_EPOCH, julian_day, month_number, month_numbers
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# MAD and mean absolute deviation of a normal distribution, in standard deviations
+MAD_SCALE = 0.6745
+MEAN_DEVIATION_SCALE = 0.7979
+# Smallest spread, relative to the median: keeps categories of near-identical
+# amounts (subscriptions, rent) from flagging every small price change
+MIN_RELATIVE_SPREAD = 0.05
+MIN_SPREAD = 0.01
+
+# Columns loaded per transaction. Read through the DBAPI cursor: building
+# SQLAlchemy rows would take several times longer than the scoring itself
+LOAD_SQL = """SELECT id, coalesce(category_id, 0), amount, julianday(date)
+FROM "Transactions" WHERE date IS NOT NULL"""
+LOAD_COLUMNS = 4
+
+
+class Month:
+    """Transactions of one month sorted by category, with their scores once computed."""
+
+    def __init__(self, ids, categories, amounts, days):
+        order = np.lexsort((ids, categories))
+        self.ids = ids[order]
+        self.categories = categories[order]
+        self.amounts = amounts[order]
+        self.days = days[order]
+        # category id -> (start, end) of its rows
+        unique, starts = np.unique(self.categories, return_index=True)
+        ends = np.append(starts[1:], len(self.categories))
+        self.bounds = dict(zip(unique.tolist(), zip(starts.tolist(), ends.tolist())))
+        self.median = self.spread = self.scores = None
+        self.history = None
+
+    def amounts_of(self, category):
+        bounds = self.bounds.get(category)
+        return self.amounts[bounds[0]:bounds[1]] if bounds else self.amounts[:0]
+
+    def scored(self, median, spread, history):
+        """Copy of this month with new statistics; the arrays are shared."""
+        month = copy.copy(self)
+        month.median, month.spread, month.history = median, spread, history
+        with np.errstate(invalid="ignore"):
+            month.scores = (self.amounts - median) / spread
+        return month
+
+
+def split_months(rows):
+    """{month number: Month} from an (n, 4) array of loaded columns."""
+    months = {}
+    if not len(rows):
+        return months
+    keys = month_numbers(rows[:, 3] - JULIAN_UNIX_EPOCH)
+    order = np.argsort(keys, kind="stable")
+    rows, keys = rows[order], keys[order]
+    unique, starts = np.unique(keys, return_index=True)
+    for key, part in zip(unique.tolist(), np.split(rows, starts[1:])):
+        months[key] = Month(part[:, 0].astype(np.int64), part[:, 1].astype(np.int64),
+                            part[:, 2], part[:, 3])
+    return months
+
+
+def score_months(months, keys, window=None, min_history=None):
+    """
+    Replace the Months of keys in months with scored copies. A category's
+    window is its rows in the `window` months before the month.
+    """
+    window = window or settings.ANOMALY_WINDOW_MONTHS
+    min_history = min_history or settings.ANOMALY_MIN_HISTORY
+    for key in sorted(keys):
+        month = months.get(key)
+        if month is None:
+            continue
+        previous = [months[key - back] for back in range(1, window + 1) if key - back in months]
+        count = len(month.amounts)
+        median = np.full(count, np.nan)
+        spread = np.full(count, np.nan)
+        history = np.zeros(count, dtype=np.int64)
+        for category, (start, end) in month.bounds.items():
+            values = np.concatenate([other.amounts_of(category) for other in previous] or [month.amounts[:0]])
+            if len(values) < min_history:
+                history[start:end] = len(values)
+                continue
+            center = np.median(values)
+            deviations = np.abs(values - center)
+            mad = np.median(deviations)
+            scale = mad / MAD_SCALE if mad else deviations.mean() / MEAN_DEVIATION_SCALE
+            median[start:end] = center
+            spread[start:end] = max(scale, MIN_RELATIVE_SPREAD * abs(center), MIN_SPREAD)
+            history[start:end] = len(values)
+        months[key] = month.scored(median, spread, history)
+    return months
+
+
+def load_rows(session, months=None):
+    """Loaded columns of every transaction, or of the given YYYY-MM months, as an (n, 4) array."""
+    sql, parameters = LOAD_SQL, ()
+    if months is not None:
+        parameters = tuple(sorted(months))
+        sql += f" AND year_month IN ({', '.join('?' * len(parameters))})"
+    cursor = session.connection().connection.dbapi_connection.cursor()
+    try:
+        rows = cursor.execute(sql, parameters).fetchall()
+    finally:
+        cursor.close()
+    return np.fromiter(itertools.chain.from_iterable(rows), dtype=np.float64,
+                       count=len(rows) * LOAD_COLUMNS).reshape(len(rows), LOAD_COLUMNS)
+
+
+class AnomalyDetector:
+    """Scores of every transaction, kept current with the data version."""
+
+    def __init__(self, session_factory=ReadSessionLocal):
+        self.session_factory = session_factory
+        self.months = None
+        self.version = None
+        self.lock = threading.Lock()
+
+    def current(self):
+        """{month number: scored Month}, reloaded first if the data changed unnoticed."""
+        version = data_version.current()
+        months = self.months
+        if months is not None and self.version == version:
+            return months
+        with self.lock:
+            if self.months is None or self.version != version:
+                self.reload(version)
+            return self.months
+
+    def reload(self, version):
+        with self.session_factory() as session:
+            months = split_months(load_rows(session))
+        self.months = score_months(months, months)
+        self.version = version
+        logger.info(f"Scored {sum(len(month.ids) for month in self.months.values())} "
+                    f"transactions over {len(self.months)} months")
+
+    def on_change(self, version, reason, changes):
+        """data_version listener: rescore only what the change can have affected."""
+        with self.lock:
+            if self.months is None:
+                return
+            if changes is None or self.version != version - 1:
+                # Unknown change or a missed bump: reload on the next request
+                self.months = None
+                return
+            if "Transactions" not in changes:
+                self.version = version
+                return
+            changed = changes["Transactions"]
+            if changed is None:
+                self.months = None
+                return
+            try:
+                self.refresh(changed)
+            except Exception:
+                self.months = None
+                raise
+            self.version = version
+
+    def refresh(self, changed):
+        """Reload the YYYY-MM months in changed and rescore every month whose window covers them."""
+        if not changed:
+            return
+        with self.session_factory() as session:
+            loaded = split_months(load_rows(session, changed))
+        keys = {month_number(date.fromisoformat(f"{month}-01")) for month in changed}
+        months = dict(self.months)
+        for key in keys:
+            months.pop(key, None)
+        months.update(loaded)
+        window = settings.ANOMALY_WINDOW_MONTHS
+        affected = {key + ahead for key in keys for ahead in range(window + 1)}
+        self.months = score_months(months, affected)
+        logger.info(f"Rescored {len(affected & set(self.months))} months after {len(keys)} changed")
+
+
+
+def flagged(months, min_score=None, start=None, end=None, categories=None):
+    """
+    (ids, scores, medians, histories) of the transactions in months (from
+    AnomalyDetector.current) scoring at least min_score, optionally between the
+    start and end dates (inclusive) and in the given category ids, newest first.
+    """
+    min_score = settings.ANOMALY_THRESHOLD if min_score is None else min_score
+    first = month_number(start) if start else None
+    last = month_number(end) if end else None
+    parts = []
+    for key, month in months.items():
+        if (first is not None and key < first) or (last is not None and key > last):
+            continue
+        with np.errstate(invalid="ignore"):
+            mask = month.scores >= min_score
+        if start:
+            mask &= month.days >= julian_day(start)
+        if end:
+            mask &= month.days < julian_day(end) + 1
+        if categories is not None:
+            mask &= np.isin(month.categories, list(categories))
+        if mask.any():
+            parts.append((month.ids[mask], month.scores[mask], month.median[mask],
+                          month.history[mask], month.days[mask]))
+    if not parts:
+        empty = np.array([])
+        return empty.astype(np.int64), empty, empty, empty.astype(np.int64)
+    ids, scores, medians, histories, days = (np.concatenate(column) for column in zip(*parts))
+    order = np.lexsort((-ids, -days))
+    return ids[order], scores[order], medians[order], histories[order]
+
+
+detector = AnomalyDetector()
+data_version.on_change(detector.on_change)
@@ -0,0 +1,143 @@
+"""
+Response cache for the read endpoints.
+
+GET responses under the cached prefixes are stored by path, query string and
+data version, so they are recomputed only after a sync or budget write bumps
+the version. Responses carry a strong ETag (hash of the body); a request whose
+If-None-Match matches gets 304 Not Modified without running any query.
+
+Streamed responses (the /table/ and /income/ lists) carry no Content-Length.
+Hashing or storing their body would mean holding every row in memory, so they
+are not stored: they stream on every 200, tagged with a weak ETag derived from
+the data version instead of the body, which still answers If-None-Match with
+304 until the data changes.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+
+from app.services import data_version
+
+CACHED_PREFIXES = (
+    "/api/v1/table",
+    "/api/v1/summary",
+    "/api/v1/travel",
+    "/api/v1/income",
+    "/api/v1/budget",
+    "/api/v1/analytics",
+)
+
+
+class ResponseCache:
+    """Thread-safe LRU of (body, media_type, etag) entries."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def make_etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+# Data versions are counted per process: tag streamed responses with the
+# process too, so a tag issued by another worker never matches here
+PROCESS_TAG = f"{os.getpid()}-{time.time_ns()}"
+
+
+def version_etag(key):
+    """Weak ETag of whatever a cache key's request returns at the key's data version."""
+    digest = hashlib.blake2b(repr((PROCESS_TAG, key)).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return etag in candidates or "*" in candidates
+
+
+def cache_key(request, version):
+    # Some endpoints count months back from today, so the date is part of the key
+    query = "&".join(sorted(request.url.query.split("&"))
+                     ) if request.url.query else ""
+    return (request.url.path, query, version, date.today().isoformat())
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, cache=response_cache, prefixes=CACHED_PREFIXES):
+        super().__init__(app)
+        self.cache = cache
+        self.prefixes = prefixes
+
+    async def dispatch(self, request, call_next):
+        if request.method != "GET" or not request.url.path.startswith(self.prefixes):
+            return await call_next(request)
+
+        version = data_version.current()
+        key = cache_key(request, version)
+        streamed_etag = version_etag(key)
+        if etag_matches(request, streamed_etag):
+            return Response(status_code=304,
+                            headers={"ETag": streamed_etag, "Cache-Control": "no-cache"})
+
+        entry = self.cache.get(key)
+        if entry is None:
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+            if "content-length" not in response.headers:
+                # Streamed: passed through, tagged by data version
+                response.headers["ETag"] = streamed_etag
+                response.headers["Cache-Control"] = "no-cache"
+                return response
+
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            entry = (body, response.media_type or response.headers.get(
+                "content-type"), make_etag(body))
+
+            # Data changed while this response was built, so it may mix versions
+            if data_version.current() == version:
+                self.cache.put(key, entry)
+
+        body, media_type, etag = entry
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=media_type, headers=headers)
@@ -0,0 +1,95 @@
+"""
+Global data version.
+
+The data behind the read endpoints only changes when a sync commits or a
+budget is written. Those writers call bump(), and anything derived from the
+data (response cache, in-memory snapshots) can compare versions or subscribe
+with on_change() instead of re-reading the database. Writes made by other
+worker processes are picked up through watch_external().
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_version = 0
+_lock = threading.Lock()
+_listeners = []
+_external_check = None
+_external_token = None
+
+
+def current():
+    """Current data version."""
+    if _external_check is not None:
+        check_external()
+    return _version
+
+
+def watch_external(check):
+    """
+    Also bump whenever check() returns a new value, e.g. when another worker
+    process commits to the database.
+    """
+    global _external_check, _external_token
+    _external_token = check()
+    _external_check = check
+
+
+def check_external():
+    global _external_token
+    token = _external_check()
+    with _lock:
+        if token == _external_token:
+            return
+        _external_token = token
+    bump("external")
+
+
+def bump(reason=None, changes=None):
+    """
+    Mark the data as changed and notify listeners. Returns the new version.
+
+    changes optionally says what changed, as {table name: set of YYYY-MM
+    months, or None for any month}. None means anything may have changed.
+    """
+    global _version, _external_token
+    # This process's own commit moved the external token too; don't report it
+    # a second time as an external change
+    token = None
+    if _external_check is not None and reason != "external":
+        token = _external_check()
+    with _lock:
+        if token is not None:
+            _external_token = token
+        _version += 1
+        version = _version
+        listeners = list(_listeners)
+
+    for listener in listeners:
+        try:
+            listener(version, reason, changes)
+        except Exception:
+            logger.exception(f"Data version listener {listener!r} failed")
+    return version
+
+
+def note_own_commit():
+    """
+    Record a commit of this process that changed nothing the readers see (a
+    sync checkpoint), so that watch_external does not take it for a change.
+    """
+    global _external_token
+    if _external_check is None:
+        return
+    token = _external_check()
+    with _lock:
+        _external_token = token
+
+
+def on_change(listener):
+    """Register listener(version, reason, changes), called after every bump."""
+    with _lock:
+        _listeners.append(listener)
+    return listener
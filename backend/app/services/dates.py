@@ -0,0 +1,42 @@
+"""
+Date keys shared by the rollups, the sync and the NumPy engines (snapshot,
+aggregation, anomalies).
+
+Months are YYYY-MM text in SQL and month numbers (months since year 0, so
+consecutive months differ by one) in NumPy. Days are day numbers: days since
+1970-01-01.
+"""
+
+from datetime import date
+
+import numpy as np
+
+EPOCH = date(1970, 1, 1)
+# julianday() of 1970-01-01
+JULIAN_UNIX_EPOCH = 2440587.5
+
+
+def month_key(value):
+    """YYYY-MM key of a date or datetime, or None."""
+    return value.strftime("%Y-%m") if value else None
+
+
+def day_number(day):
+    """Days since 1970-01-01."""
+    return (day - EPOCH).days
+
+
+def month_number(day):
+    """Months since year 0, the month of a day."""
+    return day.year * 12 + day.month - 1
+
+
+def month_numbers(days):
+    """Month number of every day number in days (fractions of a day are dropped)."""
+    months = days.astype("datetime64[D]").astype("datetime64[M]")
+    return months.astype(np.int64) + 1970 * 12
+
+
+def julian_day(day):
+    """julianday() of a date at midnight."""
+    return day_number(day) + JULIAN_UNIX_EPOCH
@@ -0,0 +1,85 @@
+"""
+Category, sub-category and method names stored once in dimension tables.
+
+Transactions and Budget hold integer ids into Category, SubCategory and Method.
+Writers turn names into ids through an InternMap, which loads every name once
+and only goes to the database for names it has not seen yet.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models import Category, Method, SubCategory
+
+# Transactions attribute -> dimension table holding its names
+DIMENSIONS = {
+    "category": Category,
+    "sub_category": SubCategory,
+    "method": Method,
+}
+
+
+def id_column(model, name):
+    """Id column of model behind the dimension attribute name, e.g. Transactions.category_id."""
+    return getattr(model, f"{name}_id")
+
+
+def ids_of(dimension, names):
+    """Subquery with the ids of the given names, for filtering on id columns."""
+    return select(dimension.id).where(dimension.name.in_(names))
+
+
+def id_of(dimension, name):
+    """Scalar subquery with the id of one name."""
+    return select(dimension.id).where(dimension.name == name).scalar_subquery()
+
+
+class InternMap:
+    """
+    name -> id for every dimension, loaded lazily from db (a Session or
+    Connection). Names that don't exist yet are inserted in db's transaction.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.ids = {}
+
+    def _known(self, dimension):
+        known = self.ids.get(dimension)
+        if known is None:
+            known = dict(self.db.execute(select(dimension.name, dimension.id)).all())
+            self.ids[dimension] = known
+        return known
+
+    def id(self, dimension, name):
+        """Id of name in dimension, inserting it if it is new."""
+        if name is None:
+            return None
+        known = self._known(dimension)
+        dimension_id = known.get(name)
+        if dimension_id is None:
+            # Another writer may have added it in the meantime
+            self.db.execute(sqlite_insert(dimension).values(
+                name=name).on_conflict_do_nothing(index_elements=[dimension.name]))
+            dimension_id = self.db.execute(
+                select(dimension.id).where(dimension.name == name)).scalar_one()
+            known[name] = dimension_id
+        return dimension_id
+
+    def intern_all(self, dimension, names):
+        """Make sure every name has an id, inserting the new ones in one statement."""
+        known = self._known(dimension)
+        missing = sorted({name for name in names if name is not None and name not in known})
+        if not missing:
+            return
+        self.db.execute(sqlite_insert(dimension).values([{"name": name} for name in missing])
+                        .on_conflict_do_nothing(index_elements=[dimension.name]))
+        known.update(self.db.execute(
+            select(dimension.name, dimension.id).where(dimension.name.in_(missing))).all())
+
+    def encode(self, row):
+        """Replace the dimension names in a Transactions row dict with their ids."""
+        for name, dimension in DIMENSIONS.items():
+            if name in row:
+                row[f"{name}_id"] = self.id(dimension, row.pop(name))
+        return row
@@ -0,0 +1,270 @@
+"""
+Streaming export of transactions and income as NDJSON, CSV or Parquet.
+
+Rows are read through a server-side cursor (yield_per) a batch at a time and
+encoded batch by batch, so memory stays flat however large the table is.
+NDJSON and CSV can be gzipped on the fly; Parquet is written one row group per
+batch and needs pyarrow.
+
+    python -m app.services.export transactions --format csv --gzip -o transactions.csv.gz
+    python -m app.services.export income --format parquet --start-date 2024-01-01 -o income.parquet
+"""
+
+import csv
+import io
+import zlib
+
+import orjson
+
+from app.api.v1.streaming import schema_select
+from app.database.base import ReadSessionLocal
+from app.models import Income, Transactions
+from app.notion.upsert import date_field
+from app.schemas import IncomeResponse, TransactionResponse
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Rows fetched and encoded per batch (and per Parquet row group)
+BATCH_SIZE = 5000
+
+EXPORTS = {
+    "transactions": (Transactions, TransactionResponse),
+    "income": (Income, IncomeResponse),
+}
+
+FORMATS = {
+    # format: (file extension, media type)
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+class NDJSONEncoder:
+    """One JSON object per line, rendered like the API responses."""
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def begin(self):
+        return b""
+
+    def encode(self, rows):
+        fields = self.fields
+        return b"".join(orjson.dumps(dict(zip(fields, row))) + b"\n" for row in rows)
+
+    def end(self):
+        return b""
+
+
+class CSVEncoder:
+    """CSV with a header row."""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator="\n")
+
+    def drain(self):
+        data = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def begin(self):
+        self.writer.writerow(self.fields)
+        return self.drain()
+
+    def encode(self, rows):
+        self.writer.writerows(rows)
+        return self.drain()
+
+    def end(self):
+        return b""
+
+
+class _ParquetSink:
+    """Write-only file object that keeps what pyarrow writes until it is drained."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class ParquetEncoder:
+    """Parquet file written one row group per batch."""
+
+    def __init__(self, fields):
+        types = {"id": pyarrow.int64(), "amount": pyarrow.float64()}
+        self.fields = fields
+        self.timestamps = {field for field in fields
+                           if field in ("date", "date_received", "created_at", "updated_at")}
+        self.schema = pyarrow.schema([
+            (field, pyarrow.timestamp("us") if field in self.timestamps
+             else types.get(field, pyarrow.string()))
+            for field in fields
+        ])
+        self.sink = _ParquetSink()
+        self.writer = None
+
+    def begin(self):
+        self.writer = pyarrow.parquet.ParquetWriter(
+            pyarrow.PythonFile(self.sink, mode="w"), self.schema, compression="zstd")
+        return self.sink.drain()
+
+    def encode(self, rows):
+        columns = list(zip(*rows))
+        arrays = []
+        for field, values in zip(self.fields, columns):
+            if field in self.timestamps:
+                # ISO text to timestamps in one vectorized cast
+                arrays.append(pyarrow.array(values, pyarrow.string()).cast(
+                    pyarrow.timestamp("us")))
+            else:
+                arrays.append(pyarrow.array(values, self.schema.field(field).type))
+        self.writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self.schema))
+        return self.sink.drain()
+
+    def end(self):
+        self.writer.close()
+        return self.sink.drain()
+
+
+class GzipEncoder:
+    """Gzip the output of another encoder as one continuous stream."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def begin(self):
+        return self.compressor.compress(self.inner.begin())
+
+    def encode(self, rows):
+        return self.compressor.compress(self.inner.encode(rows))
+
+    def end(self):
+        return self.compressor.compress(self.inner.end()) + self.compressor.flush()
+
+
+def check_format(fmt, gzip=False):
+    """Raise ValueError if fmt/gzip can't be exported in this environment."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    if fmt == "parquet" and pyarrow is None:
+        raise ValueError("Parquet export needs pyarrow installed")
+    if fmt == "parquet" and gzip:
+        raise ValueError("Parquet files are already compressed; gzip applies to ndjson and csv")
+
+
+def file_name(kind, fmt, gzip=False):
+    extension, _ = FORMATS[fmt]
+    return f"{kind}.{extension}" + (".gz" if gzip else "")
+
+
+def media_type(fmt, gzip=False):
+    return "application/gzip" if gzip else FORMATS[fmt][1]
+
+
+def export_chunks(kind, fmt, filters=None, gzip=False, batch_size=BATCH_SIZE):
+    """
+    Yield the encoded export of kind ("transactions" or "income") in chunks.
+    filters is a TransactionFilters, applied in SQL before anything is read.
+    """
+    check_format(fmt, gzip)
+    model, schema = EXPORTS[kind]
+    fields, statement, converters = schema_select(model, schema)
+    statement = statement.order_by(getattr(model, date_field(model)), model.id)
+    if filters is not None:
+        statement = statement.where(*filters.conditions(model))
+
+    if fmt == "parquet":
+        encoder = ParquetEncoder(fields)
+    elif fmt == "csv":
+        encoder = CSVEncoder(fields)
+    else:
+        encoder = NDJSONEncoder(fields)
+    if gzip:
+        encoder = GzipEncoder(encoder)
+
+    db = ReadSessionLocal()
+    try:
+        yield encoder.begin()
+        result = db.execute(statement.execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            if converters:
+                rows = [list(row) for row in rows]
+                for row in rows:
+                    for index, convert in converters.items():
+                        if row[index] is not None:
+                            row[index] = convert(row[index])
+            chunk = encoder.encode(rows)
+            if chunk:
+                yield chunk
+        yield encoder.end()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from datetime import date
+
+    from fastapi import HTTPException
+
+    from app.api.v1.filters import TransactionFilters
+
+    parser = argparse.ArgumentParser(description="Export transactions or income")
+    parser.add_argument("kind", choices=sorted(EXPORTS))
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--start-date", type=date.fromisoformat)
+    parser.add_argument("--end-date", type=date.fromisoformat)
+    parser.add_argument("--category", action="append")
+    parser.add_argument("--sub-category", action="append")
+    parser.add_argument("--method", action="append")
+    parser.add_argument("--min-amount", type=float)
+    parser.add_argument("--max-amount", type=float)
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    try:
+        filters = TransactionFilters(
+            start_date=args.start_date, end_date=args.end_date, category=args.category,
+            sub_category=args.sub_category, method=args.method,
+            min_amount=args.min_amount, max_amount=args.max_amount)
+        out = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            for chunk in export_chunks(args.kind, args.format, filters, args.gzip):
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+    except (ValueError, HTTPException) as e:
+        parser.exit(1, f"Export failed: {getattr(e, 'detail', e)}\n")
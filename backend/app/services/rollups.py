@@ -0,0 +1,177 @@
+"""
+Monthly rollups of Transactions and Income.
+
+SpendingRollup holds sum/count/min/max per (year_month, category id) and
+IncomeRollup the same per (year_month, account). The sync refreshes only the
+months touched by the rows it changed, so the summary endpoints read
+O(months x categories) rows instead of scanning the full history.
+
+DailySpend holds spending per (category id, day) along with its running
+total. The spending of a category between two days is the difference of two
+running totals, each one primary-key search, however long the range. Every
+refresh re-accumulates the running totals from the first day it changed, in
+the same transaction, so no committed state holds stale running totals.
+"""
+
+from sqlalchemy import String, and_, delete, func, insert, literal, select, update
+from sqlalchemy.orm import aliased
+
+from app.models import DailySpend, Income, IncomeRollup, SpendingRollup, Transactions
+
+
+def _rollup_spec(model):
+    """(rollup table, group column) for a base table."""
+    if model is Income:
+        return IncomeRollup, Income.account
+    return SpendingRollup, Transactions.category_id
+
+
+def _aggregate_select(model, where=None):
+    # Grouping on the raw (year_month, category_id/account) columns lets SQLite
+    # walk the composite index instead of sorting
+    _, group_column = _rollup_spec(model)
+    stmt = select(
+        model.year_month,
+        func.coalesce(group_column, "" if model is Income else 0),
+        func.sum(model.amount),
+        func.count(),
+        func.min(model.amount),
+        func.max(model.amount),
+    ).where(model.year_month.is_not(None))
+    if where is not None:
+        stmt = stmt.where(*where)
+    return stmt.group_by(model.year_month, group_column)
+
+
+def _insert_from(model, stmt):
+    rollup, group_column = _rollup_spec(model)
+    return insert(rollup).from_select(
+        ["year_month", group_column.key, "total",
+            "count", "min_amount", "max_amount"],
+        stmt,
+    )
+
+
+def _insert_days(db, where=None):
+    """Insert the DailySpend rows of the Transactions matching where, without running totals."""
+    day = func.strftime("%Y-%m-%d", Transactions.date, type_=String)
+    stmt = select(
+        func.coalesce(Transactions.category_id, 0),
+        day,
+        func.sum(Transactions.amount),
+        literal(0.0),
+    ).where(Transactions.date.is_not(None))
+    if where is not None:
+        stmt = stmt.where(*where)
+    db.execute(insert(DailySpend).from_select(
+        ["category_id", "day", "total", "cumulative"],
+        stmt.group_by(Transactions.category_id, day),
+    ))
+
+
+def accumulate(db, start_day=None):
+    """
+    Recompute the running totals of DailySpend from start_day (YYYY-MM-DD)
+    onward, continuing from each category's last running total before it.
+    One UPDATE, with the totals summed by a window function.
+    """
+    days = aliased(DailySpend)
+    running = func.sum(days.total).over(partition_by=days.category_id, order_by=days.day)
+    rows = select(days.category_id, days.day)
+    if start_day:
+        # Running total of each category at its last day before start_day
+        before = aliased(DailySpend)
+        last = (
+            select(before.category_id, func.max(before.day).label("day"))
+            .where(before.day < start_day)
+            .group_by(before.category_id)
+            .subquery()
+        )
+        base = (
+            select(before.category_id, before.cumulative)
+            .join(last, and_(before.category_id == last.c.category_id, before.day == last.c.day))
+            .subquery()
+        )
+        running = running + func.coalesce(base.c.cumulative, 0.0)
+        rows = (rows.outerjoin(base, base.c.category_id == days.category_id)
+                .where(days.day >= start_day))
+    rows = rows.add_columns(running.label("running")).subquery()
+    db.execute(
+        update(DailySpend)
+        .where(DailySpend.category_id == rows.c.category_id, DailySpend.day == rows.c.day)
+        .values(cumulative=rows.c.running)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def refresh_days(db, months):
+    """
+    Recompute the DailySpend rows of the given YYYY-MM months, and the running
+    totals from the first of them onward.
+    """
+    months = sorted(month for month in months if month)
+    if not months:
+        return
+    for year_month in months:
+        db.execute(delete(DailySpend).where(DailySpend.day >= f"{year_month}-01",
+                                            DailySpend.day <= f"{year_month}-31"))
+    _insert_days(db, where=[Transactions.year_month.in_(months)])
+    accumulate(db, f"{months[0]}-01")
+
+
+def refresh_months(db, model, months):
+    """
+    Recompute the rollup rows of the given YYYY-MM months from the base table.
+    Each month is an index search on the (year_month, category/account) index.
+    """
+    rollup, _ = _rollup_spec(model)
+    for year_month in sorted(month for month in months if month):
+        db.execute(delete(rollup).where(rollup.year_month == year_month))
+        db.execute(_insert_from(model, _aggregate_select(
+            model, where=[model.year_month == year_month])))
+    if model is Transactions:
+        refresh_days(db, months)
+
+
+def rebuild_days(db):
+    """Recompute every DailySpend row."""
+    db.execute(delete(DailySpend))
+    _insert_days(db)
+    accumulate(db)
+
+
+def rebuild(db, model):
+    """Recompute every rollup row of a base table."""
+    rollup, _ = _rollup_spec(model)
+    db.execute(delete(rollup))
+    db.execute(_insert_from(model, _aggregate_select(model)))
+    if model is Transactions:
+        rebuild_days(db)
+
+
+def rebuild_if_empty(db):
+    """Populate the rollups for databases created before they existed."""
+    for model in (Transactions, Income):
+        rollup, _ = _rollup_spec(model)
+        rollup_empty = db.query(rollup).first() is None
+        if rollup_empty and db.query(model.id).first() is not None:
+            rebuild(db, model)
+    if db.query(DailySpend).first() is None and db.query(Transactions.id).first() is not None:
+        rebuild_days(db)
+    db.commit()
+
+
+def running_total(category_id, day):
+    """
+    Scalar subquery with the running total of a category at the end of day
+    (YYYY-MM-DD): the cumulative of its last DailySpend row on or before day.
+    """
+    return func.coalesce(
+        select(DailySpend.cumulative)
+        .where(DailySpend.category_id == category_id, DailySpend.day <= day)
+        .order_by(DailySpend.day.desc())
+        .limit(1)
+        .scalar_subquery(),
+        0.0,
+    )
+
@@ -0,0 +1,230 @@
+"""
+In-memory columnar snapshot of Transactions and Income.
+
+With ANALYTICS_ENGINE=memory the summary, income and travel reports are
+computed with NumPy from a copy of the two tables held as columns instead of
+SQL: day numbers (days since 1970-01-01) and month numbers as int64, the
+category, sub_category and method ids (Transactions) or account codes (Income)
+as integer codes, and float amounts. Rows are sorted by day, so a date range
+is a slice.
+
+The snapshot subscribes to data_version: after a sync it reloads only the
+months the sync changed; other changes drop it for a full reload on the next
+request.
+"""
+
+import copy
+import functools
+import itertools
+import logging
+import threading
+from datetime import date
+
+import numpy as np
+from sqlalchemy import select
+
+from app.database.base import ReadSessionLocal
+from app.services import data_version
+from app.services.dates import month_number, month_numbers
+from app.services.dimensions import DIMENSIONS
+
+logger = logging.getLogger(__name__)
+
+# Day number of the date (time of day dropped) and the numeric columns of
+# each table; categorical text columns are read after them
+DAY = "CAST(julianday(date({0})) - 2440587.5 AS INTEGER)"
+LOAD_SQL = {
+    "Transactions": f"""SELECT id, {DAY.format("date")}, coalesce(amount, 0),
+    coalesce(category_id, 0), coalesce(sub_category_id, 0), coalesce(method_id, 0)
+FROM "Transactions" WHERE date IS NOT NULL""",
+    "Income": f"""SELECT id, {DAY.format("date_received")}, coalesce(amount, 0), account
+FROM "Income" WHERE date_received IS NOT NULL""",
+}
+# Code columns of each table: loaded as ids, or encoded from text
+ID_CODES = {"Transactions": ("category", "sub_category", "method"), "Income": ()}
+TEXT_CODES = {"Transactions": (), "Income": ("account",)}
+
+
+class Labels:
+    """Names of a categorical column by code. Code 0 is NULL."""
+
+    def __init__(self, names=(None,)):
+        self.names = list(names)
+        self.codes = {name: code for code, name in enumerate(self.names) if name is not None}
+
+    @classmethod
+    def from_ids(cls, rows):
+        """Labels from (id, name) rows of a dimension table: the codes are the ids."""
+        rows = list(rows)
+        names = [None] * (max((id for id, _ in rows), default=0) + 1)
+        for id, name in rows:
+            names[id] = name
+        return cls(names)
+
+    @functools.cached_property
+    def order(self):
+        """Codes ordered by name, NULL first."""
+        return np.array(sorted(range(len(self.names)), key=lambda code: (
+            self.names[code] is not None, self.names[code] or "")), dtype=np.int64)
+
+    @functools.cached_property
+    def ranks(self):
+        """Position of every code in order, indexed by code."""
+        ranks = np.empty(len(self.order), dtype=np.int64)
+        ranks[self.order] = np.arange(len(self.order))
+        return ranks
+
+    def codes_of(self, names):
+        """Codes of the given names, skipping unknown ones."""
+        return [self.codes[name] for name in names if name in self.codes]
+
+    def encode(self, values):
+        """(labels, codes of values), the labels extended with any new values."""
+        labels = self
+        if any(value is not None and value not in self.codes for value in values):
+            labels = Labels(self.names + sorted(
+                {value for value in values if value is not None and value not in self.codes}))
+        codes = labels.codes
+        return labels, np.fromiter((codes.get(value, 0) for value in values), dtype=np.int64,
+                                   count=len(values))
+
+
+class Columns:
+    """One table as NumPy columns, sorted by day."""
+
+    def __init__(self, name, ids, days, amounts, codes, labels):
+        order = np.argsort(days, kind="stable")
+        self.name = name
+        self.ids = ids[order]
+        self.days = days[order]
+        self.months = month_numbers(self.days)
+        self.amounts = amounts[order]
+        # dimension -> code of every row, and the Labels behind the codes
+        self.codes = {dimension: column[order] for dimension, column in codes.items()}
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.ids)
+
+    def between(self, start=None, end=None):
+        """View of the rows with a day number in [start, end); either may be None."""
+        first = 0 if start is None else np.searchsorted(self.days, start, "left")
+        last = len(self) if end is None else np.searchsorted(self.days, end, "left")
+        return self.take(slice(first, last))
+
+    def take(self, rows):
+        """View of the rows selected by a slice or boolean mask."""
+        columns = copy.copy(self)
+        columns.ids, columns.days = self.ids[rows], self.days[rows]
+        columns.months, columns.amounts = self.months[rows], self.amounts[rows]
+        columns.codes = {dimension: column[rows] for dimension, column in self.codes.items()}
+        return columns
+
+    def replace_months(self, months, loaded):
+        """Copy with the rows of the given month numbers replaced by loaded."""
+        keep = ~np.isin(self.months, list(months))
+        return Columns(
+            self.name,
+            np.concatenate([self.ids[keep], loaded.ids]),
+            np.concatenate([self.days[keep], loaded.days]),
+            np.concatenate([self.amounts[keep], loaded.amounts]),
+            {dimension: np.concatenate([column[keep], loaded.codes[dimension]])
+             for dimension, column in self.codes.items()},
+            loaded.labels)
+
+
+def load_columns(session, name, months=None, labels=None):
+    """
+    Columns of table name, or of its rows in the given YYYY-MM months. labels
+    are the Labels of the text code columns to extend.
+    """
+    sql, parameters = LOAD_SQL[name], ()
+    if months is not None:
+        parameters = tuple(sorted(months))
+        sql += f" AND year_month IN ({', '.join('?' * len(parameters))})"
+    cursor = session.connection().connection.dbapi_connection.cursor()
+    try:
+        rows = cursor.execute(sql, parameters).fetchall()
+    finally:
+        cursor.close()
+
+    id_codes, text_codes = ID_CODES[name], TEXT_CODES[name]
+    width = 3 + len(id_codes)
+    numbers = np.fromiter(
+        itertools.chain.from_iterable(row[:width] for row in rows), dtype=np.float64,
+        count=len(rows) * width).reshape(len(rows), width)
+    codes, all_labels = {}, {}
+    for index, dimension in enumerate(id_codes):
+        codes[dimension] = numbers[:, 3 + index].astype(np.int64)
+        all_labels[dimension] = Labels.from_ids(session.execute(
+            select(DIMENSIONS[dimension].id, DIMENSIONS[dimension].name)).all())
+    for index, dimension in enumerate(text_codes):
+        base = (labels or {}).get(dimension) or Labels()
+        all_labels[dimension], codes[dimension] = base.encode(
+            [row[width + index] for row in rows])
+    return Columns(name, numbers[:, 0].astype(np.int64), numbers[:, 1].astype(np.int64),
+                   numbers[:, 2], codes, all_labels)
+
+
+class Snapshot:
+    """Columns of Transactions and Income, kept current with the data version."""
+
+    def __init__(self, session_factory=ReadSessionLocal):
+        self.session_factory = session_factory
+        self.tables = None
+        self.version = None
+        self.lock = threading.Lock()
+
+    def current(self):
+        """{table name: Columns}, reloaded first if the data changed unnoticed."""
+        version = data_version.current()
+        tables = self.tables
+        if tables is not None and self.version == version:
+            return tables
+        with self.lock:
+            if self.tables is None or self.version != version:
+                self.reload(version)
+            return self.tables
+
+    def reload(self, version):
+        with self.session_factory() as session:
+            self.tables = {name: load_columns(session, name) for name in LOAD_SQL}
+        self.version = version
+        logger.info("Loaded snapshot: " + ", ".join(
+            f"{len(columns)} {name}" for name, columns in self.tables.items()))
+
+    def on_change(self, version, reason, changes):
+        """data_version listener: reload only the months the change touched."""
+        with self.lock:
+            if self.tables is None:
+                return
+            if (changes is None or self.version != version - 1
+                    or any(changes.get(name, set()) is None for name in LOAD_SQL)):
+                # Unknown change or a missed bump: reload on the next request
+                self.tables = None
+                return
+            try:
+                self.patch(changes)
+            except Exception:
+                self.tables = None
+                raise
+            self.version = version
+
+    def patch(self, changes):
+        """Reload the rows of the changed YYYY-MM months of each table in changes."""
+        tables = dict(self.tables)
+        with self.session_factory() as session:
+            for name in LOAD_SQL:
+                months = changes.get(name)
+                if not months:
+                    continue
+                old = tables[name]
+                loaded = load_columns(session, name, months, old.labels)
+                numbers = {month_number(date.fromisoformat(f"{month}-01")) for month in months}
+                tables[name] = old.replace_months(numbers, loaded)
+                logger.info(f"Patched snapshot: {len(loaded)} {name} in {len(months)} months")
+        self.tables = tables
+
+
+snapshot = Snapshot()
+data_version.on_change(snapshot.on_change)
@@ -0,0 +1,122 @@
+"""
+Background Notion sync jobs.
+
+Syncs run on a single background worker. Starting a sync while one is queued
+or running returns the existing job instead of starting another one, so
+repeated clicks on the sync button all follow the same job.
+"""
+
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+
+from app.core import metrics
+from app.notion.notion_connector import sync_transactions
+
+logger = logging.getLogger(__name__)
+
+# Number of finished jobs kept around for status lookups
+MAX_FINISHED_JOBS = 20
+
+
+class SyncJob:
+    def __init__(self, full=False):
+        self.id = uuid.uuid4().hex
+        self.full = full
+        self.status = "queued"
+        self.created_at = datetime.now(UTC)
+        self.started_at = None
+        self.finished_at = None
+        self.stats = {}
+        self.stage_seconds = {}
+        self.error = None
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def update_progress(self, stats, stage_seconds):
+        self.stats = stats
+        self.stage_seconds = stage_seconds
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "full": self.full,
+            "mode": self.stats.get("mode"),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": {
+                "pages_fetched": self.stats.get("pages", 0),
+                "rows_fetched": self.stats.get("total", 0),
+                "rows_created": self.stats.get("created", 0),
+                "rows_updated": self.stats.get("updated", 0),
+                "rows_deleted": self.stats.get("deleted", 0),
+                "rows_unchanged": self.stats.get("unchanged", 0),
+                "rows_skipped": self.stats.get("skipped", 0),
+            },
+            "stage_seconds": self.stage_seconds,
+            "error": self.error,
+        }
+
+
+class SyncJobManager:
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="notion-sync")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._current = None
+
+    def start(self, full=False):
+        """
+        Start a sync job, or return the job that is already queued or running.
+        """
+        with self._lock:
+            if self._current is not None and self._current.active:
+                return self._current
+
+            job = SyncJob(full=full)
+            self._jobs[job.id] = job
+            self._current = job
+            self._prune()
+
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def latest(self):
+        return self._current
+
+    def _run(self, job):
+        job.status = "running"
+        job.started_at = datetime.now(UTC)
+        try:
+            job.stats = sync_transactions(
+                full=job.full, progress=job.update_progress)
+            job.status = "succeeded"
+            logger.info(f"Sync job {job.id} completed: {job.stats}")
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            logger.exception(f"Sync job {job.id} failed")
+        finally:
+            job.finished_at = datetime.now(UTC)
+            metrics.record_sync(job.stats.get("mode", "unknown"),
+                                job.status, job.stage_seconds)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if not job.active]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+
+sync_jobs = SyncJobManager()
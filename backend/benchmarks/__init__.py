@@ -0,0 +1,4 @@
+"""
+Benchmark suite: synthetic data generator, timed endpoint and sync scenarios
+and report comparison.
+"""
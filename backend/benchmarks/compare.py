@@ -0,0 +1,60 @@
+"""
+Compare two benchmark reports written by benchmarks.run.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.2
+
+Exits with status 1 when any scenario's p95 latency (or sync time) got worse
+by more than the threshold.
+"""
+
+import argparse
+import json
+import sys
+
+
+def scenario_cost(result):
+    """Lower-is-better number used to compare one scenario between runs."""
+    return result.get("p95_ms", result.get("seconds"))
+
+
+def compare(baseline, candidate, threshold):
+    rows = []
+    regressions = []
+    for name in sorted(set(baseline["scenarios"]) & set(candidate["scenarios"])):
+        before = scenario_cost(baseline["scenarios"][name])
+        after = scenario_cost(candidate["scenarios"][name])
+        ratio = after / before if before else None
+        regressed = ratio is not None and ratio > 1 + threshold
+        rows.append((name, before, after, ratio, regressed))
+        if regressed:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed relative slowdown before a scenario counts as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    print(f"{'scenario':32s} {'baseline':>12s} {'candidate':>12s} {'ratio':>8s}")
+    for name, before, after, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        ratio_text = f"{ratio:8.2f}" if ratio is not None else "       -"
+        print(f"{name:32s} {before:12.3f} {after:12.3f} {ratio_text}{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Deterministic synthetic data for the SQLite schema in app/models.py.
+
+    python -m benchmarks.generate --size 100k --db /tmp/bench.db
+
+The database path has to be chosen before app modules are imported, since the
+engine is created from DATABASE_URL at import time. Use configure_database()
+first when calling this from other scripts.
+"""
+
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_DB = os.path.join(RESULTS_DIR, "bench.db")
+
+# category -> (sub-categories, typical amount, names)
+CATEGORIES = {
+    "Food": (["Restaurants", "Coffee", "Fast Food"], 25, ["Chipotle", "Starbucks", "Sweetgreen", "Local Diner"]),
+    "Groceries": (["Groceries"], 60, ["Trader Joe's", "Whole Foods", "Costco"]),
+    "Transportation": (["Gas", "Rideshare", "Transit"], 20, ["Uber", "Lyft", "Shell", "Metro Card"]),
+    "Shopping": (["Clothes", "Electronics", "Home"], 70, ["Amazon", "Target", "Uniqlo", "Best Buy"]),
+    "Entertainment": (["Movies", "Concerts", "Games"], 35, ["AMC", "Ticketmaster", "Steam"]),
+    "Travel": (["Japan Trip", "NYC Trip", "Travel Insurance", "Ski Trip"], 250, ["Delta", "Airbnb", "Marriott"]),
+    "Health": (["Gym", "Pharmacy", "Doctor"], 45, ["Equinox", "CVS", "Clinic"]),
+    "Utilities": (["Electric", "Internet", "Phone"], 90, ["PG&E", "Comcast", "Verizon"]),
+    "Rent": (["Rent"], 2200, ["Landlord"]),
+    "Subscriptions": (["Streaming", "Software"], 15, ["Netflix", "Spotify", "iCloud"]),
+}
+METHODS = ["Chase", "Amex", "Discover", "Apple", "Debit", "Venmo"]
+ACCOUNTS = ["Checking Account", "Savings Account", "Brokerage"]
+
+
+def configure_database(path):
+    """Point the app at a SQLite file. Must run before app modules are imported."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(path)}"
+
+
+def parse_size(value):
+    return SIZES.get(value.lower()) or int(value)
+
+
+def transaction_rows(count, seed=0, years=5, end=datetime(2025, 1, 1)):
+    """Yield count transaction dicts spread evenly over the given number of years."""
+    rng = random.Random(seed)
+    start = end - timedelta(days=365 * years)
+    span = (end - start).total_seconds()
+    categories = list(CATEGORIES)
+    weights = [8, 6, 5, 4, 3, 1, 2, 1, 0.3, 2]
+    for i in range(count):
+        category = rng.choices(categories, weights)[0]
+        sub_categories, typical, names = CATEGORIES[category]
+        amount = round(typical * rng.lognormvariate(0, 0.5), 2)
+        # A few large outliers per category
+        if rng.random() < 0.002:
+            amount = round(amount * rng.uniform(5, 20), 2)
+        yield {
+            "notion_id": f"bench-{seed}-{i:09d}",
+            "name": rng.choice(names),
+            "amount": amount,
+            "date": start + timedelta(seconds=span * i / count),
+            "category": category,
+            "sub_category": rng.choice(sub_categories),
+            "method": rng.choice(METHODS),
+        }
+
+
+def income_rows(count, seed=0, years=5, end=datetime(2025, 1, 1)):
+    rng = random.Random(seed + 1)
+    start = end - timedelta(days=365 * years)
+    span = (end - start).total_seconds()
+    for i in range(count):
+        yield {
+            "notion_id": f"bench-income-{seed}-{i:08d}",
+            "name": "Paycheck" if i % 4 else "Bonus",
+            "amount": round(rng.uniform(2000, 4000), 2),
+            "date_received": start + timedelta(seconds=span * i / count),
+            "account": rng.choice(ACCOUNTS),
+        }
+
+
+def budget_rows():
+    return [{"category": category, "budget_amount": float(typical * 30)}
+            for category, (_, typical, _) in CATEGORIES.items()]
+
+
+def populate(size, seed=0, chunk_size=50_000):
+    """Replace the configured database's contents with size synthetic transactions."""
+    from sqlalchemy import delete, insert
+
+    import app.models  # noqa: F401  (registers the tables)
+    from app.database.base import SessionLocal, engine
+    from app.database.init_db import init_db
+    from app.models import Budget, Category, Income, Transactions
+    from app.services import rollups
+    from app.services.dimensions import InternMap
+
+    init_db()
+    now = datetime.now()
+    with engine.begin() as conn:
+        for model in (Transactions, Income, Budget):
+            conn.execute(delete(model))
+
+        # Category, sub-category and method names are stored as ids
+        dimensions = InternMap(conn)
+
+        def insert_chunks(model, rows):
+            chunk = []
+            for row in rows:
+                row["created_at"] = row["updated_at"] = now
+                if model is Budget:
+                    row["category_id"] = dimensions.id(Category, row.pop("category"))
+                elif model is Transactions:
+                    dimensions.encode(row)
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    conn.execute(insert(model), chunk)
+                    chunk = []
+            if chunk:
+                conn.execute(insert(model), chunk)
+
+        insert_chunks(Transactions, transaction_rows(size, seed))
+        # Roughly two paychecks a month over the same period
+        insert_chunks(Income, income_rows(max(24, size // 400), seed))
+        insert_chunks(Budget, budget_rows())
+
+    with SessionLocal() as db:
+        for model in (Transactions, Income):
+            rollups.rebuild(db, model)
+        db.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fill a SQLite database with synthetic data")
+    parser.add_argument("--size", default="10k",
+                        help="10k, 100k, 1m or a row count")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    configure_database(args.db)
+    populate(parse_size(args.size), seed=args.seed)
+    print(f"Wrote {parse_size(args.size)} transactions to {args.db}")
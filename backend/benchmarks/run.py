@@ -0,0 +1,291 @@
+"""
+Timed benchmark scenarios for every API router and for the Notion sync.
+
+    python -m benchmarks.run --size 100k --out before.json
+    python -m benchmarks.compare before.json after.json
+
+Endpoint scenarios run in-process through httpx's ASGI transport, so they
+measure the app (routing, queries, serialization) without network noise.
+The response cache is cleared before every request unless --cache is given.
+Sync scenarios run sync_transactions against the local fake Notion server:
+cold (empty tables), warm (unchanged full resync) and incremental (1% of
+pages edited). They run last because they replace the generated data.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+
+from benchmarks.generate import (DEFAULT_DB, RESULTS_DIR, configure_database,
+                                 parse_size)
+
+DEFAULT_REPORT = os.path.join(RESULTS_DIR, "report.json")
+
+
+def peak_rss_mb():
+    """High-water resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def endpoint_scenarios():
+    """
+    (router, scenario name, url, JSON body or None) for every router in
+    app/api/v1/router.py except sync and debug. Scenarios with a body are
+    POSTed, the others are GETs.
+    """
+    month = "2024-06"
+    dashboard = {"widgets": [
+        {"type": "monthly"},
+        {"type": "categories", "month": month},
+        {"type": "income_by_month", "month": month},
+        {"type": "budgets"},
+    ]}
+    return [
+        ("table", "table/all", "/api/v1/table/", None),
+        ("table", "table/page", "/api/v1/table/page?limit=100", None),
+        ("table", "table/page-filtered",
+         "/api/v1/table/page?limit=100&category=Food&start_date=2024-01-01&end_date=2024-06-30", None),
+        ("summary", "summary/categories", f"/api/v1/summary/categories?month={month}", None),
+        ("summary", "summary/monthly", "/api/v1/summary/monthly", None),
+        ("summary", "summary/monthly-12", "/api/v1/summary/monthly?months=12", None),
+        ("summary", "summary/monthly-categories",
+         "/api/v1/summary/monthly-categories", None),
+        ("summary", "summary/aggregate-weekly",
+         "/api/v1/summary/aggregate?granularity=week&group_by=category"
+         "&start_date=2024-01-01&end_date=2024-12-31", None),
+        ("income", "income/all", "/api/v1/income/", None),
+        ("income", "income/by-month", f"/api/v1/income/by-month?month={month}", None),
+        ("travel", "travel/summary", "/api/v1/travel/", None),
+        ("budget", "budget/all", "/api/v1/budget/", None),
+        ("budget", "budget/category", "/api/v1/budget/category?category=Food", None),
+        ("budget", "budget/vs-actual", f"/api/v1/budget/vs-actual?month={month}", None),
+        ("budget", "budget/daily", "/api/v1/budget/daily?as_of=2024-06-15", None),
+        ("dashboard", "dashboard/widgets", "/api/v1/dashboard/", dashboard),
+        ("search", "search/word", "/api/v1/search/?q=coffee&limit=50", None),
+        ("search", "search/totals", "/api/v1/search/?q=trip&totals=true", None),
+        ("analytics", "analytics/anomalies", "/api/v1/analytics/anomalies", None),
+        ("export", "export/ndjson", "/api/v1/export/transactions?format=ndjson", None),
+        ("export", "export/csv-filtered",
+         "/api/v1/export/transactions?format=csv&start_date=2024-01-01&end_date=2024-06-30", None),
+    ]
+
+
+async def time_endpoint(client, url, body, iterations, concurrency, max_seconds, use_cache):
+    from app.services.cache import response_cache
+
+    method = "GET" if body is None else "POST"
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    deadline = time.perf_counter() + max_seconds
+
+    async def one_request():
+        async with semaphore:
+            if time.perf_counter() > deadline and len(latencies) >= 3:
+                return
+            if not use_cache:
+                response_cache.clear()
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    # One untimed warm-up request
+    await client.request(method, url, json=body)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(iterations)))
+    wall = time.perf_counter() - wall_start
+
+    return {
+        "iterations": len(latencies),
+        "concurrency": concurrency,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "throughput_rps": len(latencies) / wall if wall else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def run_endpoints(args, selected):
+    import httpx
+
+    from app.main import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for router, name, url, body in endpoint_scenarios():
+            if not selected(name):
+                continue
+            result = await time_endpoint(client, url, body, args.iterations, args.concurrency,
+                                         args.max_seconds, args.cache)
+            result["router"] = router
+            results[name] = result
+            print(f"{name:32s} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  "
+                  f"{result['throughput_rps']:9.1f} req/s")
+    return results
+
+
+def run_sync(args, selected, fake_state):
+    from sqlalchemy import delete
+
+    from app.database.base import SessionLocal
+    from app.models import Income, SyncSeen, SyncState, Transactions
+    from app.notion.notion_connector import sync_transactions
+    from app.notion.transport import transport_stats
+    from app.services import rollups
+
+    results = {}
+    if not any(selected(name) for name in ("sync/cold", "sync/warm", "sync/incremental")):
+        return results
+
+    def timed_sync(name, full):
+        if not selected(name):
+            return
+        requests_before = transport_stats.snapshot()["requests"]
+        start = time.perf_counter()
+        stats = sync_transactions(full=full)
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "router": "sync",
+            "seconds": elapsed,
+            "rows": stats["total"],
+            "throughput_rows_per_s": stats["total"] / elapsed if elapsed else None,
+            "notion_requests": transport_stats.snapshot()["requests"] - requests_before,
+            "stats": stats,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        print(f"{name:32s} {elapsed:9.2f} s  {stats['total']} rows  "
+              f"{results[name]['throughput_rows_per_s']:9.1f} rows/s")
+
+    # Cold: start from empty tables and no watermark
+    with SessionLocal() as db:
+        for model in (Transactions, Income, SyncState, SyncSeen):
+            db.execute(delete(model))
+        for model in (Transactions, Income):
+            rollups.rebuild(db, model)
+        db.commit()
+    timed_sync("sync/cold", full=True)
+
+    # Warm: everything is already up to date
+    timed_sync("sync/warm", full=True)
+
+    # Incremental: 1% of pages edited after the watermark
+    edited = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    with fake_state.lock:
+        pages = list(fake_state.pages.values())
+        for page in pages[::100]:
+            page["last_edited_time"] = edited
+            page["properties"]["Amount"]["number"] += 1
+    timed_sync("sync/incremental", full=False)
+
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark scenarios")
+    parser.add_argument("--size", default="10k",
+                        help="10k, 100k, 1m or a row count")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-generate", action="store_true",
+                        help="Reuse the data already in --db")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--max-seconds", type=float, default=20,
+                        help="Stop a scenario early after this long")
+    parser.add_argument("--cache", action="store_true",
+                        help="Keep the response cache between requests")
+    parser.add_argument("--sync-rows", type=int, default=10_000,
+                        help="Pages served by the fake Notion server")
+    parser.add_argument("--only", action="append",
+                        help="Only run scenarios whose name starts with this prefix")
+    parser.add_argument("--no-metrics", action="store_true",
+                        help="Run with request and SQL metrics disabled")
+    parser.add_argument("--sync-db", action="store_true",
+                        help="Serve reads through the sync Session in the threadpool instead of AsyncSession")
+    parser.add_argument("--out", default=DEFAULT_REPORT)
+    args = parser.parse_args()
+
+    # Everything the app reads at import time has to be set up first
+    configure_database(args.db)
+    from app.notion.fake_notion import FakeNotion, generate_pages, serve
+
+    fake_state = FakeNotion(generate_pages(args.sync_rows, seed=args.seed))
+    server, base_url = serve(fake_state)
+    os.environ.update({
+        "NOTION_BASE_URL": base_url,
+        "NOTION_API_KEY": "benchmark",
+        "NOTION_DATABASE_ID": "benchmark",
+        "NOTION_RATE_LIMIT": "10000",
+        "METRICS_ENABLED": "false" if args.no_metrics else "true",
+        "ASYNC_DB": "false" if args.sync_db else "true",
+    })
+
+    import logging
+    logging.disable(logging.INFO)
+
+    from benchmarks.generate import populate
+
+    def selected(name):
+        return not args.only or any(name.startswith(prefix) for prefix in args.only)
+
+    size = parse_size(args.size)
+    if not args.skip_generate:
+        start = time.perf_counter()
+        populate(size, seed=args.seed)
+        print(f"Generated {size} transactions in {time.perf_counter() - start:.1f}s")
+
+    scenarios = asyncio.run(run_endpoints(args, selected))
+    scenarios.update(run_sync(args, selected, fake_state))
+    server.shutdown()
+
+    report = {
+        "meta": {
+            "size": size,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "cache": args.cache,
+            "metrics": not args.no_metrics,
+            "async_db": not args.sync_db,
+            "sync_rows": args.sync_rows,
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": date.today().isoformat(),
+        },
+        "scenarios": scenarios,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
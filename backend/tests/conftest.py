@@ -0,0 +1,60 @@
+"""
+Shared fixtures. The app reads its settings and the Notion configuration
+when it is first imported, so the test database and a fake Notion server are
+set up here, before any test imports app.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_data_dir = tempfile.mkdtemp(prefix="finance-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_data_dir, 'test.db')}"
+os.environ["NOTION_API_KEY"] = "test"
+os.environ["NOTION_DATABASE_ID"] = "test-db"
+os.environ["NOTION_RATE_LIMIT"] = "1000"
+os.environ["NOTION_BACKOFF_BASE_SECONDS"] = "0"
+
+from app.notion.fake_notion import FakeNotion, serve  # noqa: E402
+
+notion_state = FakeNotion()
+_server, os.environ["NOTION_BASE_URL"] = serve(notion_state)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+
+from app.database.base import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Income, SyncSeen, SyncState, Transactions  # noqa: E402
+from app.services import data_version, rollups  # noqa: E402
+from app.services.cache import response_cache  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def notion():
+    """The fake Notion database, emptied along with the synced tables."""
+    with notion_state.lock:
+        notion_state.pages.clear()
+        notion_state.throttle_every = notion_state.fail_every = 0
+    with SessionLocal() as db:
+        for model in (Transactions, Income, SyncState, SyncSeen):
+            db.execute(delete(model))
+        for model in (Transactions, Income):
+            rollups.rebuild(db, model)
+        db.commit()
+    data_version.bump()
+    response_cache.clear()
+    return notion_state
+
+
+@pytest.fixture
+def db():
+    with SessionLocal() as db:
+        yield db
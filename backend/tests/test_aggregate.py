@@ -0,0 +1,86 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+import pytest
+
+from app.core.config import get_settings
+from app.notion.fake_notion import make_page
+from app.notion.notion_connector import sync_transactions
+from app.services.cache import response_cache
+
+CATEGORIES = ["Food", "Rent", "Travel"]
+
+
+@pytest.fixture
+def spending(notion):
+    """(day, category, amount) of 120 transactions over the first half of 2024."""
+    rows = []
+    for i in range(120):
+        day = date(2024, 1, 1) + timedelta(days=i * 3 // 2)
+        category, amount = CATEGORIES[i % 3], float(1 + i % 11)
+        page = make_page(f"page-{i:03d}", f"Purchase {i}", amount, day.isoformat(), category)
+        notion.pages[page["id"]] = page
+        rows.append((day, category, amount))
+    sync_transactions(full=True)
+    return rows
+
+
+def report(client, **params):
+    response_cache.clear()
+    response = client.get("/api/v1/summary/aggregate", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_weekly_buckets(client, spending):
+    # The range is widened to whole weeks: from Monday 2024-01-29 (2024-03-31 is a Sunday)
+    expected = defaultdict(lambda: [0.0, 0, 0.0])
+    for day, category, amount in spending:
+        if date(2024, 1, 29) <= day <= date(2024, 3, 31):
+            totals = expected[((day - timedelta(days=day.weekday())).isoformat(), category)]
+            totals[0] += amount
+            totals[1] += 1
+            totals[2] = max(totals[2], amount)
+
+    body = report(client, granularity="week", group_by="category", measures=["sum", "count", "max"],
+                  start_date="2024-02-01", end_date="2024-03-31")
+    assert body["start"] == "2024-01-29"
+    got = {(row["bucket"], row["groups"]["category"]):
+           [row["values"]["sum"], row["values"]["count"], row["values"]["max"]]
+           for row in body["rows"]}
+    assert got == pytest.approx(dict(expected))
+
+
+def test_quarter_compare(client, spending):
+    body = report(client, granularity="quarter", start_date="2024-04-01", end_date="2024-06-30",
+                  compare=True)
+    (row,) = body["rows"]
+    current = sum(amount for day, _, amount in spending if day >= date(2024, 4, 1))
+    previous = sum(amount for day, _, amount in spending if day < date(2024, 4, 1))
+    assert row["bucket"] == "2024-Q2"
+    assert row["values"]["sum"] == pytest.approx(current)
+    assert row["previous"]["sum"] == pytest.approx(previous)
+    assert row["change"]["sum"] == pytest.approx(current / previous - 1)
+
+
+@pytest.mark.parametrize("params", [
+    {"granularity": "week", "group_by": ["category", "method"], "measures": ["sum", "avg", "max"]},
+    {"granularity": "day", "start_date": "2024-03-01", "end_date": "2024-03-20", "compare": True},
+    {"granularity": "year", "group_by": "sub_category", "measures": ["count"]},
+])
+def test_memory_engine_matches_sql(client, spending, monkeypatch, params):
+    sql = report(client, **params)
+    monkeypatch.setattr(get_settings(), "ANALYTICS_ENGINE", "memory")
+    memory = report(client, **params)
+    assert sql["rows"] and len(memory["rows"]) == len(sql["rows"])
+    for got, expected in zip(memory["rows"], sql["rows"]):
+        assert (got["bucket"], got["groups"]) == (expected["bucket"], expected["groups"])
+        for part in ("values", "previous"):
+            if expected.get(part) is not None:
+                assert got[part] == pytest.approx(expected[part])
+
+
+def test_invalid_report_is_rejected(client):
+    response = client.get("/api/v1/summary/aggregate",
+                          params={"source": "income", "group_by": "category"})
+    assert response.status_code == 400
@@ -0,0 +1,104 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.services.anomalies import flagged, score_months, split_months
+from app.services.dates import julian_day, month_number
+
+GROCERIES, RENT, COFFEE, GIFTS, FEES = 1, 2, 3, 4, 5
+
+# (id, category, amount, date). January to March are the history of April
+ROWS = [
+    # Median 14, deviations 4 2 0 6 86: MAD 4, spread 4 / 0.6745
+    (1, GROCERIES, 10.0, date(2024, 1, 5)),
+    (2, GROCERIES, 12.0, date(2024, 1, 20)),
+    (3, GROCERIES, 14.0, date(2024, 2, 5)),
+    (4, GROCERIES, 20.0, date(2024, 2, 20)),
+    (5, GROCERIES, 100.0, date(2024, 3, 5)),
+    # Identical amounts: MAD and mean deviation are 0, spread 5% of the median
+    (6, RENT, 1000.0, date(2024, 1, 1)),
+    (7, RENT, 1000.0, date(2024, 2, 1)),
+    (8, RENT, 1000.0, date(2024, 3, 1)),
+    # Median 4, MAD 0, mean deviation 6 / 5 = 1.2: spread 1.2 / 0.7979
+    (9, COFFEE, 4.0, date(2024, 1, 10)),
+    (10, COFFEE, 4.0, date(2024, 1, 11)),
+    (11, COFFEE, 4.0, date(2024, 2, 10)),
+    (12, COFFEE, 4.0, date(2024, 3, 10)),
+    (13, COFFEE, 10.0, date(2024, 3, 11)),
+    # A single row of history is too little to score against
+    (14, GIFTS, 5.0, date(2024, 3, 15)),
+    # Median 0: spread MIN_SPREAD
+    (15, FEES, 0.0, date(2024, 1, 2)),
+    (16, FEES, 0.0, date(2024, 2, 2)),
+    (17, FEES, 0.0, date(2024, 3, 2)),
+    # April
+    (20, GROCERIES, 50.0, date(2024, 4, 3)),
+    (21, GROCERIES, 16.0, date(2024, 4, 4)),
+    (22, RENT, 1100.0, date(2024, 4, 1)),
+    (23, RENT, 1300.0, date(2024, 4, 2)),
+    (24, COFFEE, 10.0, date(2024, 4, 5)),
+    (25, GIFTS, 500.0, date(2024, 4, 6)),
+    (26, FEES, 0.05, date(2024, 4, 7)),
+]
+
+# id -> (score, median, history), worked out by hand from the comments above
+EXPECTED = {
+    20: ((50 - 14) * 0.6745 / 4, 14.0, 5),
+    21: ((16 - 14) * 0.6745 / 4, 14.0, 5),
+    22: (100 / 50, 1000.0, 3),
+    23: (300 / 50, 1000.0, 3),
+    24: ((10 - 4) * 0.7979 / 1.2, 4.0, 5),
+    26: (0.05 / 0.01, 0.0, 3),
+}
+
+
+@pytest.fixture
+def months():
+    rows = np.array([(id, category, amount, julian_day(day)) for id, category, amount, day in ROWS])
+    months = split_months(rows)
+    return score_months(months, months, window=3, min_history=3)
+
+
+def scores_by_id(month):
+    return {id: (score, median, history) for id, score, median, history
+            in zip(month.ids.tolist(), month.scores, month.median, month.history.tolist())}
+
+
+def test_scores_match_hand_computed(months):
+    assert sorted(months) == [month_number(date(2024, m, 1)) for m in range(1, 5)]
+    april = scores_by_id(months[month_number(date(2024, 4, 1))])
+    for id, (score, median, history) in EXPECTED.items():
+        assert april[id][0] == pytest.approx(score)
+        assert april[id][1] == pytest.approx(median)
+        assert april[id][2] == history
+
+    # Single-row history: counted, not scored
+    score, median, history = april[25]
+    assert np.isnan(score) and np.isnan(median)
+    assert history == 1
+
+
+def test_months_without_history_are_not_scored(months):
+    january = months[month_number(date(2024, 1, 1))]
+    assert np.isnan(january.scores).all()
+    assert (january.history == 0).all()
+
+
+def test_flagged_newest_first(months):
+    ids, scores, medians, histories = flagged(months, min_score=3.5, start=date(2024, 4, 1))
+    # The April rows at or above 3.5, by date descending
+    assert ids.tolist() == [26, 24, 20, 23]
+    assert scores.tolist() == pytest.approx([EXPECTED[id][0] for id in ids.tolist()])
+    assert medians.tolist() == pytest.approx([EXPECTED[id][1] for id in ids.tolist()])
+    assert histories.tolist() == [EXPECTED[id][2] for id in ids.tolist()]
+
+    ids, *_ = flagged(months, min_score=3.5, start=date(2024, 4, 2), end=date(2024, 4, 5),
+                      categories={RENT, COFFEE})
+    assert ids.tolist() == [24, 23]
+
+    # March against January and February: coffee 10 against three 4s (spread
+    # 0.2), groceries 100 against 10 12 14 20 (median 13, MAD 2)
+    ids, scores, *_ = flagged(months, min_score=3.5, end=date(2024, 3, 31))
+    assert ids.tolist() == [13, 5]
+    assert scores.tolist() == pytest.approx([6 / 0.2, 87 * 0.6745 / 2])
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import delete
+
+from app.database.base import SessionLocal
+from app.models import Budget
+from app.services import data_version
+
+
+@pytest.fixture
+def no_budgets():
+    def clear():
+        with SessionLocal() as db:
+            db.execute(delete(Budget))
+            db.commit()
+        data_version.bump()
+    clear()
+    yield
+    clear()
+
+
+def save(client, budgets):
+    return client.post("/api/v1/budget/bulk", json=[
+        {"category": category, "budget_amount": amount} for category, amount in budgets])
+
+
+def stored(client):
+    return {row["category"]: row["budget_amount"] for row in client.get("/api/v1/budget/").json()}
+
+
+def test_bulk_inserts_and_updates(client, no_budgets):
+    response = save(client, [("Food", 300.0), ("Rent", 2000.0)])
+    assert response.status_code == 200
+    created = {row["category"]: row for row in response.json()}
+    assert stored(client) == {"Food": 300.0, "Rent": 2000.0}
+
+    # Food changes, Rent is kept, Travel is new; the later Travel entry wins
+    response = save(client, [("Food", 350.0), ("Rent", 2000.0), ("Travel", 100.0), ("Travel", 150.0)])
+    assert response.status_code == 200
+    rows = response.json()
+    assert [row["category"] for row in rows] == ["Food", "Rent", "Travel", "Travel"]
+    assert stored(client) == {"Food": 350.0, "Rent": 2000.0, "Travel": 150.0}
+    updated = {row["category"]: row for row in rows}
+    assert updated["Food"]["id"] == created["Food"]["id"]
+    assert updated["Food"]["updated_at"] > created["Food"]["updated_at"]
+    assert updated["Rent"]["updated_at"] == created["Rent"]["updated_at"]
+
+
+def test_unchanged_bulk_save_keeps_data_version(client, no_budgets):
+    save(client, [("Food", 300.0), ("Rent", 2000.0)])
+    version = data_version.current()
+    response = save(client, [("Rent", 2000.0), ("Food", 300.0)])
+    assert response.status_code == 200
+    assert data_version.current() == version
+
+    save(client, [("Food", 301.0)])
+    assert data_version.current() == version + 1
+
+
+@pytest.mark.parametrize("body", [
+    [{"category": "Food"}],
+    [{"category": "Food", "budget_amount": "lots"}],
+    [{"budget_amount": 10.0}],
+    {"category": "Food", "budget_amount": 10.0},
+])
+def test_bulk_validation_errors(client, no_budgets, body):
+    response = client.post("/api/v1/budget/bulk", json=body)
+    assert response.status_code == 422
+    assert stored(client) == {}
+
+
+def test_empty_bulk_save(client, no_budgets):
+    response = client.post("/api/v1/budget/bulk", json=[])
+    assert response.status_code == 200
+    assert response.json() == []
@@ -0,0 +1,88 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.models import Income
+from app.services import cache, data_version, rollups
+from app.services.cache import response_cache
+
+
+@pytest.mark.parametrize("url", ["/api/v1/income/", "/api/v1/table/"])
+def test_streamed_list_is_tagged_but_not_stored(client, notion, db, url):
+    db.add(Income(name="Salary", amount=1000.0, account="Checking"))
+    db.commit()
+    data_version.bump()
+
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    assert not response_cache.entries
+
+    # The version tag answers conditional requests without streaming again
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    data_version.bump()
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_non_streamed_responses_are_stored(client, notion):
+    response = client.get("/api/v1/income/by-month?month=2024-03")
+    assert response.status_code == 200
+    assert not response.headers["etag"].startswith("W/")
+    assert len(response_cache.entries) == 1
+
+
+def add_income(db, amount):
+    db.add(Income(name="Salary", amount=amount, account="Checking", date_received=datetime(2024, 3, 1)))
+    db.flush()
+    rollups.rebuild(db, Income)
+    db.commit()
+    data_version.bump()
+
+
+def test_if_none_match_gets_304(client, notion):
+    url = "/api/v1/income/by-month?month=2024-03"
+    etag = client.get(url).headers["etag"]
+    hits = response_cache.hits
+
+    response = client.get(url, headers={"If-None-Match": f'"other", {etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert response_cache.hits == hits + 1
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_etag_changes_after_bump(client, notion, db):
+    url = "/api/v1/income/by-month?month=2024-03"
+    add_income(db, 1000.0)
+    etag = client.get(url).headers["etag"]
+
+    add_income(db, 500.0)
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["total"] == 1500.0
+
+
+def test_key_rolls_over_with_the_day(client, notion, monkeypatch):
+    url = "/api/v1/summary/monthly?months=3"
+    client.get(url)
+    misses = response_cache.misses
+    client.get(url)
+    assert response_cache.misses == misses
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+
+    monkeypatch.setattr(cache, "date", Tomorrow)
+    client.get(url)
+    assert response_cache.misses == misses + 1
+    assert len(response_cache.entries) == 2
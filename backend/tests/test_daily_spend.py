@@ -0,0 +1,68 @@
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from app.models import DailySpend
+from app.notion.fake_notion import make_page
+from app.notion.notion_connector import sync_transactions
+from app.services import rollups
+
+
+def daily_rows(db):
+    return db.execute(select(DailySpend.category_id, DailySpend.day, DailySpend.total,
+                             DailySpend.cumulative)
+                      .order_by(DailySpend.category_id, DailySpend.day)).all()
+
+
+def assert_matches_rebuild(db):
+    synced = daily_rows(db)
+    rollups.rebuild_days(db)
+    rebuilt = daily_rows(db)
+    db.rollback()
+    assert synced == rebuilt
+
+
+def test_sync_running_totals_match_rebuild(notion, db):
+    for i in range(30):
+        page = make_page(f"page-{i}", f"Lunch {i}", 10.0 + i, f"2024-0{1 + i % 3}-{1 + i:02d}",
+                         "Food" if i % 2 else "Rent",
+                         last_edited_time=f"2024-04-{1 + i % 9:02d}T12:00:00.000Z")
+        notion.pages[page["id"]] = page
+    sync_transactions(full=True)
+    assert daily_rows(db)
+    assert_matches_rebuild(db)
+
+    # An incremental sync that edits a day in the middle of the history
+    page = notion.pages["page-4"]
+    page["properties"]["Amount"]["number"] = 500.0
+    page["last_edited_time"] = "2024-05-01T12:00:00.000Z"
+    sync_transactions(full=False)
+    assert_matches_rebuild(db)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after_first_page(stats, stage_seconds):
+    raise Interrupted
+
+
+def test_interrupted_sync_leaves_running_totals_current(client, notion, db):
+    # Newest first: the first page of 100 holds every March day
+    last = date(2024, 3, 28)
+    for i in range(250):
+        page = make_page(f"page-{i:03d}", f"Lunch {i}", 10.0 + i % 5,
+                         (last - timedelta(days=i)).isoformat(), "Food")
+        notion.pages[page["id"]] = page
+    try:
+        sync_transactions(full=True, progress=interrupt_after_first_page)
+    except Interrupted:
+        pass
+
+    march = sum(10.0 + i % 5 for i in range(28))
+    body = client.get("/api/v1/budget/daily", params={"as_of": last.isoformat()}).json()
+    assert body["total_spent"] == march
+    assert body["categories"][0]["series"][-1]["spent"] == march
+    assert client.get("/api/v1/summary/categories", params={"month": "2024-03"}).json() == {"Food": march}
+    assert_matches_rebuild(db)
@@ -0,0 +1,112 @@
+import asyncio
+import csv
+import gzip
+import io
+import time
+
+import orjson
+import pytest
+
+from app.api.v1.endpoints.export import export_body
+from app.notion.fake_notion import make_page
+from app.notion.notion_connector import sync_transactions
+
+PAGES = [
+    ("page-1", "Coffee", 4.5, "2024-01-15", "Food"),
+    ("page-2", "Rent", 1500.0, "2024-02-01", "Housing"),
+    ("page-3", "Flight", 320.0, "2024-03-10", "Travel"),
+]
+
+
+@pytest.fixture
+def synced(notion):
+    for page_id, name, amount, day, category in PAGES:
+        page = make_page(page_id, name, amount, day, category)
+        notion.pages[page["id"]] = page
+    sync_transactions(full=True)
+    return notion
+
+
+def test_ndjson(client, synced):
+    response = client.get("/api/v1/export/transactions")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert 'filename="transactions.ndjson"' in response.headers["content-disposition"]
+    rows = [orjson.loads(line) for line in response.content.splitlines()]
+    # Oldest first
+    assert [(row["name"], row["amount"], row["category"]) for row in rows] == [
+        (name, amount, category) for _, name, amount, _, category in PAGES]
+    assert rows[0]["date"].startswith("2024-01-15")
+
+
+def test_csv(client, synced):
+    response = client.get("/api/v1/export/transactions", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    header, *rows = csv.reader(io.StringIO(response.text))
+    assert header[:3] == ["id", "notion_id", "name"]
+    names = [dict(zip(header, row))["name"] for row in rows]
+    assert names == ["Coffee", "Rent", "Flight"]
+
+
+def test_gzipped_csv(client, synced):
+    response = client.get("/api/v1/export/transactions", params={"format": "csv", "gzip": True})
+    assert response.headers["content-type"] == "application/gzip"
+    plain = client.get("/api/v1/export/transactions", params={"format": "csv"})
+    assert gzip.decompress(response.content) == plain.content
+
+
+def test_parquet(client, synced):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    response = client.get("/api/v1/export/transactions", params={"format": "parquet"})
+    assert response.status_code == 200
+    table = parquet.read_table(io.BytesIO(response.content))
+    assert table.column("name").to_pylist() == ["Coffee", "Rent", "Flight"]
+    assert table.column("amount").to_pylist() == [4.5, 1500.0, 320.0]
+    assert str(table.schema.field("date").type) == "timestamp[us]"
+
+
+def test_parquet_is_not_gzipped(client, synced):
+    response = client.get("/api/v1/export/transactions", params={"format": "parquet", "gzip": True})
+    assert response.status_code in (400, 501)
+
+
+def test_date_filters(client, synced):
+    def names(**params):
+        response = client.get("/api/v1/export/transactions", params=params)
+        assert response.status_code == 200
+        return [orjson.loads(line)["name"] for line in response.content.splitlines()]
+
+    assert names(start_date="2024-02-01") == ["Rent", "Flight"]
+    assert names(end_date="2024-02-01") == ["Coffee", "Rent"]
+    assert names(start_date="2024-02-01", end_date="2024-02-01") == ["Rent"]
+    assert names(start_date="2024-04-01") == []
+
+    response = client.get("/api/v1/export/transactions",
+                          params={"start_date": "2024-03-01", "end_date": "2024-02-01"})
+    assert response.status_code == 400
+
+
+def test_disconnect_stops_and_joins_the_producer():
+    state = {"closed": False, "reading": False}
+
+    def chunks():
+        try:
+            for i in range(100):
+                state["reading"] = True
+                # A batch slower than prefetch's default join timeout
+                time.sleep(1.2 if i else 0)
+                state["reading"] = False
+                yield b"%d\n" % i
+        finally:
+            state["closed"] = True
+
+    async def read_one_and_disconnect():
+        body = export_body(chunks())
+        first = await body.__anext__()
+        await body.aclose()
+        return first
+
+    assert asyncio.run(read_one_and_disconnect()) == b"0\n"
+    # The producer was mid-read when the client went away; it was waited for
+    assert state == {"closed": True, "reading": False}
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import select
+
+from app.core import metrics
+from app.database.base import ReadSessionLocal
+from app.models import Transactions
+from app.notion.fake_notion import make_page
+from app.notion.notion_connector import sync_transactions
+
+
+@pytest.fixture
+def stats(notion):
+    for i in range(3):
+        page = make_page(f"page-{i}", f"Item {i}", 10.0 * (i + 1), f"2024-03-{i + 1:02d}", "Food")
+        notion.pages[page["id"]] = page
+    sync_transactions(full=True)
+    stats = [0, 0.0, 0]
+    token = metrics._request_stats.set(stats)
+    yield stats
+    metrics._request_stats.reset(token)
+
+
+def test_rows_are_counted_as_they_are_read(stats):
+    with ReadSessionLocal() as session:
+        result = session.execute(select(Transactions).order_by(Transactions.date))
+        # Nothing is read ahead of the caller
+        assert stats[2] == 0
+        rows = result.scalars().all()
+        assert [row.name for row in rows] == ["Item 0", "Item 1", "Item 2"]
+        assert rows[0].category == "Food"
+        assert stats[2] == 3
+
+        # Partly read results are closed and count what was read
+        assert session.execute(select(Transactions.name).order_by(Transactions.date)).first() == ("Item 0",)
+        assert stats[2] == 4
+        amount = session.execute(
+            select(Transactions.amount).where(Transactions.name == "Item 2")).scalar_one()
+        assert amount == 30.0
+        assert stats[2] == 5
+
+
+def test_streamed_rows_are_not_counted(stats):
+    with ReadSessionLocal() as session:
+        result = session.execute(select(Transactions).execution_options(yield_per=2))
+        assert len(result.scalars().all()) == 3
+    assert stats[2] == 0
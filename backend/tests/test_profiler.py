@@ -0,0 +1,27 @@
+from sqlalchemy import event
+
+from app.database import profiler
+from app.database.base import async_read_engine
+from app.services.cache import response_cache
+
+
+def test_slow_query_log_on_async_reads(client, notion):
+    # SLOW_QUERY_MS=0 with the default ASYNC_DB=true
+    assert async_read_engine is not None
+    engine = async_read_engine.sync_engine
+    profiler.slow_query_log.clear()
+    profiler.install(engine, 0)
+    try:
+        response_cache.clear()
+        response = client.get("/api/v1/summary/monthly")
+        assert response.status_code == 200
+
+        entries = profiler.slow_query_log.snapshot()
+        assert entries
+        assert all(not line.startswith("EXPLAIN failed")
+                   for entry in entries for line in entry["plan"])
+    finally:
+        event.remove(engine, "before_cursor_execute", profiler.before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", profiler.after_cursor_execute)
+        profiler.slow_query_log.threshold_ms = None
+        profiler.slow_query_log.clear()
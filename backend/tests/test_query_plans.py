@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import delete
+
+from app.database.base import SessionLocal
+from app.database.query_plans import check_summary_endpoints
+from app.models import Budget
+from app.services import data_version
+from benchmarks.generate import populate
+
+
+@pytest.fixture
+def generated(notion):
+    """Synthetic transactions, income and budgets, as the benchmarks generate them."""
+    populate(2000)
+    data_version.bump()
+    yield
+    with SessionLocal() as db:
+        db.execute(delete(Budget))
+        db.commit()
+    data_version.bump()
+
+
+def test_summary_queries_use_indexes(client, generated):
+    report = check_summary_endpoints(client)
+    problems = {url: [line for _, _, lines in results for line in lines]
+                for url, results in report.items()}
+    assert all(report.values())
+    assert not any(problems.values()), problems
@@ -0,0 +1,57 @@
+from datetime import datetime, UTC
+
+from sqlalchemy import text
+
+from app.database.base import SessionLocal
+from app.notion.fake_notion import make_page
+from app.notion.notion_connector import sync_transactions
+
+
+def edited_now():
+    return datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def found(client, q):
+    response = client.get("/api/v1/search/", params={"q": q, "totals": True})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["totals"]["count"] == len(body["items"])
+    return sorted(item["name"] for item in body["items"])
+
+
+def assert_index_consistent():
+    """FTS5 integrity-check compares the index with the TransactionsText rows."""
+    with SessionLocal() as db:
+        db.execute(text("""INSERT INTO "TransactionsSearch"("TransactionsSearch", rank)
+                           VALUES ('integrity-check', 1)"""))
+
+
+def test_search_follows_updates_and_deletes(client, notion):
+    for page in (
+        make_page("groceries", "Whole Foods Market", 50.0, "2024-03-01", "Groceries"),
+        make_page("coffee", "Blue Bottle", 5.0, "2024-03-02", "Food", sub_category="Coffee"),
+    ):
+        notion.pages[page["id"]] = page
+    sync_transactions(full=True)
+    assert found(client, "whole foo") == ["Whole Foods Market"]
+    assert found(client, "coffee") == ["Blue Bottle"]
+    assert_index_consistent()
+
+    # A renamed page and a changed sub-category are reindexed
+    notion.pages["groceries"]["properties"]["Name"]["title"][0]["text"]["content"] = "Trader Joe's"
+    notion.pages["groceries"]["last_edited_time"] = edited_now()
+    notion.pages["coffee"]["properties"]["Subcategory"]["select"]["name"] = "Cafe"
+    notion.pages["coffee"]["last_edited_time"] = edited_now()
+    sync_transactions()
+    assert found(client, "whole") == []
+    assert found(client, "trader") == ["Trader Joe's"]
+    assert found(client, "coffee") == []
+    assert found(client, "cafe") == ["Blue Bottle"]
+    assert_index_consistent()
+
+    # Rows deleted by a full sync drop out of the index
+    del notion.pages["groceries"]
+    sync_transactions(full=True)
+    assert found(client, "trader") == []
+    assert found(client, "blue") == ["Blue Bottle"]
+    assert_index_consistent()
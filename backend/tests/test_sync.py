@@ -0,0 +1,140 @@
+from datetime import datetime, UTC
+
+from sqlalchemy import select
+
+from app.database.base import SessionLocal
+from app.models import Income, SyncState, Transactions
+from app.notion.fake_notion import make_page
+from app.notion.notion_connector import sync_transactions
+from app.services import data_version
+from app.services.cache import response_cache
+
+
+def add_page(notion, page_id, amount, last_edited_time="2024-01-01T00:00:00.000Z", day="2024-03-01",
+             category="Food"):
+    page = make_page(page_id, f"Purchase {page_id}", amount, day, category,
+                     last_edited_time=last_edited_time)
+    notion.pages[page_id] = page
+    return page
+
+
+def now():
+    return datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def stored_amounts(model=Transactions):
+    """notion_id -> amount of the synced rows of model."""
+    with SessionLocal() as db:
+        return dict(db.execute(select(model.notion_id, model.amount)).all())
+
+
+def sync_state():
+    with SessionLocal() as db:
+        return db.scalar(select(SyncState))
+
+
+def test_watermark_capped_at_sync_start(notion):
+    # A clock ahead of ours must not push the watermark past the sync start
+    add_page(notion, "ahead", 10.0, last_edited_time="2099-01-01T00:00:00.000Z")
+    add_page(notion, "other", 20.0)
+    sync_transactions(full=True)
+    assert sync_state().last_edited_watermark <= now()
+
+    # An edit made after that sync is still picked up incrementally
+    page = notion.pages["other"]
+    page["properties"]["Amount"]["number"] = 25.0
+    page["last_edited_time"] = now()
+    stats = sync_transactions()
+    assert stats["mode"] == "incremental"
+    assert stored_amounts()["other"] == 25.0
+
+
+def test_incremental_sync_and_deletions(client, notion):
+    old = "2023-12-01T00:00:00.000Z"
+    add_page(notion, "a", 10.0, last_edited_time=old, day="2024-01-05")
+    add_page(notion, "b", 20.0, day="2024-02-05")
+    add_page(notion, "c", 30.0, last_edited_time=old, day="2024-02-10")
+    add_page(notion, "pay", 1000.0, last_edited_time=old, day="2024-02-01", category="income")
+    stats = sync_transactions(full=True)
+    assert (stats["mode"], stats["created"]) == ("full", 4)
+    assert stored_amounts() == {"a": 10.0, "b": 20.0, "c": 30.0}
+    assert stored_amounts(Income) == {"pay": 1000.0}
+
+    # Only pages edited since the watermark (b's first edit) are fetched
+    notion.pages["b"]["properties"]["Amount"]["number"] = 25.0
+    notion.pages["b"]["last_edited_time"] = now()
+    add_page(notion, "d", 40.0, last_edited_time=now(), day="2024-03-01")
+    stats = sync_transactions()
+    assert stats["mode"] == "incremental"
+    assert (stats["total"], stats["created"], stats["updated"]) == (2, 1, 1)
+    assert stored_amounts() == {"a": 10.0, "b": 25.0, "c": 30.0, "d": 40.0}
+
+    # Deleted pages are only noticed by a full sync, in both tables
+    del notion.pages["c"], notion.pages["pay"]
+    stats = sync_transactions()
+    assert stats["deleted"] == 0
+    assert "c" in stored_amounts()
+    stats = sync_transactions(full=True)
+    assert (stats["deleted"], stats["unchanged"]) == (2, 3)
+    assert stored_amounts() == {"a": 10.0, "b": 25.0, "d": 40.0}
+    assert stored_amounts(Income) == {}
+
+    # The rollups follow the deletions
+    months = client.get("/api/v1/summary/monthly").json()
+    assert {month: total for month, total in months.items() if total} == {
+        "2024-01": 10.0, "2024-02": 25.0, "2024-03": 40.0}
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after_first_page(stats, stage_seconds):
+    raise Interrupted
+
+
+def test_resume_interrupted_full_sync(notion):
+    for i in range(250):
+        add_page(notion, f"page-{i:03d}", float(i), day=f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}")
+    add_page(notion, "gone", 5.0)
+    sync_transactions(full=True)
+    del notion.pages["gone"]
+    notion.pages["page-100"]["properties"]["Amount"]["number"] = 1000.0
+
+    # Stop after the first page of 100 rows has been committed
+    try:
+        sync_transactions(full=True, progress=interrupt_after_first_page)
+    except Interrupted:
+        pass
+    state = sync_state()
+    assert state.resume_cursor and state.resume_mode == "full"
+
+    # The next sync picks up at the checkpoint and still reconciles deletions
+    stats = sync_transactions(full=True)
+    assert stats["resumed"] and stats["total"] == 150
+    assert stats["deleted"] == 1
+    assert sync_state().resume_cursor is None
+    amounts = stored_amounts()
+    assert len(amounts) == 250 and "gone" not in amounts
+    assert amounts["page-100"] == 1000.0
+
+
+def test_unchanged_sync_keeps_data_version(client, notion):
+    for i in range(150):
+        add_page(notion, f"page-{i:03d}", float(i), day=f"2024-{1 + i % 12:02d}-01")
+    sync_transactions(full=True)
+    version = data_version.current()
+    assert client.get("/api/v1/summary/monthly").status_code == 200
+    hits = response_cache.hits
+
+    # Every page hashes the same: nothing is written but the checkpoints
+    stats = sync_transactions(full=True)
+    assert stats["unchanged"] == 150
+    assert data_version.current() == version
+    assert client.get("/api/v1/summary/monthly").status_code == 200
+    assert response_cache.hits == hits + 1
+
+    # A real edit still bumps it
+    notion.pages["page-007"]["properties"]["Amount"]["number"] = 99.0
+    sync_transactions(full=True)
+    assert data_version.current() > version
@@ -0,0 +1,79 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Transactions
+from app.services.dimensions import DIMENSIONS, InternMap
+
+
+@pytest.fixture
+def transactions(notion, db):
+    """95 transactions with many equal dates and amounts, so the id breaks ties."""
+    start = datetime(2024, 1, 1)
+    dimensions = InternMap(db)
+    ids = {name: dimensions.id(dimension, "Food") for name, dimension in DIMENSIONS.items()}
+    db.add_all(Transactions(name=f"Purchase {i}", amount=float(i % 7),
+                            date=start + timedelta(days=i % 10),
+                            category_id=ids["category"], sub_category_id=ids["sub_category"],
+                            method_id=ids["method"]) for i in range(95))
+    db.commit()
+
+
+def walk(client, **params):
+    """Ids of every row, following next_cursor page by page."""
+    ids, cursor = [], None
+    while True:
+        response = client.get("/api/v1/table/page",
+                              params={**params, "limit": 10, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        page = response.json()
+        ids += [item["id"] for item in page["items"]]
+        if not page["has_more"]:
+            assert page["next_cursor"] is None
+            return ids
+        cursor = page["next_cursor"]
+
+
+def offset_pages(db, order_by):
+    """Ids of every row, read 10 at a time with LIMIT/OFFSET in the same order."""
+    ids, offset = [], 0
+    while True:
+        page = db.scalars(select(Transactions.id).order_by(*order_by).limit(10).offset(offset)).all()
+        if not page:
+            return ids
+        ids += page
+        offset += 10
+
+
+@pytest.mark.parametrize("sort, order", [("date", "desc"), ("date", "asc"),
+                                         ("amount", "desc"), ("amount", "asc")])
+def test_keyset_pages_match_offset_order(client, db, transactions, sort, order):
+    column = getattr(Transactions, sort)
+    if order == "desc":
+        order_by = (column.desc(), Transactions.id.desc())
+    else:
+        order_by = (column.asc(), Transactions.id.asc())
+    expected = offset_pages(db, order_by)
+    assert len(expected) == 95
+    assert walk(client, sort=sort, order=order) == expected
+
+
+def encode(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    encode({"sort": "date"}),
+    encode(["date", "desc", 12345, 1]),
+    encode(["date", "desc", "2024-01-05"]),
+    # Issued for another sort order
+    encode(["amount", "desc", 3.0, 1]),
+])
+def test_tampered_cursor_is_rejected(client, transactions, cursor):
+    response = client.get("/api/v1/table/page", params={"cursor": cursor})
+    assert response.status_code == 400
@@ -0,0 +1,77 @@
+import httpx
+import pytest
+
+from app.notion.fake_notion import FakeNotion, make_page, serve
+from app.notion.transport import RetryingTransport
+
+
+@pytest.fixture
+def fake():
+    state = FakeNotion([make_page("page-1", "Coffee", 4.5, "2024-01-15", "Food")])
+    server, base_url = serve(state)
+    yield state, f"{base_url}/v1/databases/test-db/query"
+    server.shutdown()
+    server.server_close()
+
+
+def transport(**options):
+    sleeps = []
+    options.setdefault("rate_limit", 1000)
+    return RetryingTransport(sleep=sleeps.append, **options), sleeps
+
+
+def test_retries_429_after_retry_after(fake):
+    state, url = fake
+    state.throttle_every, state.retry_after = 2, 7
+    retrying, sleeps = transport(max_retries=3)
+    with httpx.Client(transport=retrying) as client:
+        assert client.post(url, json={}).status_code == 200
+        # The second request is throttled and retried once
+        response = client.post(url, json={"page_size": 10})
+    assert response.status_code == 200
+    assert [page["id"] for page in response.json()["results"]] == ["page-1"]
+    assert state.requests == 3
+    assert sleeps == [7.0]
+    stats = retrying.stats.snapshot()
+    assert (stats["requests"], stats["throttled"], stats["retries"]) == (3, 1, 1)
+    assert stats["backoff_seconds"] == 7.0
+
+
+def test_gives_up_after_max_retries(fake):
+    state, url = fake
+    state.throttle_every, state.retry_after = 1, 2
+    retrying, sleeps = transport(max_retries=3)
+    with httpx.Client(transport=retrying) as client:
+        response = client.post(url, json={})
+    # The last 429 is handed back for notion_client to raise
+    assert response.status_code == 429
+    assert state.requests == 4
+    assert sleeps == [2.0, 2.0, 2.0]
+    stats = retrying.stats.snapshot()
+    assert (stats["throttled"], stats["retries"]) == (4, 3)
+
+
+def test_server_errors_back_off_with_jitter(fake):
+    state, url = fake
+    state.fail_every = 1
+    retrying, sleeps = transport(max_retries=4, backoff_base=0.5, backoff_max=1.5)
+    with httpx.Client(transport=retrying) as client:
+        response = client.post(url, json={})
+    assert response.status_code == 503
+    assert state.requests == 5
+    # Full jitter: each wait is between 0 and min(max, base * 2 ** attempt)
+    for attempt, delay in enumerate(sleeps):
+        assert 0 <= delay <= min(1.5, 0.5 * 2 ** attempt)
+    assert retrying.stats.snapshot()["server_errors"] == 5
+
+
+def test_connection_errors_raise_after_max_retries():
+    server, base_url = serve(FakeNotion())
+    server.shutdown()
+    server.server_close()
+    retrying, sleeps = transport(max_retries=2, backoff_base=0)
+    with httpx.Client(transport=retrying) as client:
+        with pytest.raises(httpx.ConnectError):
+            client.post(f"{base_url}/v1/databases/test-db/query", json={})
+    assert len(sleeps) == 2
+    assert retrying.stats.snapshot()["connection_errors"] == 3
@@ -0,0 +1,27 @@
+from app.api.v1.endpoints.travel import trip_totals
+from app.database.base import ReadSessionLocal
+from app.notion.fake_notion import make_page
+from app.notion.notion_connector import sync_transactions
+from app.services.snapshot import load_columns
+
+SUB_CATEGORIES = ["Roadtrip", "Daytrip", "Business Travel", "Trips", "Food", "Groceries"]
+
+
+def test_travel_matches_substrings(client, notion):
+    for i, sub_category in enumerate(SUB_CATEGORIES):
+        page = make_page(f"page-{i}", sub_category, 10.0 * (i + 1), f"2024-03-{1 + i:02d}",
+                         "Travel", sub_category=sub_category)
+        notion.pages[page["id"]] = page
+    sync_transactions(full=True)
+
+    response = client.get("/api/v1/travel/")
+    assert response.status_code == 200
+    rows = response.json()
+    # Latest first
+    assert [row["sub_category"] for row in rows] == ["Trips", "Business Travel", "Daytrip", "Roadtrip"]
+
+    # The memory engine finds the same groups
+    with ReadSessionLocal() as session:
+        columns = load_columns(session, "Transactions")
+    assert [(row["sub_category"], row["total"]) for row in trip_totals(columns)] == [
+        (row["sub_category"], row["total"]) for row in rows]
@@ -1,15 +1,27 @@
 import { Button } from "@/components/ui/button"
 import { useState } from "react"
 
+const POLL_INTERVAL_MS = 1000
+
 export default function SyncButton() {
 const [isSyncing, setIsSyncing] = useState(false)
 
   const handleSync = async () => {
     setIsSyncing(true)
     try {
+      // Starting a sync returns a job right away; poll it until it finishes
       const response = await fetch('http://localhost:8000/api/v1/sync')
-      const data = await response.json()
-      console.log('Sync completed:', data)
+      let job = await response.json()
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS))
+        const statusResponse = await fetch(`http://localhost:8000/api/v1/sync/jobs/${job.id}`)
+        job = await statusResponse.json()
+      }
+      if (job.status === 'failed') {
+        console.error('Sync failed:', job.error)
+      } else {
+        console.log('Sync completed:', job)
+      }
     } catch (error) {
       console.error('Sync failed:', error)
     } finally {
@@ -56,27 +56,16 @@ const initialBudgets: Record<string, BudgetData> = getAllCategories().reduce(
 export default function BudgetPage() {
   const [budgets, setBudgets] = useState(initialBudgets)
 
-  const fetchCategoryData = async (month: Date) => {
-    const formattedMonth = format(month, 'yyyy-MM')
-    const response = await fetch(`http://localhost:8000/api/v1/summary/categories?month=${formattedMonth}`)
-    return await response.json()
-  }
-
-  const fetchBudgetData = async () => {
+  // budget and spending per category for one month, joined by the API
+  const fetchBudgetVsActual = async (month: Date) => {
     try {
-      const response = await fetch('http://localhost:8000/api/v1/budget/')
-      const budgetData = await response.json()
-
-      // Convert array to object keyed by category
-      const budgetMap: Record<string, number> = {}
-      budgetData.forEach((item: any) => {
-        budgetMap[item.category] = item.budget_amount
-      })
-
-      return budgetMap
+      const formattedMonth = format(month, 'yyyy-MM')
+      const response = await fetch(`http://localhost:8000/api/v1/budget/vs-actual?month=${formattedMonth}`)
+      const data = await response.json()
+      return data.categories as { category: string, budget: number, spent: number }[]
     } catch (error) {
       console.error('Error fetching budget data:', error)
-      return {}
+      return []
     }
   }
 
@@ -115,43 +104,25 @@ export default function BudgetPage() {
       const now = new Date()
       const prev = subMonths(now, 1)
 
-      const [thisMonthData, prevMonthData, budgetData] = await Promise.all([
-        fetchCategoryData(now),
-        fetchCategoryData(prev),
-        fetchBudgetData(),
+      const [thisMonthData, prevMonthData] = await Promise.all([
+        fetchBudgetVsActual(now),
+        fetchBudgetVsActual(prev),
       ])
 
-      // Shape assumption: { "groceries": 280, "misc": 40, ... }
       setBudgets((prevBudgets) => {
         const updated = { ...prevBudgets }
 
-        // update budget amounts from API
-        for (const [category, amount] of Object.entries(budgetData)) {
-          if (updated[category]) {
-            updated[category] = {
-              ...updated[category],
-              budget: amount as number,
-            }
-          }
-        }
-
-        // update current month spent
-        for (const [category, spent] of Object.entries(thisMonthData)) {
+        // update budget amounts and current month spent
+        for (const { category, budget, spent } of thisMonthData) {
           if (updated[category]) {
-            updated[category] = {
-              ...updated[category],
-              spent: spent as number,
-            }
+            updated[category] = { ...updated[category], budget, spent }
           }
         }
 
         // update previous month spent
-        for (const [category, spent] of Object.entries(prevMonthData)) {
+        for (const { category, spent } of prevMonthData) {
           if (updated[category]) {
-            updated[category] = {
-              ...updated[category],
-              prevMonth: spent as number,
-            }
+            updated[category] = { ...updated[category], prevMonth: spent }
           }
         }
 
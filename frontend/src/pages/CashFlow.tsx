@@ -11,18 +11,25 @@ export default function CashFlow() {
     const month = new Date().getMonth() + 1
     const year = new Date().getFullYear()
 
-    const fetchIncome = async () => {
-      const response = await fetch(`http://localhost:8000/api/v1/income/by-month?month=${year}-${month}`)
-      const data = await response.json()
-      setIncome(data.total)
-    }
-
-    const fetchEntries = async () => {
-      const response = await fetch(`http://localhost:8000/api/v1/summary/categories?month=${year}-${month}`)
-      const data: Record<string, number> = await response.json()
+    // income and category totals of the month in one request
+    const fetchDashboard = async () => {
+      const response = await fetch('http://localhost:8000/api/v1/dashboard/', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          widgets: [
+            { type: 'income_by_month', month: `${year}-${month}` },
+            { type: 'categories', month: `${year}-${month}` },
+          ],
+        }),
+      })
+      const { results } = await response.json()
+      const [incomeData, categoryData]: [{ total: number }, Record<string, number>] = results
+
+      setIncome(incomeData.total)
 
       // map {category: {total} into entry format
-      const entries: Entry[] = Object.entries(data).map(([category, total]) => ({
+      const entries: Entry[] = Object.entries(categoryData).map(([category, total]) => ({
         name: category as CategoryKey,
         amount: Number(total.toFixed(2))
       }))
@@ -30,8 +37,7 @@ export default function CashFlow() {
       setEntries(entries)
     }
 
-    fetchIncome()
-    fetchEntries()
+    fetchDashboard()
   }, [])
 
   return (